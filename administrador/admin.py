@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from .estadisticas import invalidar_estadisticas, reconstruir_serie
 from .models import Rol, User
 
 @admin.register(Rol)
@@ -25,4 +26,7 @@ class CustomUserAdmin(UserAdmin):
 
     def aprobar_usuarios(self, request, queryset):
         queryset.update(estado='ACTIVO', is_active=True)
+        invalidar_estadisticas()
+        # update() no dispara señales: se recalcula la serie de los gráficos
+        reconstruir_serie()
     aprobar_usuarios.short_description = "Aprobar usuarios seleccionados"
\ No newline at end of file
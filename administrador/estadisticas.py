@@ -0,0 +1,154 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import EstadisticaUsuarios, User, Rol
+
+CLAVE_CACHE = "administrador:estadisticas"
+# Tope de vida en caché; los cambios en usuarios o roles la invalidan antes
+TIMEOUT = 60
+
+
+def calcular_estadisticas():
+    """
+    Totales de usuarios por estado, última actividad y distribución por rol
+    en dos consultas de agregación.
+    """
+    totales = User.objects.aggregate(
+        total=Count("id"),
+        pendientes=Count("id", filter=Q(estado="PENDIENTE")),
+        activos=Count("id", filter=Q(estado="ACTIVO")),
+        inactivos=Count("id", filter=Q(estado="INACTIVO")),
+        ultima_actividad=Max("last_login"),
+    )
+    totales["roles"] = list(
+        Rol.objects.annotate(cantidad=Count("user"))
+        .values("id", "nombre", "color", "cantidad")
+        .order_by("nombre")
+    )
+    return totales
+
+
+def estadisticas_dashboard():
+    """Estadísticas del panel de administración, servidas desde la caché."""
+    estadisticas = cache.get(CLAVE_CACHE)
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas()
+        cache.set(CLAVE_CACHE, estadisticas, TIMEOUT)
+    return estadisticas
+
+
+def invalidar_estadisticas(*args, **kwargs):
+    """Descarta las estadísticas en caché (se usa también como receptor de señales)."""
+    cache.delete(CLAVE_CACHE)
+
+
+# ===============================
+# SERIE DE ALTAS DE USUARIOS (gráficos del dashboard)
+# ===============================
+CLAVE_VERSION_SERIE = "administrador:serie_usuarios:version"
+
+
+def version_serie():
+    """Versión de la serie; cambia cada vez que se modifica EstadisticaUsuarios."""
+    return cache.get_or_set(CLAVE_VERSION_SERIE, lambda: uuid.uuid4().hex, None)
+
+
+def nueva_version_serie():
+    transaction.on_commit(lambda: cache.set(CLAVE_VERSION_SERIE, uuid.uuid4().hex, None))
+
+
+def _sumar_sql(origen):
+    """
+    ``INSERT ... <origen> ON CONFLICT DO UPDATE`` que suma ``cantidad`` en la
+    fila única de (mes, rol, estado); ``origen`` es un VALUES o un SELECT con
+    las columnas (mes, rol_id, estado, cantidad). Sirve en PostgreSQL y SQLite.
+    """
+    tabla = connection.ops.quote_name(EstadisticaUsuarios._meta.db_table)
+    return (
+        f"INSERT INTO {tabla} (mes, rol_id, estado, cantidad) {origen} "
+        f"ON CONFLICT (mes, (COALESCE(rol_id, 0)), estado) "
+        f"DO UPDATE SET cantidad = {tabla}.cantidad + EXCLUDED.cantidad"
+    )
+
+
+def actualizar_serie(anterior, actual):
+    """
+    Mueve un usuario de la clave ``anterior`` a ``actual`` en la serie
+    pre-agregada. Cualquiera de las dos puede ser ``None`` (alta o baja).
+    """
+    if anterior == actual:
+        return
+    movimientos = [(clave, delta) for clave, delta in ((anterior, -1), (actual, 1)) if clave is not None]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for (mes, rol_id, estado), delta in movimientos:
+            cursor.execute(_sumar_sql("VALUES (%s, %s, %s, %s)"), [mes, rol_id, estado, delta])
+    nueva_version_serie()
+
+
+def pasar_rol_a_sin_rol(rol_id):
+    """
+    Suma las filas del rol a las de "sin rol" y las elimina. Se llama antes de
+    borrar el rol: el SET_NULL de la FK dejaría filas repetidas con rol NULL.
+    """
+    tabla = connection.ops.quote_name(EstadisticaUsuarios._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            _sumar_sql(f"SELECT mes, NULL, estado, cantidad FROM {tabla} WHERE rol_id = %s"), [rol_id])
+        cursor.execute(f"DELETE FROM {tabla} WHERE rol_id = %s", [rol_id])
+    nueva_version_serie()
+
+
+def reconstruir_serie():
+    """Recalcula la serie completa desde administrador_user. Devuelve las filas creadas."""
+    filas = (
+        User.objects.annotate(mes=TruncMonth("date_joined"))
+        .values("mes", "rol_id", "estado")
+        .annotate(cantidad=Count("id"))
+        .order_by()
+    )
+    nuevas = [
+        EstadisticaUsuarios(
+            mes=f["mes"].date() if hasattr(f["mes"], "date") else f["mes"],
+            rol_id=f["rol_id"], estado=f["estado"], cantidad=f["cantidad"],
+        )
+        for f in filas
+    ]
+    with transaction.atomic():
+        EstadisticaUsuarios.objects.all().delete()
+        EstadisticaUsuarios.objects.bulk_create(nuevas, batch_size=1000)
+    nueva_version_serie()
+    return len(nuevas)
+
+
+def serie_usuarios():
+    """
+    Datos de los gráficos de evolución y distribución por rol, calculados
+    desde la serie pre-agregada y cacheados por versión.
+    """
+    clave = f"administrador:serie_usuarios:{version_serie()}"
+    datos = cache.get(clave)
+    if datos is None:
+        evolucion = (
+            EstadisticaUsuarios.objects.values("mes")
+            .annotate(total=Sum("cantidad")).filter(total__gt=0).order_by("mes")
+        )
+        roles = (
+            EstadisticaUsuarios.objects.values("rol__nombre")
+            .annotate(total=Sum("cantidad")).filter(total__gt=0).order_by("rol__nombre")
+        )
+        datos = {
+            "evolucion": {
+                "labels": [e["mes"].strftime("%b %Y") for e in evolucion],
+                "cantidades": [e["total"] for e in evolucion],
+            },
+            "roles": {
+                "labels": [r["rol__nombre"] or "Sin rol" for r in roles],
+                "cantidades": [r["total"] for r in roles],
+            },
+        }
+        cache.set(clave, datos, None)
+    return datos
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from administrador.estadisticas import invalidar_estadisticas, reconstruir_serie
+
+
+class Command(BaseCommand):
+    help = "Recalcula la serie pre-agregada de usuarios por mes, rol y estado."
+
+    def handle(self, *args, **options):
+        filas = reconstruir_serie()
+        invalidar_estadisticas()
+        self.stdout.write(self.style.SUCCESS(f"Serie reconstruida: {filas} fila(s)."))
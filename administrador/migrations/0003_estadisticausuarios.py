@@ -0,0 +1,50 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+
+def cargar_serie(apps, schema_editor):
+    """Carga la serie pre-agregada con los usuarios existentes."""
+    User = apps.get_model("administrador", "User")
+    EstadisticaUsuarios = apps.get_model("administrador", "EstadisticaUsuarios")
+    filas = (
+        User.objects.annotate(mes=TruncMonth("date_joined"))
+        .values("mes", "rol_id", "estado")
+        .annotate(cantidad=Count("id"))
+        .order_by()
+    )
+    EstadisticaUsuarios.objects.bulk_create([
+        EstadisticaUsuarios(mes=f["mes"].date(), rol_id=f["rol_id"],
+                            estado=f["estado"], cantidad=f["cantidad"])
+        for f in filas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0002_add_creado_por_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaUsuarios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente de aprobación'), ('ACTIVO', 'Activo'), ('INACTIVO', 'Inactivo')], max_length=20)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('rol', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='administrador.rol')),
+            ],
+            options={
+                'verbose_name': 'Estadística de usuarios',
+                'verbose_name_plural': 'Estadísticas de usuarios',
+                'ordering': ['mes'],
+                'indexes': [models.Index(fields=['mes', 'rol', 'estado'], name='estadistica_usuarios_idx')],
+            },
+        ),
+        migrations.RunPython(cargar_serie, migrations.RunPython.noop),
+    ]
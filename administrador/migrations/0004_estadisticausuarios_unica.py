@@ -0,0 +1,43 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:20
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+def unificar_filas(apps, schema_editor):
+    """Suma en una sola fila las repetidas por (mes, rol, estado) antes de la restricción."""
+    EstadisticaUsuarios = apps.get_model("administrador", "EstadisticaUsuarios")
+    filas = EstadisticaUsuarios.objects.using(schema_editor.connection.alias)
+    primera, sobrantes, unificadas = {}, [], set()
+    for pk, mes, rol_id, estado, cantidad in filas.order_by("id").values_list(
+            "id", "mes", "rol_id", "estado", "cantidad"):
+        clave = (mes, rol_id, estado)
+        if clave in primera:
+            primera[clave][1] += cantidad
+            sobrantes.append(pk)
+            unificadas.add(clave)
+        else:
+            primera[clave] = [pk, cantidad]
+    filas.filter(pk__in=sobrantes).delete()
+    for clave in unificadas:
+        pk, cantidad = primera[clave]
+        filas.filter(pk=pk).update(cantidad=cantidad)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administrador', '0003_estadisticausuarios'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='estadisticausuarios',
+            name='estadistica_usuarios_idx',
+        ),
+        migrations.RunPython(unificar_filas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='estadisticausuarios',
+            constraint=models.UniqueConstraint(models.F('mes'), django.db.models.functions.comparison.Coalesce('rol', models.Value(0)), models.F('estado'), name='estadistica_usuarios_unica'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.core.validators import RegexValidator
 from django.conf import settings
 
@@ -109,6 +110,19 @@ class User(AbstractUser):
         related_query_name="custom_user",
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Clave estadística con la que se cargó (ver estadisticas.actualizar_serie)
+        instance._estadistica_original = instance.clave_estadistica()
+        return instance
+
+    def clave_estadistica(self):
+        """(mes de alta, rol_id, estado) con el que el usuario cuenta en EstadisticaUsuarios."""
+        if self.date_joined is None:
+            return None
+        return (self.date_joined.date().replace(day=1), self.rol_id, self.estado)
+
     @property
     def rol_efectivo(self):
         """
@@ -134,3 +148,32 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.username} ({self.get_estado_display()})"
+
+
+class EstadisticaUsuarios(models.Model):
+    """
+    Serie pre-agregada de altas de usuarios por mes, rol y estado.
+    Se mantiene desde las señales de User y se reconstruye con el comando
+    reconstruir_estadisticas_usuarios.
+
+    Hay una sola fila por (mes, rol, estado), también para "sin rol": la
+    restricción única usa ``COALESCE(rol_id, 0)`` porque un índice único común
+    admite varios NULL. Los incrementos son upserts contra esa restricción
+    (ver estadisticas.actualizar_serie).
+    """
+    mes = models.DateField()
+    rol = models.ForeignKey(Rol, on_delete=models.SET_NULL, null=True, blank=True)
+    estado = models.CharField(max_length=20, choices=User.ESTADOS)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Estadística de usuarios'
+        verbose_name_plural = 'Estadísticas de usuarios'
+        ordering = ['mes']
+        constraints = [
+            models.UniqueConstraint(
+                'mes', Coalesce('rol', models.Value(0)), 'estado', name='estadistica_usuarios_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} {self.rol} {self.estado}: {self.cantidad}"
@@ -0,0 +1,47 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+
+CLAVE_VERSION = "administrador:permisos:version"
+# Sin caché compartida un post_migrate no llega a los otros procesos: vida corta
+TIMEOUT = None if getattr(settings, "CACHE_COMPARTIDA", False) else 300
+
+
+def version_catalogo():
+    """Versión del catálogo en la caché común; cambia en cada post_migrate."""
+    return cache.get_or_set(CLAVE_VERSION, lambda: uuid.uuid4().hex, TIMEOUT)
+
+
+def construir_catalogo():
+    permisos = (
+        Permission.objects.select_related("content_type")
+        .order_by("content_type__app_label", "content_type__model", "codename")
+    )
+    grupos = []
+    for permiso in permisos:
+        ct = permiso.content_type
+        if not grupos or (grupos[-1]["app"], grupos[-1]["modelo"]) != (ct.app_label, ct.model):
+            grupos.append({"app": ct.app_label, "modelo": ct.model, "permisos": []})
+        grupos[-1]["permisos"].append({
+            "id": permiso.id,
+            "nombre": permiso.name,
+            "codename": permiso.codename,
+        })
+    return grupos
+
+
+def catalogo_permisos():
+    """
+    Permisos agrupados por app y modelo, construidos una vez por versión y
+    guardados en la caché: ``{"version": str, "grupos": [{"app", "modelo", "permisos": [...]}, ...]}``.
+    """
+    version = version_catalogo()
+    grupos = cache.get_or_set(f"administrador:permisos:{version}", construir_catalogo, TIMEOUT)
+    return {"version": version, "grupos": grupos}
+
+
+def invalidar_catalogo(*args, **kwargs):
+    """Nueva versión del catálogo (receptor de post_migrate: pueden haber nuevos permisos)."""
+    cache.set(CLAVE_VERSION, uuid.uuid4().hex, TIMEOUT)
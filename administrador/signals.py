@@ -1,6 +1,10 @@
-from django.db.models.signals import post_migrate, post_save
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
 from django.dispatch import receiver
+
+from core.instantaneas import instantanea_restaurada
+from .estadisticas import actualizar_serie, invalidar_estadisticas, pasar_rol_a_sin_rol
 from .models import User, Rol
+from .permisos import invalidar_catalogo
 
 @receiver(post_migrate)
 def crear_roles_iniciales(sender, **kwargs):
@@ -32,4 +36,36 @@ def asignar_rol_por_defecto(sender, instance, created, **kwargs):
             }
         )
         instance.rol = rol_invitado
-        instance.save()
\ No newline at end of file
+        instance.save()
+
+# Las estadísticas del dashboard se recalculan ante cualquier cambio en usuarios o roles
+for _modelo in (User, Rol):
+    post_save.connect(invalidar_estadisticas, sender=_modelo,
+                      dispatch_uid=f"invalidar_estadisticas_save_{_modelo.__name__}")
+    post_delete.connect(invalidar_estadisticas, sender=_modelo,
+                        dispatch_uid=f"invalidar_estadisticas_delete_{_modelo.__name__}")
+
+
+@receiver(post_save, sender=User)
+def actualizar_serie_usuario(sender, instance, **kwargs):
+    # Solo mueve el conteo si cambió el mes, rol o estado desde la última carga/guardado
+    actual = instance.clave_estadistica()
+    actualizar_serie(getattr(instance, "_estadistica_original", None), actual)
+    instance._estadistica_original = actual
+
+
+@receiver(post_delete, sender=User)
+def descontar_serie_usuario(sender, instance, **kwargs):
+    actualizar_serie(getattr(instance, "_estadistica_original", instance.clave_estadistica()), None)
+
+
+@receiver(pre_delete, sender=Rol)
+def rol_eliminado_serie(sender, instance, **kwargs):
+    # Sus usuarios pasan a "Sin rol" (SET_NULL): la serie suma sus filas a las de sin rol
+    pasar_rol_a_sin_rol(instance.pk)
+
+
+# Nuevas migraciones pueden crear permisos: el catálogo de los modales se reconstruye
+post_migrate.connect(invalidar_catalogo, dispatch_uid="invalidar_catalogo_permisos")
+# Una instantánea restaurada trae sus propios ids de auth_permission
+instantanea_restaurada.connect(invalidar_catalogo, dispatch_uid="invalidar_catalogo_instantanea")
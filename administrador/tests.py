@@ -1,3 +1,168 @@
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from core.instantaneas import instantanea_restaurada
+from .estadisticas import estadisticas_dashboard, reconstruir_serie
+from .models import EstadisticaUsuarios, Rol, User
+from .permisos import catalogo_permisos, invalidar_catalogo
+
+
+class EstadisticasDashboardTest(TestCase):
+    """Totales del dashboard en dos consultas, cacheados hasta que cambian usuarios o roles."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tecnico = Rol.objects.create(nombre="Técnico")
+        cls.admin = User.objects.create_superuser("admin", password="clave", estado="ACTIVO")
+        for i, estado in enumerate(["ACTIVO", "PENDIENTE", "PENDIENTE"]):
+            User.objects.create_user(f"usuario{i}", password="clave", estado=estado)
+        # El alta asigna el rol Invitado (signals.asignar_rol_por_defecto)
+        User.objects.filter(username="usuario0").update(rol=cls.tecnico)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_totales_y_roles(self):
+        with self.assertNumQueries(2):
+            estadisticas = estadisticas_dashboard()
+        self.assertEqual(
+            {k: estadisticas[k] for k in ("total", "activos", "pendientes", "inactivos")},
+            {"total": 4, "activos": 2, "pendientes": 2, "inactivos": 0})
+        roles = {r["nombre"]: r["cantidad"] for r in estadisticas["roles"]}
+        self.assertEqual((roles["Técnico"], roles["Invitado"]), (1, 2))
+
+    def test_cache_e_invalidacion(self):
+        estadisticas_dashboard()
+        with self.assertNumQueries(0):
+            estadisticas_dashboard()
+        usuario = User.objects.get(username="usuario1")
+        usuario.estado = "INACTIVO"
+        usuario.save()
+        self.assertEqual(estadisticas_dashboard()["inactivos"], 1)
+
+
+class UsuariosJsonTest(TestCase):
+    """La tabla de usuarios se pagina, filtra y ordena en el servidor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password="clave", estado="ACTIVO")
+        for i in range(12):
+            User.objects.create_user(f"tecnico{i:02d}", password="clave", email=f"t{i}@mail.com",
+                                     estado="PENDIENTE" if i % 3 == 0 else "ACTIVO")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def pedir(self, **params):
+        return self.client.get(reverse("usuarios_json"), params).json()
+
+    def test_pagina_y_consultas_constantes(self):
+        with self.assertNumQueries(4):  # sesión, usuario, COUNT y página
+            datos = self.pedir(por_pagina=5, pagina=2, orden="username")
+        self.assertEqual((datos["total"], datos["paginas"], datos["pagina"]), (13, 3, 2))
+        self.assertEqual([u["username"] for u in datos["resultados"]],
+                         [f"tecnico{i:02d}" for i in range(4, 9)])
+        self.assertEqual(datos["resultados"][0]["rol_nombre"], "Invitado")
+
+    def test_filtros_y_orden(self):
+        datos = self.pedir(estado="PENDIENTE", orden="-username")
+        self.assertEqual([u["username"] for u in datos["resultados"]],
+                         ["tecnico09", "tecnico06", "tecnico03", "tecnico00"])
+        self.assertEqual(self.pedir(q="t11@")["total"], 1)
+        # Un orden desconocido cae en el predeterminado en lugar de fallar
+        self.assertEqual(self.pedir(orden="password")["total"], 13)
+
+
+class SerieUsuariosTest(TestCase):
+    """La serie incremental coincide con la reconstruida, también al borrar roles."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tecnico = Rol.objects.create(nombre="Técnico")
+        cls.gerente = Rol.objects.create(nombre="Gerente")
+
+    def serie(self):
+        return sorted(
+            (f.mes, f.rol_id, f.estado, f.cantidad)
+            for f in EstadisticaUsuarios.objects.exclude(cantidad=0))
+
+    def assertSerieCoincide(self):
+        incremental = self.serie()
+        reconstruir_serie()
+        self.assertEqual(incremental, self.serie())
+        self.assertEqual(sum(f[3] for f in incremental), User.objects.count())
+
+    def test_altas_cambios_y_bajas(self):
+        usuarios = [User.objects.create_user(f"usuario{i}", password="clave") for i in range(4)]
+        usuarios[0].rol = self.tecnico
+        usuarios[0].save()
+        usuarios[1].estado = "ACTIVO"
+        usuarios[1].save()
+        usuarios[1].estado = "ACTIVO"
+        usuarios[1].save()  # sin cambios de clave: no toca la serie
+        usuarios[2].delete()
+        claves = list(EstadisticaUsuarios.objects.values_list("mes", "rol_id", "estado"))
+        self.assertEqual(len(claves), len(set(claves)))
+        self.assertSerieCoincide()
+
+    def test_borrar_roles_unifica_sin_rol(self):
+        for i, rol in enumerate([self.tecnico, self.tecnico, self.gerente, None]):
+            usuario = User.objects.create_user(f"usuario{i}", password="clave")
+            usuario.rol = rol
+            usuario.save()
+        self.tecnico.delete()
+        self.gerente.delete()
+        # Una sola fila "sin rol" por mes y estado, con los cuatro usuarios
+        sin_rol = EstadisticaUsuarios.objects.filter(rol__isnull=True)
+        self.assertEqual([f.cantidad for f in sin_rol], [4])
+        self.assertSerieCoincide()
+
+
+class CatalogoPermisosTest(TestCase):
+    """Catálogo de permisos cacheado por versión y edición de roles sin perder permisos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", password="clave", estado="ACTIVO")
+        cls.rol = Rol.objects.create(nombre="Técnico")
+        cls.permisos = list(Permission.objects.filter(content_type__app_label="core").order_by("id")[:3])
+        cls.rol.permisos.set(cls.permisos[:2])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def editar(self, **datos):
+        self.client.post(reverse("editar_rol", args=[self.rol.pk]),
+                         dict({"nombre": "Técnico", "descripcion": ""}, **datos))
+        return set(self.rol.permisos.all())
+
+    def test_catalogo_cacheado_y_etag(self):
+        catalogo = catalogo_permisos()
+        with self.assertNumQueries(0):
+            self.assertEqual(catalogo_permisos(), catalogo)
+        respuesta = self.client.get(reverse("permisos_json"))
+        self.assertIn("core", {g["app"] for g in respuesta.json()["grupos"]})
+        etag = respuesta["ETag"]
+        self.assertEqual(self.client.get(reverse("permisos_json"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Un migrate (post_migrate) publica una versión nueva en la caché común
+        invalidar_catalogo()
+        etag_migrate = self.client.get(reverse("permisos_json"))["ETag"]
+        self.assertNotEqual(etag_migrate, etag)
+        # También al restaurar una instantánea (otros ids de auth_permission)
+        instantanea_restaurada.send(sender=None, using="default")
+        self.assertNotEqual(self.client.get(reverse("permisos_json"))["ETag"], etag_migrate)
+
+    def test_modal_trae_los_permisos_actuales(self):
+        respuesta = self.client.get(reverse("listar_roles"))
+        for permiso in self.permisos[:2]:
+            self.assertContains(respuesta, f'id="permiso{self.rol.pk}_{permiso.pk}" name="permisos"')
+
+    def test_editar_sin_lista_conserva_permisos(self):
+        self.assertEqual(self.editar(), set(self.permisos[:2]))
+        self.assertEqual(self.editar(permisos_presentes="1", permisos=[self.permisos[2].pk]),
+                         {self.permisos[2]})
+        self.assertEqual(self.editar(permisos_presentes="1"), set())
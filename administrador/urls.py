@@ -4,7 +4,8 @@ from .views import (
     CustomPasswordChangeView, edit_profile, test_toast, 
     RolListView, RolCreateView, SimpleUserCreateView, 
     asignar_rol_usuario, cambiar_estado_usuario,
-    editar_rol, eliminar_rol   
+    editar_rol, eliminar_rol, usuarios_json, estadisticas_usuarios_json,
+    permisos_json
 )
 from django.contrib.auth.views import LogoutView
 
@@ -26,6 +27,8 @@ urlpatterns = [
     path('home/', HomeView.as_view(), name='home'),
     path('administrador-dashboard/', AdminView.as_view(), name='administrador_dashboard'),
     path('invitado-dashboard/', InvitadoView.as_view(), name='invitado_dashboard'),
+    path('usuarios/json/', usuarios_json, name='usuarios_json'),
+    path('estadisticas/usuarios/json/', estadisticas_usuarios_json, name='estadisticas_usuarios_json'),
 
 
     #------------------------------------
@@ -35,6 +38,7 @@ urlpatterns = [
     path('roles/crear/', RolCreateView.as_view(), name='crear_rol'),
     path('roles/editar/<int:rol_id>/', editar_rol, name='editar_rol'),
     path('roles/eliminar/<int:rol_id>/', eliminar_rol, name='eliminar_rol'),
+    path('roles/permisos/json/', permisos_json, name='permisos_json'),
 
 
     #---------------------------------------------
@@ -7,20 +7,22 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import Permission
 from django.contrib.auth.views import LoginView as DjangoLoginView, PasswordChangeView
+from django.core.paginator import Paginator
 from django.db.models import Q, Count
-from django.db.models.functions import TruncMonth
 from django.http import JsonResponse
 from django.shortcuts import render, get_list_or_404, redirect, get_object_or_404
 from django.urls import reverse, reverse_lazy, NoReverseMatch
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST
 from django.views.generic import TemplateView, CreateView, ListView
 from core.notificaciones.utils import notificar_a_admins
 
 # Local application imports
+from .estadisticas import estadisticas_dashboard, serie_usuarios, version_serie
 from .forms import CustomUserCreationForm, CustomPasswordChangeForm, SimpleUserCreationForm
 from .models import User, Rol
+from .permisos import catalogo_permisos
 
 # VISTA DE INICIO DE SESION PERSONALIZADA
 
@@ -88,59 +90,116 @@ class AdminView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         # Llama al método padre para obtener el contexto base
         context = super().get_context_data(**kwargs)
-        # Para el modal de creación de roles
-        context['permisos'] = Permission.objects.all()
-
-        # Estadísticas
-        context['total_usuarios'] = User.objects.count()
-        context['ultima_actividad'] = User.objects.order_by(
-            '-last_login').first().last_login if User.objects.exists() else None
-        context['roles'] = Rol.objects.all()
-
-        # Querysets para las pestañas
-        context['usuarios_todos'] = User.objects.all().order_by('-date_joined')
-        context['usuarios_pendientes'] = User.objects.filter(
-            estado='PENDIENTE').order_by('-date_joined')
-        context['usuarios_activos'] = User.objects.filter(
-            estado='ACTIVO').order_by('-date_joined')
-        context['usuarios_inactivos'] = User.objects.filter(
-            estado='INACTIVO').order_by('-date_joined')
-
-        # Columnas para la tabla reutilizable
-        context['columnas'] = [
-            {'nombre': 'Usuario', 'campo': 'username'},
-            {'nombre': 'Nombre', 'campo': 'first_name'},
-            {'nombre': 'Apellido', 'campo': 'last_name'},
-            {'nombre': 'Email', 'campo': 'email'},
-            {'nombre': 'Rol', 'campo': 'rol_nombre'},
-            {'nombre': 'Estado', 'campo': 'estado'},
-            {'nombre': 'Creado por', 'campo': 'creado_por'},
-            {'nombre': 'Último login', 'campo': 'last_login'},
-        ]
-
-        # Evolución de usuarios por mes (últimos 12 meses)
-        evolucion = (
-            User.objects.annotate(mes=TruncMonth('date_joined'))
-            .values('mes')
-            .annotate(cantidad=Count('id'))
-            .order_by('mes')
-        )
-        evolucion_fechas = [e['mes'].strftime('%b %Y') for e in evolucion]
-        evolucion_cantidades = [e['cantidad'] for e in evolucion]
-        context['evolucion_fechas'] = json.dumps(evolucion_fechas)
-        context['evolucion_cantidades'] = json.dumps(evolucion_cantidades)
-
-        # Distribución de roles
-        roles = Rol.objects.all()
-        roles_labels = [rol.nombre for rol in roles]
-        roles_cantidades = [User.objects.filter(
-            rol=rol).count() for rol in roles]
-        context['roles_labels'] = json.dumps(roles_labels)
-        context['roles_cantidades'] = json.dumps(roles_cantidades)
+
+        # Estadísticas (agregadas y cacheadas, ver estadisticas.py)
+        estadisticas = estadisticas_dashboard()
+        context['estadisticas'] = estadisticas
+        context['total_usuarios'] = estadisticas['total']
+        context['ultima_actividad'] = estadisticas['ultima_actividad']
+        context['roles'] = estadisticas['roles']
+
+        # Columnas para la tabla reutilizable (las filas se piden a usuarios_json)
+        context['columnas'] = COLUMNAS_USUARIOS
+
+        # Los gráficos (evolución y roles) se piden a estadisticas_usuarios_json
 
         return context
 
 
+@login_required
+@condition(etag_func=lambda request: version_serie())
+def estadisticas_usuarios_json(request):
+    """Series de los gráficos del dashboard; responde 304 si no cambiaron."""
+    response = JsonResponse(serie_usuarios())
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ==================================================================
+# TABLA DE USUARIOS DEL DASHBOARD (paginada en el servidor)
+# ==================================================================
+
+COLUMNAS_USUARIOS = [
+    {'nombre': 'Usuario', 'campo': 'username'},
+    {'nombre': 'Nombre', 'campo': 'first_name'},
+    {'nombre': 'Apellido', 'campo': 'last_name'},
+    {'nombre': 'Email', 'campo': 'email'},
+    {'nombre': 'Rol', 'campo': 'rol_nombre'},
+    {'nombre': 'Estado', 'campo': 'estado'},
+    {'nombre': 'Creado por', 'campo': 'creado_por'},
+    {'nombre': 'Último login', 'campo': 'last_login'},
+]
+
+# Campos de orden permitidos desde la URL (columna -> campo del modelo)
+ORDEN_USUARIOS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'email': 'email',
+    'rol_nombre': 'rol__nombre',
+    'estado': 'estado',
+    'creado_por': 'creado_por',
+    'last_login': 'last_login',
+    'date_joined': 'date_joined',
+}
+
+
+@login_required
+def usuarios_json(request):
+    """
+    Página de usuarios para las pestañas del dashboard.
+    Parámetros: estado, q (búsqueda), orden (con '-' para descendente), pagina, por_pagina.
+    """
+    usuarios = User.objects.select_related('rol').only(
+        'id', 'username', 'first_name', 'last_name', 'email', 'estado',
+        'creado_por', 'last_login', 'date_joined', 'rol__id', 'rol__nombre',
+    )
+
+    estado = request.GET.get('estado')
+    if estado in dict(User.ESTADOS):
+        usuarios = usuarios.filter(estado=estado)
+
+    q = request.GET.get('q', '').strip()
+    if q:
+        usuarios = usuarios.filter(
+            Q(username__icontains=q) | Q(first_name__icontains=q) |
+            Q(last_name__icontains=q) | Q(email__icontains=q)
+        )
+
+    orden = request.GET.get('orden', '-date_joined')
+    campo = ORDEN_USUARIOS.get(orden.lstrip('-'), 'date_joined')
+    descendente = orden.startswith('-')
+    usuarios = usuarios.order_by(f"{'-' if descendente else ''}{campo}", 'id')
+
+    try:
+        por_pagina = max(1, min(int(request.GET.get('por_pagina', 10)), 100))
+    except ValueError:
+        por_pagina = 10
+    pagina = Paginator(usuarios, por_pagina).get_page(request.GET.get('pagina'))
+
+    return JsonResponse({
+        'resultados': [
+            {
+                'id': u.id,
+                'username': u.username,
+                'first_name': u.first_name,
+                'last_name': u.last_name,
+                'nombre_completo': u.get_full_name() or u.username,
+                'email': u.email,
+                'rol_id': u.rol_id,
+                'rol_nombre': u.rol.nombre if u.rol else None,
+                'estado': u.estado,
+                'creado_por': u.creado_por,
+                'last_login': u.last_login.isoformat() if u.last_login else None,
+            }
+            for u in pagina
+        ],
+        'pagina': pagina.number,
+        'paginas': pagina.paginator.num_pages,
+        'total': pagina.paginator.count,
+    })
+
+
 # ==================================================================
 # VISTA DE REGISTRO PERSONALIZADA -- CREACION PERSONAL DE USUARIO
 # ==================================================================
@@ -209,6 +268,19 @@ class RolListView(LoginRequiredMixin, ListView):
     template_name = 'administrador/listar_roles.html'
     context_object_name = 'roles'
 
+    def get_queryset(self):
+        # Los modales de edición muestran marcados los permisos actuales de cada rol
+        return Rol.objects.prefetch_related('permisos__content_type')
+
+
+@login_required
+@condition(etag_func=lambda request: catalogo_permisos()['version'])
+def permisos_json(request):
+    """Catálogo de permisos agrupado por app/modelo para los modales de roles."""
+    response = JsonResponse({'grupos': catalogo_permisos()['grupos']})
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
+
 
 class RolCreateView(LoginRequiredMixin, CreateView):
     model = Rol
@@ -257,14 +329,17 @@ def editar_rol(request, rol_id):
     if request.method == 'POST':
         rol.nombre = request.POST.get('nombre')
         rol.descripcion = request.POST.get('descripcion')
-        permisos_ids = request.POST.getlist('permisos')
-        rol.permisos.set(permisos_ids)
+        # Solo si el formulario trae la lista de permisos (el modal marca los
+        # actuales en el HTML); sin ella se conservan los que tenía el rol
+        if 'permisos_presentes' in request.POST:
+            rol.permisos.set(request.POST.getlist('permisos'))
         rol.save()
         messages.success(request, "Rol actualizado correctamente.")
         notificar_a_admins(
             mensaje=f'El rol "{rol.nombre}" fue editado.',
             tipo="WARNING",
-            exclude_user=request.user
+            exclude_user=request.user,
+            clave=f"rol.editado:{rol.pk}"
         )
         return redirect('listar_roles')
     return redirect('listar_roles')
@@ -338,7 +413,8 @@ def asignar_rol_usuario(request):
         notificar_a_admins(
             mensaje=f'El usuario {usuario.username} fue asignado al rol "{rol.nombre}".',
             tipo="INFO",
-            exclude_user=request.user
+            exclude_user=request.user,
+            clave=f"usuario.rol:{usuario.pk}"
         )
 
         return JsonResponse({"success": True, "message": f"Rol '{rol.nombre}' asignado a {usuario.username}"})
@@ -376,7 +452,8 @@ def cambiar_estado_usuario(request):
             mensaje=f'El estado del usuario {user.username} fue cambiado a "{user.estado}"',
             tipo="WARNING" if user.estado == "INACTIVO" else "SUCCESS",
             exclude_user=request.user,
-            link=reverse("administrador_dashboard")
+            link=reverse("administrador_dashboard"),
+            clave=f"usuario.estado:{user.pk}"
         )
 
         return JsonResponse({'success': True, 'message': f'Estado actualizado a {user.estado} para {user.username}'})
@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ResumenTiempoEstado
+
+
+@admin.register(ResumenTiempoEstado)
+class ResumenTiempoEstadoAdmin(admin.ModelAdmin):
+    list_display = ("mes", "estado", "departamento", "distrito", "cantidad", "p50", "p90")
+    list_filter = ("estado", "departamento")
+    list_select_related = ("departamento", "distrito")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from analisis.tiempos import actualizar, reconstruir
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula los tramos de estado de las solicitudes desde las auditorías nuevas "
+        "y actualiza el resumen por mes, departamento y distrito. La vista solo lee el "
+        "resumen: conviene programarlo (p. ej. con cron cada pocos minutos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--completo", action="store_true",
+            help="Recalcular todo desde cero (p. ej. tras borrar solicitudes o auditorías).")
+
+    def handle(self, *args, **options):
+        if options["completo"]:
+            tramos = reconstruir()
+            self.stdout.write(self.style.SUCCESS(f"Resumen reconstruido: {tramos} tramo(s)."))
+        else:
+            tramos = actualizar()
+            self.stdout.write(self.style.SUCCESS(f"Resumen actualizado: {tramos} tramo(s) nuevo(s)."))
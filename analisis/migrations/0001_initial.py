@@ -0,0 +1,55 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0013_solicitud_vigente_unica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenTiempoEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('activo', 'Activo'), ('en_proceso', 'En proceso de relevamiento'), ('inactivo', 'Inactivo')], max_length=30)),
+                ('cantidad', models.IntegerField()),
+                ('promedio', models.FloatField()),
+                ('p50', models.FloatField()),
+                ('p90', models.FloatField()),
+                ('departamento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.departamento')),
+                ('distrito', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.distrito')),
+            ],
+            options={
+                'verbose_name': 'Resumen de tiempos por estado',
+                'verbose_name_plural': 'Resúmenes de tiempos por estado',
+                'ordering': ['mes', 'estado'],
+                'indexes': [models.Index(fields=['mes', 'departamento', 'distrito'], name='resumen_tiempo_mes_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TramoEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('activo', 'Activo'), ('en_proceso', 'En proceso de relevamiento'), ('inactivo', 'Inactivo')], max_length=30)),
+                ('desde', models.DateTimeField()),
+                ('hasta', models.DateTimeField()),
+                ('segundos', models.FloatField()),
+                ('mes', models.DateField()),
+                ('auditoria', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.solicitudaudit')),
+                ('colonia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.colonia')),
+                ('solicitud', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.solicitud')),
+            ],
+            options={
+                'verbose_name': 'Tramo de estado',
+                'verbose_name_plural': 'Tramos de estado',
+                'indexes': [models.Index(fields=['mes', 'estado'], name='tramo_estado_mes_idx')],
+            },
+        ),
+    ]
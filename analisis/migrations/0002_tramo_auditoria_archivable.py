@@ -0,0 +1,20 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analisis', '0001_initial'),
+        ('core', '0014_auditoria_indices'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tramoestado',
+            name='auditoria',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.solicitudaudit'),
+        ),
+    ]
@@ -1,3 +1,57 @@
 from django.db import models
 
-# Create your models here.
+from core.models import Colonia, Departamento, Distrito, Solicitud, SolicitudAudit
+
+
+class TramoEstado(models.Model):
+    """
+    Permanencia de una solicitud en un estado: desde la auditoría que la llevó
+    a ese estado hasta la siguiente (``auditoria``). Se calcula con LAG sobre
+    core_solicitudaudit (ver analisis/tiempos.py).
+    """
+    # SET_NULL: el tramo sobrevive al archivado de auditorías viejas (archivar_auditorias)
+    auditoria = models.OneToOneField(
+        SolicitudAudit, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    solicitud = models.ForeignKey(Solicitud, on_delete=models.CASCADE, related_name="+")
+    colonia = models.ForeignKey(Colonia, on_delete=models.CASCADE, related_name="+")
+    estado = models.CharField(max_length=30, choices=Solicitud.ESTADOS)
+    desde = models.DateTimeField()
+    hasta = models.DateTimeField()
+    segundos = models.FloatField()
+    # Mes en que terminó el tramo; agrupa el resumen
+    mes = models.DateField()
+
+    class Meta:
+        verbose_name = "Tramo de estado"
+        verbose_name_plural = "Tramos de estado"
+        indexes = [models.Index(fields=["mes", "estado"], name="tramo_estado_mes_idx")]
+
+    def __str__(self):
+        return f"Solicitud #{self.solicitud_id} {self.estado}: {self.segundos:.0f} s"
+
+
+class ResumenTiempoEstado(models.Model):
+    """
+    Tiempo en cada estado por mes, departamento y distrito. Las filas con
+    distrito vacío son el total del departamento y las que no tienen
+    departamento, el total general. Tiempos en segundos.
+    """
+    mes = models.DateField()
+    estado = models.CharField(max_length=30, choices=Solicitud.ESTADOS)
+    departamento = models.ForeignKey(
+        Departamento, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    distrito = models.ForeignKey(
+        Distrito, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    cantidad = models.IntegerField()
+    promedio = models.FloatField()
+    p50 = models.FloatField()
+    p90 = models.FloatField()
+
+    class Meta:
+        verbose_name = "Resumen de tiempos por estado"
+        verbose_name_plural = "Resúmenes de tiempos por estado"
+        ordering = ["mes", "estado"]
+        indexes = [models.Index(fields=["mes", "departamento", "distrito"], name="resumen_tiempo_mes_idx")]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} {self.estado}: {self.cantidad}"
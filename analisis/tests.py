@@ -1,3 +1,121 @@
+import io
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.auditoria import archivar_mes
+from core.models import Colonia, Departamento, Distrito, Solicitud, SolicitudAudit
+
+from .models import ResumenTiempoEstado, TramoEstado
+from .tiempos import actualizar, percentil, reconstruir
+
+INICIO = datetime(2024, 3, 4, 12, tzinfo=dt_timezone.utc)
+
+
+class TiemposSolicitudesTest(TestCase):
+    """Tramos por LAG sobre las auditorías y resumen incremental por territorio."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("gerente", password="clave")
+        cls.central = Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        luque = Distrito.objects.create(nombre="LUQUE", codigo=1, departamento=cls.central)
+        limpio = Distrito.objects.create(nombre="LIMPIO", codigo=2, departamento=cls.central)
+        colonia = Colonia.objects.create(nombre="SAN JOSÉ")
+        colonia.distritos.add(luque, limpio)
+        cls.solicitud = Solicitud.objects.create(colonia=colonia)
+
+    def setUp(self):
+        cache.clear()
+        SolicitudAudit.objects.filter(solicitud=self.solicitud).update(fecha=INICIO)
+        self.auditar("pendiente", "activo", horas=10)
+        self.auditar("activo", "en_proceso", horas=30)
+        Solicitud.objects.filter(pk=self.solicitud.pk).update(estado="en_proceso")
+
+    def auditar(self, previo, nuevo, horas, **extra):
+        return SolicitudAudit.objects.create(**extra,
+            solicitud=self.solicitud, previo=previo, nuevo=nuevo, fecha=INICIO + timedelta(hours=horas))
+
+    def resumen(self, **filtros):
+        return {
+            fila.estado: (fila.cantidad, fila.p50 / 3600)
+            for fila in ResumenTiempoEstado.objects.filter(**filtros)
+        }
+
+    def test_tramos_y_resumen_incremental(self):
+        self.assertEqual(actualizar(), 2)
+        self.assertEqual(actualizar(), 0)
+        self.auditar("en_proceso", "inactivo", horas=34)
+        # El tramo nuevo toma su inicio de una auditoría ya procesada
+        self.assertEqual(actualizar(), 1)
+
+        self.assertEqual(
+            self.resumen(departamento__isnull=True),
+            {"pendiente": (1, 10.0), "activo": (1, 20.0), "en_proceso": (1, 4.0)})
+        # La colonia tiene dos distritos de CENTRAL: una fila por distrito, una sola vez en el total
+        self.assertEqual(
+            self.resumen(departamento=self.central, distrito__isnull=True)["activo"], (1, 20.0))
+        self.assertEqual(
+            ResumenTiempoEstado.objects.filter(estado="activo", distrito__isnull=False).count(), 2)
+
+    def test_reconstruir(self):
+        actualizar()
+        ResumenTiempoEstado.objects.all().delete()
+        self.assertEqual(reconstruir(), 2)
+        self.assertEqual(TramoEstado.objects.count(), 2)
+        self.assertEqual(self.resumen(departamento__isnull=True)["pendiente"], (1, 10.0))
+
+    def test_auditoria_confirmada_tarde(self):
+        # Id reservado por una transacción que confirma después de la actualización
+        reservado = self.auditar("en_proceso", "en_proceso", horas=0)
+        reservado.delete()
+        self.auditar("en_proceso", "inactivo", horas=40)
+        self.assertEqual(actualizar(), 3)
+        self.auditar("en_proceso", "activo", horas=36, pk=reservado.pk)
+        # Tramo nuevo y el siguiente corregido: empieza en la auditoría tardía
+        self.assertEqual(actualizar(), 2)
+        self.assertEqual(actualizar(), 0)
+        self.assertEqual(self.resumen(departamento__isnull=True)["en_proceso"], (1, 6.0))
+        self.assertEqual(self.resumen(departamento__isnull=True)["activo"], (2, 12.0))
+
+    def test_reconstruir_conserva_tramos_archivados(self):
+        self.auditar("en_proceso", "inactivo", horas=30 * 24)  # abril
+        self.assertEqual(actualizar(), 3)
+        with tempfile.TemporaryDirectory() as directorio:
+            archivar_mes(date(2024, 3, 1), directorio)
+        self.assertEqual(reconstruir(), 0)
+        self.assertEqual(TramoEstado.objects.count(), 3)
+        self.assertEqual(self.resumen(departamento__isnull=True, mes=date(2024, 3, 1)),
+                         {"pendiente": (1, 10.0), "activo": (1, 20.0)})
+        self.assertIn("en_proceso", self.resumen(mes=date(2024, 4, 1)))
+
+    def test_vista_solo_lee(self):
+        self.client.force_login(self.usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(reverse("analisis:tiempos_json")).json()["filas"], [])
+        self.assertFalse(TramoEstado.objects.exists())
+        self.assertFalse([q for q in consultas if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))])
+
+    def test_percentil_como_percentile_cont(self):
+        self.assertEqual(percentil([1, 2, 3, 4], 0.5), 2.5)
+        self.assertAlmostEqual(percentil([0, 10], 0.9), 9.0)
+        self.assertIsNone(percentil([], 0.5))
+
+    def test_json(self):
+        call_command("actualizar_tiempos_solicitudes", stdout=io.StringIO())
+        self.client.force_login(self.usuario)
+        datos = self.client.get(reverse("analisis:tiempos_json"), {"desde": "2024-03"}).json()
+        filas = {f["estado"]: f for f in datos["filas"] if f["departamento"] == "CENTRAL"}
+        self.assertEqual(filas["pendiente"]["p50_horas"], 10.0)
+        self.assertEqual(datos["espera_actual"][0]["estado"], "en_proceso")
 
-# Create your tests here.
+        datos = self.client.get(
+            reverse("analisis:tiempos_json"), {"departamento": self.central.pk}).json()
+        self.assertEqual({f["distrito"] for f in datos["filas"]}, {"LUQUE", "LIMPIO"})
@@ -0,0 +1,310 @@
+"""
+Tiempo que pasan las solicitudes en cada estado, desde SolicitudAudit.
+
+Cada auditoría cierra el tramo que abrió la anterior de la misma solicitud:
+la base lo calcula con ``LAG(fecha)`` / ``LAG(nuevo)`` sobre las auditorías
+ordenadas por fecha, sin traer el historial a Python. Los tramos se guardan
+en ``TramoEstado`` y se resumen (cantidad, promedio, percentiles 50 y 90) en
+``ResumenTiempoEstado`` por mes, departamento y distrito.
+
+``actualizar`` es incremental: vuelve a calcular las solicitudes con
+auditorías recientes que todavía no tienen tramo, guarda solo los tramos
+nuevos o corregidos y rehace el resumen de los meses que tocaron.
+``reconstruir`` recalcula todo lo que sigue en la auditoría; los tramos de
+auditorías ya archivadas se conservan. Ambas corren desde el comando
+``actualizar_tiempos_solicitudes`` (programado, p. ej. con cron); la vista
+solo lee el resumen, cacheado por versión.
+"""
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Aggregate, Avg, Count, Exists, F, FloatField, Max, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from core.bloqueos import bloquear_ambito
+from core.models import ColoniaTerritorio, Solicitud, SolicitudAudit
+
+from .models import ResumenTiempoEstado, TramoEstado
+
+CLAVE_VERSION = "analisis:tiempos:version"
+REFRESCO = 60
+BATCH_SIZE = 1000
+# Ids por debajo del último procesado que se vuelven a mirar: una transacción
+# larga puede confirmar una auditoría con un id menor que otras ya procesadas
+MARGEN_AUDITORIAS = 500
+# Estados en los que interesa cuánto esperan las solicitudes abiertas
+ESTADOS_ESPERA = (Solicitud.ESTADO_PENDIENTE, Solicitud.ESTADO_EN_PROCESO)
+
+
+class Percentil(Aggregate):
+    """``percentile_cont(p) WITHIN GROUP (ORDER BY expr)`` de PostgreSQL."""
+    function = "percentile_cont"
+    template = "%(function)s(%(fraccion)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expresion, fraccion, **extra):
+        super().__init__(expresion, fraccion=float(fraccion), **extra)
+
+
+def percentil(valores, fraccion):
+    """Igual que percentile_cont: interpolación lineal sobre ``valores`` ordenados."""
+    if not valores:
+        return None
+    posicion = fraccion * (len(valores) - 1)
+    bajo = int(posicion)
+    alto = min(bajo + 1, len(valores) - 1)
+    return valores[bajo] + (valores[alto] - valores[bajo]) * (posicion - bajo)
+
+
+def _mes(fecha):
+    return timezone.localtime(fecha).date().replace(day=1) if timezone.is_aware(fecha) else fecha.date().replace(day=1)
+
+
+# ===============================
+# TRAMOS (LAG sobre las auditorías)
+# ===============================
+def _tramos(solicitud_ids=None):
+    """
+    Auditorías que cierran un tramo, con el estado y la fecha de la anterior
+    (ventana por solicitud). Con ``solicitud_ids`` se limita a esas solicitudes.
+    """
+    ventana = {"partition_by": [F("solicitud_id")], "order_by": [F("fecha").asc(), F("id").asc()]}
+    auditorias = SolicitudAudit.objects.all()
+    if solicitud_ids is not None:
+        auditorias = auditorias.filter(solicitud_id__in=solicitud_ids)
+    return (
+        auditorias.annotate(
+            desde=Window(Lag("fecha"), **ventana),
+            estado_previo=Window(Lag("nuevo"), **ventana),
+        )
+        # Filtrar por la ventana la envuelve en una subconsulta (el LAG ve todas las
+        # filas de la solicitud); por eso lo ya guardado se descarta en actualizar
+        .filter(desde__isnull=False)
+        .values_list("id", "solicitud_id", "solicitud__colonia_id", "estado_previo", "desde", "fecha")
+        .order_by()
+    )
+
+
+def _calcular(filas):
+    """TramoEstado (sin guardar) de las filas de ``_tramos``."""
+    for auditoria_id, solicitud_id, colonia_id, estado, desde, hasta in filas.iterator(chunk_size=BATCH_SIZE):
+        yield TramoEstado(
+            auditoria_id=auditoria_id, solicitud_id=solicitud_id, colonia_id=colonia_id, estado=estado,
+            desde=desde, hasta=hasta, segundos=(hasta - desde).total_seconds(), mes=_mes(hasta))
+
+
+def _guardar_tramos(tramos):
+    """Guarda ``tramos`` en lotes. Devuelve ``(cantidad, meses afectados)``."""
+    meses, lote, cantidad = set(), [], 0
+    for tramo in tramos:
+        cantidad += 1
+        meses.add(tramo.mes)
+        lote.append(tramo)
+        if len(lote) >= BATCH_SIZE:
+            TramoEstado.objects.bulk_create(lote, ignore_conflicts=True)
+            lote = []
+    TramoEstado.objects.bulk_create(lote, ignore_conflicts=True)
+    return cantidad, meses
+
+
+def _recalculables():
+    """
+    Tramos que ``_tramos`` vuelve a generar: su auditoría sigue en la tabla y
+    tiene una anterior. Los de auditorías archivadas (o cuya anterior se
+    archivó) no se pueden recalcular y se conservan.
+    """
+    previa = SolicitudAudit.objects.filter(solicitud_id=OuterRef("solicitud_id")).filter(
+        Q(fecha__lt=OuterRef("auditoria__fecha"))
+        | Q(fecha=OuterRef("auditoria__fecha"), id__lt=OuterRef("auditoria_id")))
+    return TramoEstado.objects.filter(auditoria__isnull=False).filter(Exists(previa))
+
+
+# ===============================
+# RESUMEN
+# ===============================
+def _departamento_una_vez():
+    """
+    Una fila de ColoniaTerritorio por (colonia, departamento): una colonia con
+    dos distritos del mismo departamento no cuenta dos veces en su total.
+    """
+    return ColoniaTerritorio.objects.filter(~Exists(ColoniaTerritorio.objects.filter(
+        colonia_id=OuterRef("colonia_id"), departamento_id=OuterRef("departamento_id"),
+        pk__lt=OuterRef("pk"))))
+
+
+def _niveles(meses):
+    """Querysets de tramos agrupables por (mes, estado, departamento, distrito)."""
+    tramos = TramoEstado.objects.filter(mes__in=meses).order_by()
+    return [
+        tramos.filter(colonia__territorio__isnull=False).values(
+            "mes", "estado", departamento_id=F("colonia__territorio__departamento_id"),
+            distrito_id=F("colonia__territorio__distrito_id")),
+        tramos.filter(colonia__territorio__in=_departamento_una_vez()).values(
+            "mes", "estado", departamento_id=F("colonia__territorio__departamento_id")),
+        tramos.values("mes", "estado"),
+    ]
+
+
+def _resumir_sql(meses):
+    for nivel in _niveles(meses):
+        for fila in nivel.annotate(
+            cantidad=Count("id"), promedio=Avg("segundos"),
+            p50=Percentil("segundos", 0.5), p90=Percentil("segundos", 0.9),
+        ):
+            yield ResumenTiempoEstado(**fila)
+
+
+def _resumir_python(meses):
+    # Motores sin percentile_cont: los segundos de cada grupo se ordenan aquí
+    for nivel in _niveles(meses):
+        grupos = defaultdict(list)
+        campos = list(nivel.query.values_select) + list(nivel.query.annotation_select)
+        for fila in nivel.values_list(*campos, "segundos").iterator(chunk_size=BATCH_SIZE):
+            grupos[fila[:-1]].append(fila[-1])
+        for clave, segundos in grupos.items():
+            segundos.sort()
+            yield ResumenTiempoEstado(
+                **dict(zip(campos, clave)), cantidad=len(segundos), promedio=sum(segundos) / len(segundos),
+                p50=percentil(segundos, 0.5), p90=percentil(segundos, 0.9))
+
+
+def _resumir(meses):
+    meses = sorted(meses)
+    if not meses:
+        return 0
+    postgres = connections[TramoEstado.objects.db].vendor == "postgresql"
+    filas = list(_resumir_sql(meses) if postgres else _resumir_python(meses))
+    ResumenTiempoEstado.objects.filter(mes__in=meses).delete()
+    ResumenTiempoEstado.objects.bulk_create(filas, batch_size=BATCH_SIZE)
+    return len(filas)
+
+
+def actualizar():
+    """
+    Recalcula los tramos de las solicitudes con auditorías sin tramo
+    posteriores a la última procesada (menos ``MARGEN_AUDITORIAS``), guarda
+    los nuevos o corregidos y rehace el resumen de los meses afectados.
+    Devuelve la cantidad de tramos guardados.
+    """
+    with transaction.atomic():
+        bloquear_ambito(TramoEstado.objects.db, "analisis:tiempos")
+        marca = TramoEstado.objects.aggregate(m=Max("auditoria_id"))["m"] or 0
+        solicitudes = SolicitudAudit.objects.filter(
+            ~Exists(TramoEstado.objects.filter(auditoria_id=OuterRef("pk"))),
+            id__gt=marca - MARGEN_AUDITORIAS,
+        ).values("solicitud_id")
+        actuales = {
+            tramo.auditoria_id: tramo
+            for tramo in TramoEstado.objects.filter(solicitud_id__in=solicitudes, auditoria__isnull=False)
+        }
+        nuevos, reemplazados = [], []
+        for tramo in _calcular(_tramos(solicitud_ids=solicitudes)):
+            actual = actuales.get(tramo.auditoria_id)
+            if actual is not None:
+                if (actual.estado, actual.desde, actual.hasta) == (tramo.estado, tramo.desde, tramo.hasta):
+                    continue
+                # Una auditoría confirmada tarde cambió el inicio de este tramo
+                reemplazados.append(actual)
+            nuevos.append(tramo)
+        TramoEstado.objects.filter(pk__in=[tramo.pk for tramo in reemplazados]).delete()
+        cantidad, meses = _guardar_tramos(nuevos)
+        if cantidad:
+            _resumir(meses | {tramo.mes for tramo in reemplazados})
+            nueva_version()
+    return cantidad
+
+
+def reconstruir():
+    """
+    Recalcula los tramos de las auditorías que siguen en la tabla y el resumen
+    de todos los meses. Devuelve la cantidad de tramos recalculados.
+    """
+    with transaction.atomic():
+        bloquear_ambito(TramoEstado.objects.db, "analisis:tiempos")
+        _recalculables().delete()
+        cantidad, _ = _guardar_tramos(_calcular(_tramos()))
+        ResumenTiempoEstado.objects.all().delete()
+        _resumir(TramoEstado.objects.order_by().values_list("mes", flat=True).distinct())
+        nueva_version()
+    return cantidad
+
+
+# ===============================
+# DATOS PARA LA VISTA (cacheados)
+# ===============================
+def version():
+    return cache.get_or_set(CLAVE_VERSION, lambda: uuid.uuid4().hex, None)
+
+
+def nueva_version():
+    transaction.on_commit(lambda: cache.set(CLAVE_VERSION, uuid.uuid4().hex, None))
+
+
+def _horas(segundos):
+    return None if segundos is None else round(segundos / 3600, 2)
+
+
+def _espera_actual(departamento=None):
+    """
+    Antigüedad de las solicitudes que hoy siguen pendientes o en proceso:
+    desde la última auditoría que las llevó a ese estado.
+    """
+    entrada = SolicitudAudit.objects.filter(
+        solicitud_id=OuterRef("pk"), nuevo=OuterRef("estado")).order_by("-fecha").values("fecha")[:1]
+    abiertas = Solicitud.objects.filter(estado__in=ESTADOS_ESPERA)
+    if departamento:
+        abiertas = abiertas.filter(Exists(ColoniaTerritorio.objects.filter(
+            colonia_id=OuterRef("colonia_id"), departamento_id=departamento)))
+    ahora = timezone.now()
+    grupos = defaultdict(list)
+    for estado, desde, creada in abiertas.annotate(desde=Subquery(entrada)).values_list(
+            "estado", "desde", "fecha_creacion").order_by():
+        grupos[estado].append((ahora - (desde or creada)).total_seconds())
+    return [
+        {"estado": estado, "cantidad": len(segundos),
+         "p50_horas": _horas(percentil(sorted(segundos), 0.5)),
+         "p90_horas": _horas(percentil(sorted(segundos), 0.9))}
+        for estado, segundos in sorted(grupos.items())
+    ]
+
+
+def tiempos(departamento=None, desde=None, hasta=None):
+    """
+    Resumen por mes y estado: por departamento, o por distrito si se indica
+    ``departamento``. ``desde``/``hasta`` son fechas (se toma el mes).
+    """
+    clave = f"analisis:tiempos:{version()}:{departamento}:{desde}:{hasta}"
+    datos = cache.get(clave)
+    if datos is None:
+        filas = ResumenTiempoEstado.objects.select_related("departamento", "distrito")
+        if departamento:
+            filas = filas.filter(departamento_id=departamento, distrito__isnull=False)
+        else:
+            filas = filas.filter(distrito__isnull=True)
+        if desde:
+            filas = filas.filter(mes__gte=desde.replace(day=1))
+        if hasta:
+            filas = filas.filter(mes__lte=hasta)
+        datos = {
+            "estados": dict(Solicitud.ESTADOS),
+            "filas": [
+                {
+                    "mes": f"{fila.mes:%Y-%m}",
+                    "estado": fila.estado,
+                    "departamento": fila.departamento.nombre if fila.departamento else None,
+                    "distrito": fila.distrito.nombre if fila.distrito else None,
+                    "cantidad": fila.cantidad,
+                    "promedio_horas": _horas(fila.promedio),
+                    "p50_horas": _horas(fila.p50),
+                    "p90_horas": _horas(fila.p90),
+                }
+                for fila in filas.order_by("mes", "estado", "departamento__nombre", "distrito__nombre")
+            ],
+            "espera_actual": _espera_actual(departamento),
+        }
+        # La espera actual envejece con el reloj: vence aunque no cambie la versión
+        cache.set(clave, datos, REFRESCO)
+    return datos
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = "analisis"
+
+urlpatterns = [
+    # Tiempo de las solicitudes en cada estado (desde SolicitudAudit)
+    path("solicitudes/tiempos/json/", views.tiempos_json, name="tiempos_json"),
+]
@@ -1,3 +1,29 @@
-from django.shortcuts import render
+from datetime import date
 
-# Create your views here.
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+
+from .tiempos import tiempos
+
+
+def _fecha(valor):
+    """'2024-03' o '2024-03-15' -> date; cualquier otra cosa -> None."""
+    try:
+        return date.fromisoformat(valor if len(valor) > 7 else f"{valor}-01")
+    except (TypeError, ValueError):
+        return None
+
+
+@login_required
+def tiempos_json(request):
+    """
+    Tiempo en cada estado por mes (percentiles 50 y 90, en horas) y espera
+    actual de las solicitudes abiertas. Por departamento, o por distrito con
+    ?departamento=<id>; ?desde=AAAA-MM y ?hasta=AAAA-MM acotan los meses.
+    """
+    departamento = request.GET.get('departamento')
+    departamento = int(departamento) if str(departamento or '').isdigit() else None
+    datos = tiempos(departamento, _fecha(request.GET.get('desde')), _fecha(request.GET.get('hasta')))
+    response = JsonResponse(datos)
+    response['Cache-Control'] = 'private, max-age=60'
+    return response
@@ -44,5 +44,11 @@ class SolicitudAdmin(admin.ModelAdmin):
 @admin.register(SolicitudAudit)
 class SolicitudAuditAdmin(admin.ModelAdmin):
     list_display = ("solicitud", "previo", "nuevo", "cambiado_por", "fecha")
+    # La auditoría solo se agrega: ordenar por id (clave primaria) da el mismo
+    # orden que -fecha sin ordenar toda la tabla
+    ordering = ("-id",)
+    date_hierarchy = "fecha"
+    show_full_result_count = False
+    list_select_related = ("solicitud", "cambiado_por")
     readonly_fields = ("solicitud", "previo", "nuevo", "cambiado_por", "fecha", "comentario")
     
@@ -7,4 +7,20 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         # Importa señales
-        import core.notificaciones.signals
\ No newline at end of file
+        import core.notificaciones.signals
+
+        # Libera códigos automáticos al eliminar registros
+        from core.codigos import conectar_senales
+        conectar_senales()
+
+        # Nueva versión de las opciones cacheadas al cambiar el catálogo
+        from core import catalogo
+        catalogo.conectar_senales()
+
+        # Cierre colonia → distrito → departamento para filtrar sin DISTINCT
+        from core import territorio
+        territorio.conectar_senales()
+
+        # Auditoría de solicitudes guardadas con save()
+        from core import signals
+        signals.conectar_senales()
@@ -0,0 +1,67 @@
+"""
+Archivado por mes de la auditoría de solicitudes.
+
+``SolicitudAudit`` solo crece. Los meses viejos se exportan a
+``solicitudaudit_AAAA_MM.csv.gz`` (mismo CSV que core/exportar.py) y se
+borran de la tabla, así las lecturas recientes y las inserciones no
+dependen de años de historial. Los tramos de analisis/ sobreviven: su
+referencia a la auditoría queda en NULL.
+"""
+import errno
+import os
+import tempfile
+
+from django.db import transaction
+
+from .exportar import comprimir_gzip, filas_csv
+from .models import SolicitudAudit
+
+COLUMNAS = ["id", "solicitud_id", "previo", "nuevo", "cambiado_por_id", "fecha", "comentario"]
+CHUNK_SIZE = 5000
+
+
+def meses_a_archivar(antes_de, using="default"):
+    """Meses (primer día) con auditorías anteriores a ``antes_de``."""
+    return list(SolicitudAudit.objects.using(using).entre(hasta=antes_de).dates("fecha", "month"))
+
+
+def archivar_mes(mes, directorio, using="default", borrar=True):
+    """
+    Exporta las auditorías del mes a ``directorio`` y, con ``borrar``, elimina
+    exactamente las filas exportadas. Devuelve ``(ruta, filas)``.
+
+    El archivo se escribe con un nombre temporal y toma su nombre final
+    recién cuando la transacción confirma: si el borrado falla no queda un
+    archivo que bloquee el próximo intento.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f"solicitudaudit_{mes:%Y_%m}.csv.gz"
+    ruta = os.path.join(directorio, nombre)
+    # Nunca se pisa un archivo de un archivado anterior
+    if os.path.exists(ruta):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), ruta)
+    exportadas = []
+
+    def filas():
+        for fila in SolicitudAudit.objects.using(using).del_mes(mes).order_by("id").values_list(
+                *COLUMNAS).iterator(chunk_size=CHUNK_SIZE):
+            exportadas.append(fila[0])
+            yield fila
+
+    with tempfile.NamedTemporaryFile(dir=directorio, prefix=f".{nombre}.", suffix=".tmp",
+                                     delete=False) as destino:
+        temporal = destino.name
+    try:
+        with transaction.atomic(using=using):
+            with open(temporal, "wb") as destino:
+                for datos in comprimir_gzip(filas_csv(COLUMNAS, filas())):
+                    destino.write(datos)
+            if borrar:
+                for inicio in range(0, len(exportadas), CHUNK_SIZE):
+                    SolicitudAudit.objects.using(using).filter(
+                        pk__in=exportadas[inicio:inicio + CHUNK_SIZE]).delete()
+            transaction.on_commit(lambda: os.rename(temporal, ruta), using=using)
+    except BaseException:
+        os.remove(temporal)
+        raise
+    return ruta, len(exportadas)
@@ -0,0 +1,83 @@
+"""
+Catálogos consultables por autocompletado (endpoint ``core:autocompletar``).
+
+Cada catálogo define su queryset base, los campos de búsqueda (ver
+core/busqueda.py) y el texto que se muestra en el <select>. Los widgets de
+core/widgets.py y static/js/autocompletar.js los usan para no renderizar el
+catálogo completo como <option> en cada formulario.
+"""
+from django.contrib.auth import get_user_model
+
+from administrador.models import Rol
+from .busqueda import CAMPOS_BUSQUEDA, buscar
+from .models import Colonia, Departamento, Distrito
+
+User = get_user_model()
+
+POR_PAGINA = 20
+
+
+def _con_codigo(obj):
+    return f"{obj.codigo}. {obj.nombre}" if obj.codigo else obj.nombre
+
+
+CATALOGOS = {
+    "departamento": {
+        "queryset": lambda: Departamento.objects.all(),
+        "campos": CAMPOS_BUSQUEDA[Departamento],
+        "orden": ("codigo", "nombre"),
+        "texto": _con_codigo,
+    },
+    "distrito": {
+        "queryset": lambda: Distrito.objects.select_related("departamento"),
+        "campos": CAMPOS_BUSQUEDA[Distrito],
+        "orden": ("nombre", "departamento__nombre"),
+        "texto": lambda d: f"{d.nombre} - {d.departamento.nombre}",
+    },
+    "colonia": {
+        "queryset": lambda: Colonia.objects.all(),
+        "campos": CAMPOS_BUSQUEDA[Colonia],
+        "orden": ("nombre",),
+        "texto": _con_codigo,
+    },
+    "usuario": {
+        "queryset": lambda: User.objects.filter(is_active=True).only(
+            "id", "username", "first_name", "last_name"),
+        "campos": ("username", "first_name", "last_name", "email"),
+        "orden": ("username",),
+        "texto": lambda u: u.get_full_name() or u.username,
+    },
+    "rol": {
+        "queryset": lambda: Rol.objects.only("id", "nombre"),
+        "campos": ("nombre",),
+        "orden": ("nombre",),
+        "texto": lambda r: r.nombre,
+    },
+}
+
+
+def opciones(catalogo, objetos):
+    texto = CATALOGOS[catalogo]["texto"]
+    return [{"id": obj.pk, "texto": texto(obj)} for obj in objetos]
+
+
+def autocompletar(catalogo, q="", pagina=1, ids=None):
+    """
+    Devuelve ``(resultados, hay_mas)`` para una página del catálogo.
+
+    Con ``ids`` resuelve los textos de valores ya seleccionados (sin paginar).
+    Sin ``q`` lista el catálogo en su orden natural; con ``q`` ordena por
+    relevancia. Pide una fila de más para saber si hay otra página sin COUNT.
+    """
+    definicion = CATALOGOS[catalogo]
+    qs = definicion["queryset"]()
+    if ids is not None:
+        return opciones(catalogo, qs.filter(pk__in=ids).order_by(*definicion["orden"])), False
+
+    if q:
+        qs = buscar(qs, q, definicion["campos"]).order_by("-relevancia", *definicion["orden"])
+    else:
+        qs = qs.order_by(*definicion["orden"])
+    inicio = (pagina - 1) * POR_PAGINA
+    filas = list(qs[inicio:inicio + POR_PAGINA + 1])
+    return opciones(catalogo, filas[:POR_PAGINA]), len(filas) > POR_PAGINA
@@ -0,0 +1,18 @@
+"""
+Locks por clave hasta el fin de la transacción.
+
+En PostgreSQL son advisory locks (``pg_advisory_xact_lock``) sobre el hash de
+la clave; en otros motores la propia transacción de escritura ya serializa.
+"""
+from django.db import connections
+
+
+def bloquear_ambito(using, clave):
+    """
+    Serializa las transacciones que usan la misma ``clave`` (p. ej. la
+    asignación de códigos de un ámbito) hasta que la actual termine.
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [clave])
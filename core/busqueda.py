@@ -0,0 +1,116 @@
+"""
+Búsqueda del catálogo territorial sin distinguir acentos ni mayúsculas y
+tolerante a errores de tipeo ("SAN JOSE" encuentra "SAN JOSÉ").
+
+En PostgreSQL se apoya en ``unaccent`` + ``pg_trgm``: la función inmutable
+``core_normalizar(text)`` (migración 0011) quita acentos y pasa a minúsculas,
+y los índices GIN ``gin_trgm_ops`` sobre esa expresión resuelven tanto el
+``LIKE '%texto%'`` como el operador de similitud ``%``. La relevancia es la
+similitud de trigramas del mejor campo.
+
+En otros motores (SQLite en los tests) se usa el mismo criterio calculado en
+Python, así los resultados coinciden sin depender de extensiones.
+"""
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import Case, CharField, FloatField, Func, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Colonia, Departamento, Distrito
+
+# Umbral por defecto de pg_trgm (pg_trgm.similarity_threshold), el que usa el operador %
+UMBRAL_SIMILITUD = 0.3
+
+# Campos en los que busca cada modelo del catálogo
+CAMPOS_BUSQUEDA = {
+    Departamento: ("nombre",),
+    Distrito: ("nombre", "departamento__nombre"),
+    Colonia: ("nombre", "finca_matriz", "padron_matriz"),
+}
+
+
+class Normalizar(Func):
+    """``core_normalizar(campo)``: sin acentos y en minúsculas (solo PostgreSQL)."""
+    function = "core_normalizar"
+    output_field = CharField()
+
+
+class Similitud(Func):
+    function = "similarity"
+    output_field = FloatField()
+
+
+# ===============================
+# NORMALIZACIÓN Y TRIGRAMAS EN PYTHON
+# ===============================
+def normalizar(texto):
+    """Equivalente en Python de ``core_normalizar``."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower().strip()
+
+
+def trigramas(texto):
+    """Trigramas de cada palabra con el mismo relleno que usa pg_trgm."""
+    resultado = set()
+    for palabra in re.findall(r"\w+", normalizar(texto)):
+        palabra = f"  {palabra} "
+        resultado.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return resultado
+
+
+def similitud(a, b):
+    """Igual que ``similarity()`` de pg_trgm: trigramas compartidos / totales."""
+    ta, tb = trigramas(a), trigramas(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+# ===============================
+# API PÚBLICA
+# ===============================
+def buscar(queryset, texto, campos):
+    """
+    Filtra ``queryset`` por ``texto`` en ``campos`` (admite lookups como
+    ``departamento__nombre``) y anota ``relevancia`` entre 0 y 1.
+
+    Una fila coincide si algún campo normalizado contiene el texto normalizado
+    o si su similitud de trigramas alcanza ``UMBRAL_SIMILITUD``. El orden queda a cargo
+    del llamador (normalmente ``order_by("-relevancia", ...)``).
+    """
+    texto = normalizar(texto)
+    if not texto:
+        return queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
+    if connections[queryset.db].vendor == "postgresql":
+        return _buscar_postgres(queryset, texto, campos)
+    return _buscar_python(queryset, texto, campos)
+
+
+def _buscar_postgres(queryset, texto, campos):
+    alias = {f"_norm_{i}": Normalizar(campo) for i, campo in enumerate(campos)}
+    condicion = Q()
+    for nombre in alias:
+        condicion |= Q(**{f"{nombre}__contains": texto})
+        condicion |= Q(**{f"{nombre}__trigram_similar": texto})
+    similitudes = [Similitud(expresion, Value(texto)) for expresion in alias.values()]
+    relevancia = Greatest(*similitudes) if len(similitudes) > 1 else similitudes[0]
+    return queryset.alias(**alias).filter(condicion).annotate(relevancia=relevancia)
+
+
+def _buscar_python(queryset, texto, campos):
+    puntajes = {}
+    for pk, *valores in queryset.values_list("pk", *campos).iterator():
+        mejor = max((similitud(valor, texto) for valor in valores if valor), default=0.0)
+        if mejor >= UMBRAL_SIMILITUD or any(texto in normalizar(valor) for valor in valores if valor):
+            # Un campo puede repetirse por los joins; nos quedamos con el mejor puntaje
+            puntajes[pk] = max(mejor, puntajes.get(pk, 0.0))
+    if not puntajes:
+        return queryset.none().annotate(relevancia=Value(0.0, output_field=FloatField()))
+    return queryset.filter(pk__in=puntajes).annotate(relevancia=Case(
+        *[When(pk=pk, then=Value(puntaje)) for pk, puntaje in puntajes.items()],
+        default=Value(0.0), output_field=FloatField(),
+    ))
@@ -0,0 +1,71 @@
+"""
+Opciones cacheadas del catálogo territorial para selects completos.
+
+Las listas de departamentos y de distritos agrupados por departamento se
+construyen una vez por versión del catálogo y se comparten entre requests.
+La versión cambia cada vez que se guarda o elimina un Departamento o un
+Distrito (ver ``conectar_senales``), así nunca se sirve una lista vieja.
+
+Con varios procesos la nueva versión solo llega a todos con una caché
+compartida (``CACHE_COMPARTIDA`` en settings); sin ella cada proceso tiene su
+copia y las listas viven pocos minutos.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Departamento, Distrito
+
+CLAVE_VERSION = "core:catalogo:version"
+TIMEOUT = 60 * 60 * 24 if getattr(settings, "CACHE_COMPARTIDA", False) else 60 * 5
+
+
+def version_catalogo():
+    """Versión del catálogo; cambia con cada alta, edición o baja."""
+    return cache.get_or_set(CLAVE_VERSION, lambda: uuid.uuid4().hex, None)
+
+
+def nueva_version_catalogo(**kwargs):
+    # Después del commit, para que nadie cachee datos de una transacción revertida
+    transaction.on_commit(lambda: cache.set(CLAVE_VERSION, uuid.uuid4().hex, None))
+
+
+def cacheado(nombre, construir):
+    """Valor de ``construir()`` cacheado para la versión actual del catálogo."""
+    return cache.get_or_set(f"core:catalogo:{version_catalogo()}:{nombre}", construir, TIMEOUT)
+
+
+def opciones_departamentos():
+    """``[(id, "código. nombre"), ...]`` en el orden del modelo."""
+    return cacheado("departamentos", lambda: [
+        (pk, f"{codigo}. {nombre}" if codigo else nombre)
+        for pk, codigo, nombre in Departamento.objects.values_list("id", "codigo", "nombre")
+    ])
+
+
+def opciones_distritos():
+    """Distritos agrupados por departamento: ``[(departamento, [(id, nombre), ...]), ...]``."""
+    def construir():
+        grupos = []
+        distritos = Distrito.objects.select_related("departamento").order_by(
+            "departamento__codigo", "departamento__nombre", "nombre")
+        for distrito in distritos:
+            departamento = distrito.departamento.nombre
+            if not grupos or grupos[-1][0] != departamento:
+                grupos.append((departamento, []))
+            grupos[-1][1].append((distrito.pk, distrito.nombre))
+        return grupos
+    return cacheado("distritos", construir)
+
+
+def conectar_senales():
+    for modelo in (Departamento, Distrito):
+        post_save.connect(
+            nueva_version_catalogo, sender=modelo,
+            dispatch_uid=f"catalogo_guardado_{modelo._meta.label_lower}")
+        post_delete.connect(
+            nueva_version_catalogo, sender=modelo,
+            dispatch_uid=f"catalogo_eliminado_{modelo._meta.label_lower}")
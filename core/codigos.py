@@ -0,0 +1,258 @@
+from django.apps import apps
+from django.db import IntegrityError, router, transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete
+
+from .bloqueos import bloquear_ambito
+
+# Cantidad de intentos antes de propagar un IntegrityError por código repetido
+MAX_REINTENTOS = 5
+
+
+# ===============================
+# RANGOS DE CÓDIGOS LIBRES
+# ===============================
+def rangos_libres(codigos):
+    """
+    Recorre códigos ordenados de forma ascendente y devuelve los huecos como
+    tuplas ``(desde, hasta)``. No incluye el rango abierto después del máximo.
+    """
+    esperado = 1
+    for codigo in codigos:
+        if codigo is None or codigo < esperado:
+            continue
+        if codigo > esperado:
+            yield (esperado, codigo - 1)
+        esperado = codigo + 1
+
+
+def _libres(modelo, ambito, using):
+    CodigoLibre = apps.get_model("core", "CodigoLibre")
+    return CodigoLibre.objects.using(using).filter(
+        modelo=modelo._meta.label_lower, ambito=ambito)
+
+
+def registrar_libres(modelo, ambito, desde, hasta, using="default"):
+    """
+    Agrega el rango ``desde..hasta`` a los códigos libres del ámbito, unido a
+    los rangos vecinos o superpuestos: la tabla no crece con cada baja.
+    """
+    if desde is None or hasta is None or desde > hasta:
+        return
+    CodigoLibre = apps.get_model("core", "CodigoLibre")
+    with transaction.atomic(using=using):
+        bloquear_ambito(using, f"{modelo._meta.label_lower}:{ambito}")
+        libres = _libres(modelo, ambito, using)
+        vecinos = list(libres.filter(desde__lte=hasta + 1, hasta__gte=desde - 1).order_by("desde"))
+        if not vecinos:
+            CodigoLibre.objects.using(using).create(
+                modelo=modelo._meta.label_lower, ambito=ambito, desde=desde, hasta=hasta)
+            return
+        primero = vecinos[0]
+        libres.filter(pk=primero.pk).update(
+            desde=min(desde, primero.desde), hasta=max(hasta, *(v.hasta for v in vecinos)))
+        libres.filter(pk__in=[v.pk for v in vecinos[1:]]).delete()
+
+
+# ===============================
+# MIXIN PARA MODELOS CON CÓDIGO AUTOMÁTICO
+# ===============================
+class CodigoAutomaticoMixin:
+    """
+    Asigna el primer código libre al guardar si el objeto no tiene uno.
+
+    Los huecos se mantienen en ``CodigoLibre`` (se registran al eliminar o
+    cambiar un código), así que asignar cuesta un par de lecturas por índice
+    sin importar el tamaño de la tabla.
+
+    ``codigo_ambito`` indica los campos que delimitan la numeración
+    (p. ej. ``("area",)`` para Objetivo); vacío significa numeración global.
+    """
+    codigo_campo = "codigo"
+    codigo_ambito = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._codigo_original = instance._codigo_estado()
+        return instance
+
+    def _codigo_estado(self):
+        return (self.codigo_ambito_clave(), getattr(self, self.codigo_campo, None))
+
+    def codigo_ambito_clave(self):
+        return ":".join(
+            str(getattr(self, self._meta.get_field(campo).attname))
+            for campo in self.codigo_ambito
+        )
+
+    def _codigo_queryset(self, using):
+        # attname (``area_id``): sin cargar el objeto relacionado
+        filtros = {}
+        for campo in self.codigo_ambito:
+            attname = self._meta.get_field(campo).attname
+            filtros[attname] = getattr(self, attname)
+        return self.__class__._default_manager.using(using).filter(**filtros)
+
+    def _codigo_en_uso(self, using, codigo):
+        # La fila propia todavía tiene el código anterior: puede recibirlo de nuevo
+        return self._codigo_queryset(using).filter(
+            **{self.codigo_campo: codigo}).exclude(pk=self.pk).exists()
+
+    def _codigo_maximo(self, using):
+        return self._codigo_queryset(using).aggregate(m=Max(self.codigo_campo))["m"] or 0
+
+    def asignar_codigo(self, using):
+        """Bloquea el ámbito y asigna el primer código libre (requiere transacción)."""
+        ambito = self.codigo_ambito_clave()
+        bloquear_ambito(using, f"{self._meta.label_lower}:{ambito}")
+        libres = _libres(self.__class__, ambito, using)
+
+        while True:
+            rango = libres.order_by("desde").first()
+            if rango is None:
+                codigo = self._codigo_maximo(using) + 1
+                break
+            codigo = rango.desde
+            if rango.desde >= rango.hasta:
+                rango.delete()
+            else:
+                libres.filter(pk=rango.pk).update(desde=rango.desde + 1)
+            # Un código cargado a mano puede haber ocupado un hueco registrado
+            if not self._codigo_en_uso(using, codigo):
+                break
+
+        setattr(self, self.codigo_campo, codigo)
+
+    def _registrar_cambio_manual(self, using):
+        """Registra los huecos que deja un código cargado o modificado a mano."""
+        ambito, codigo = self._codigo_estado()
+        original = getattr(self, "_codigo_original", (None, None))
+        if original == (ambito, codigo):
+            return
+        bloquear_ambito(using, f"{self._meta.label_lower}:{ambito}")
+        maximo = self._codigo_maximo(using)
+        if codigo > maximo + 1:
+            registrar_libres(self.__class__, ambito, maximo + 1, codigo - 1, using)
+        if original[1]:
+            registrar_libres(self.__class__, original[0], original[1], original[1], using)
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(self.__class__, instance=self)
+
+        if getattr(self, self.codigo_campo):
+            with transaction.atomic(using=using):
+                self._registrar_cambio_manual(using)
+                super().save(*args, **kwargs)
+            self._codigo_original = self._codigo_estado()
+            return
+
+        for intento in range(MAX_REINTENTOS):
+            try:
+                with transaction.atomic(using=using):
+                    original = getattr(self, "_codigo_original", (None, None))
+                    if original[1]:
+                        registrar_libres(self.__class__, original[0],
+                                         original[1], original[1], using)
+                    self.asignar_codigo(using)
+                    super().save(*args, **kwargs)
+                self._codigo_original = self._codigo_estado()
+                return
+            except IntegrityError:
+                codigo = getattr(self, self.codigo_campo)
+                setattr(self, self.codigo_campo, None)
+                # Solo se reintenta si el conflicto fue por el código asignado
+                if not self._codigo_en_uso(using, codigo) or intento == MAX_REINTENTOS - 1:
+                    raise
+
+
+# ===============================
+# SEÑALES Y RECONSTRUCCIÓN
+# ===============================
+def liberar_codigo(sender, instance, using, **kwargs):
+    codigo = getattr(instance, instance.codigo_campo, None)
+    if codigo:
+        registrar_libres(sender, instance.codigo_ambito_clave(), codigo, codigo, using)
+
+
+def modelos_con_codigo():
+    return [
+        modelo for modelo in apps.get_models()
+        if issubclass(modelo, CodigoAutomaticoMixin)
+    ]
+
+
+def _ambitos_delimitados_por(sender):
+    """Modelos con código cuyo ámbito es un único campo que apunta a ``sender``."""
+    return [
+        modelo for modelo in modelos_con_codigo()
+        if len(modelo.codigo_ambito) == 1
+        and modelo._meta.get_field(modelo.codigo_ambito[0]).is_relation
+        and issubclass(sender, modelo._meta.get_field(modelo.codigo_ambito[0]).related_model)
+    ]
+
+
+def descartar_libres_ambito(sender, instance, using, **kwargs):
+    """
+    Al eliminar el objeto que delimita un ámbito (p. ej. un Área) sus huecos
+    ya no sirven: los objetivos borrados en cascada los registraron igual.
+    """
+    CodigoLibre = apps.get_model("core", "CodigoLibre")
+    for modelo in _ambitos_delimitados_por(sender):
+        CodigoLibre.objects.using(using).filter(
+            modelo=modelo._meta.label_lower, ambito=str(instance.pk)).delete()
+
+
+def conectar_senales():
+    delimitadores = set()
+    for modelo in modelos_con_codigo():
+        post_delete.connect(
+            liberar_codigo, sender=modelo,
+            dispatch_uid=f"liberar_codigo_{modelo._meta.label_lower}")
+        if len(modelo.codigo_ambito) == 1 and modelo._meta.get_field(modelo.codigo_ambito[0]).is_relation:
+            delimitadores.add(modelo._meta.get_field(modelo.codigo_ambito[0]).related_model)
+    for delimitador in delimitadores:
+        post_delete.connect(
+            descartar_libres_ambito, sender=delimitador,
+            dispatch_uid=f"descartar_libres_{delimitador._meta.label_lower}")
+
+
+def reconstruir_libres(modelo, using="default"):
+    """
+    Recalcula desde cero los rangos libres de un modelo recorriendo sus
+    códigos en orden. Devuelve la cantidad de rangos registrados.
+    """
+    CodigoLibre = apps.get_model("core", "CodigoLibre")
+    ambito_campos = [f"{campo}_id" if modelo._meta.get_field(campo).is_relation else campo
+                     for campo in modelo.codigo_ambito]
+    campo = modelo.codigo_campo
+
+    with transaction.atomic(using=using):
+        CodigoLibre.objects.using(using).filter(modelo=modelo._meta.label_lower).delete()
+        filas = (
+            modelo._default_manager.using(using)
+            .exclude(**{f"{campo}__isnull": True})
+            .order_by(*ambito_campos, campo)
+            .values_list(*ambito_campos, campo)
+        )
+        nuevos = []
+        ambito_actual, codigos = None, []
+        for fila in filas.iterator(chunk_size=5000):
+            ambito = ":".join(str(v) for v in fila[:-1])
+            if ambito != ambito_actual:
+                nuevos += _rangos(modelo, ambito_actual, codigos)
+                ambito_actual, codigos = ambito, []
+            codigos.append(fila[-1])
+        nuevos += _rangos(modelo, ambito_actual, codigos)
+        CodigoLibre.objects.using(using).bulk_create(nuevos, batch_size=1000)
+    return len(nuevos)
+
+
+def _rangos(modelo, ambito, codigos):
+    CodigoLibre = apps.get_model("core", "CodigoLibre")
+    if ambito is None:
+        return []
+    return [
+        CodigoLibre(modelo=modelo._meta.label_lower, ambito=ambito, desde=desde, hasta=hasta)
+        for desde, hasta in rangos_libres(codigos)
+    ]
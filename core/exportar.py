@@ -0,0 +1,233 @@
+"""
+Exportación del catálogo territorial y de las solicitudes a CSV o XLSX.
+
+Las filas se leen con ``QuerySet.iterator(chunk_size=...)`` y se escriben a
+medida que se generan, así la memoria no crece con la cantidad de registros:
+las vistas las envían con ``StreamingHttpResponse`` y el comando
+``exportar_catalogo`` directo a un archivo. Los filtros son los mismos de las
+listas (core/territorio.py).
+
+El XLSX se arma con la biblioteca estándar (zipfile + XML con celdas
+``inlineStr``), sin dependencias extra ni tabla de strings compartidos.
+"""
+import codecs
+import csv
+import re
+import zipfile
+import zlib
+from datetime import date, datetime
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from django.db.models import Count, Prefetch
+from django.utils import timezone
+
+from .models import Colonia, Departamento, Distrito, Solicitud
+from .territorio import filtrar_colonias, filtrar_departamentos, filtrar_distritos, filtrar_solicitudes
+
+CHUNK_SIZE = 2000
+FILAS_POR_ENVIO = 500
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+# ===============================
+# DEFINICIÓN DE LAS EXPORTACIONES
+# ===============================
+def _departamentos(parametros):
+    qs = filtrar_departamentos(Departamento.objects.order_by("codigo"), parametros)
+    filas = qs.annotate(num_distritos=Count("distritos")).values_list(
+        "codigo", "nombre", "num_distritos")
+    return ["Código", "Departamento", "Distritos"], filas.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _distritos(parametros):
+    qs = filtrar_distritos(Distrito.objects.order_by("departamento__codigo", "nombre", "id"), parametros)
+    filas = qs.annotate(num_colonias=Count("colonias")).values_list(
+        "departamento__codigo", "departamento__nombre", "codigo", "nombre", "num_colonias")
+    return (["Cód. departamento", "Departamento", "Código", "Distrito", "Colonias"],
+            filas.iterator(chunk_size=CHUNK_SIZE))
+
+
+def _colonias(parametros):
+    qs = filtrar_colonias(Colonia.objects.order_by("nombre"), parametros).prefetch_related(
+        Prefetch("distritos", queryset=Distrito.objects.select_related("departamento")))
+
+    def filas():
+        # Con chunk_size el prefetch se resuelve por bloque, no para toda la tabla
+        for colonia in qs.iterator(chunk_size=CHUNK_SIZE):
+            distritos = sorted(colonia.distritos.all(), key=lambda d: (d.departamento.nombre, d.nombre))
+            departamentos = list(dict.fromkeys(d.departamento.nombre for d in distritos))
+            yield (colonia.codigo, colonia.nombre, colonia.get_estado_display(),
+                   colonia.finca_matriz, colonia.padron_matriz,
+                   "; ".join(d.nombre for d in distritos), "; ".join(departamentos))
+
+    return (["Código", "Colonia", "Estado", "Finca matriz", "Padrón matriz", "Distritos", "Departamentos"],
+            filas())
+
+
+def _solicitudes(parametros):
+    qs = filtrar_solicitudes(Solicitud.objects.order_by("-fecha_creacion", "-id"), parametros)
+    estados, tipos = dict(Solicitud.ESTADOS), dict(Solicitud.TIPO_CHOICES)
+
+    def filas():
+        for fila in qs.values_list(
+            "id", "colonia__codigo", "colonia__nombre", "tipo", "estado", "creado_por__username",
+            "fecha_creacion", "fecha_actualizacion", "observaciones",
+        ).iterator(chunk_size=CHUNK_SIZE):
+            yield fila[:3] + (tipos.get(fila[3], fila[3]), estados.get(fila[4], fila[4])) + fila[5:]
+
+    return (["N°", "Cód. colonia", "Colonia", "Tipo", "Estado", "Creado por",
+             "Fecha de creación", "Última actualización", "Observaciones"], filas())
+
+
+EXPORTACIONES = {
+    "departamentos": _departamentos,
+    "distritos": _distritos,
+    "colonias": _colonias,
+    "solicitudes": _solicitudes,
+}
+
+
+def exportar(catalogo, formato, parametros, comprimir=False):
+    """
+    Generador de bytes con la exportación de ``catalogo`` en ``formato``.
+    ``parametros`` es un dict (o QueryDict) con los filtros de la lista.
+    ``comprimir`` envuelve la salida en gzip.
+    """
+    encabezados, filas = EXPORTACIONES[catalogo](parametros)
+    contenido = filas_csv(encabezados, filas) if formato == "csv" else filas_xlsx(encabezados, filas)
+    return comprimir_gzip(contenido) if comprimir else contenido
+
+
+def nombre_archivo(catalogo, formato, comprimir=False):
+    return f"{catalogo}_{timezone.localdate():%Y%m%d}.{formato}{'.gz' if comprimir else ''}"
+
+
+# ===============================
+# ESCRITORES
+# ===============================
+def _texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.localtime(valor)
+        return valor.strftime("%Y-%m-%d %H:%M")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en lugar de guardarlo."""
+
+    def write(self, valor):
+        return valor
+
+
+def filas_csv(encabezados, filas):
+    escritor = csv.writer(_Eco())
+    # BOM para que Excel reconozca UTF-8 (tildes y eñes)
+    yield codecs.BOM_UTF8
+    bloque = []
+    for numero, fila in enumerate(chain([encabezados], filas), start=1):
+        bloque.append(escritor.writerow([_texto(v) for v in fila]))
+        if numero % FILAS_POR_ENVIO == 0:
+            yield "".join(bloque).encode("utf-8")
+            bloque = []
+    yield "".join(bloque).encode("utf-8")
+
+
+class _Buffer:
+    """Destino de zipfile sin seek(): acumula bytes hasta que se vacían."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos, self._partes = b"".join(self._partes), []
+        return datos
+
+
+_CARACTERES_INVALIDOS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_FIJOS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Datos" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _celda(valor):
+    if valor is None:
+        return "<c/>"
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f"<c><v>{valor}</v></c>"
+    texto = escape(_CARACTERES_INVALIDOS.sub("", _texto(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def filas_xlsx(encabezados, filas):
+    salida = _Buffer()
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as libro:
+        for nombre, contenido in _XLSX_FIJOS.items():
+            libro.writestr(nombre, contenido)
+        with libro.open("xl/worksheets/sheet1.xml", "w") as hoja:
+            hoja.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for numero, fila in enumerate(chain([encabezados], filas), start=1):
+                hoja.write(f"<row>{''.join(_celda(v) for v in fila)}</row>".encode("utf-8"))
+                if numero % FILAS_POR_ENVIO == 0:
+                    yield salida.vaciar()
+            hoja.write(b"</sheetData></worksheet>")
+    yield salida.vaciar()
+
+
+def comprimir_gzip(contenido):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for datos in contenido:
+        comprimido = compresor.compress(datos)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
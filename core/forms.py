@@ -1,7 +1,10 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 import re
 from .models import Departamento, Distrito, Colonia, Solicitud
+from .catalogo import opciones_departamentos
+from .widgets import AutocompletarSelect, AutocompletarSelectMultiple, SelectCacheado
 
 
 # ===============================
@@ -77,7 +80,10 @@ class DistritoForm(forms.ModelForm):
         widgets = {
             'nombre': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Nombre del Distrito'}),
             'codigo': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Código único dentro del departamento'}),
-            'departamento': forms.Select(attrs={'class': 'form-select'}),
+            # Opciones cacheadas por versión del catálogo (core/catalogo.py)
+            'departamento': SelectCacheado(
+                opciones_departamentos, vacio='-- Seleccione un Departamento --',
+                attrs={'class': 'form-select'}),
         }
 
     def clean_nombre(self):
@@ -143,9 +149,10 @@ class DistritoForm(forms.ModelForm):
 #  FORMULARIO COLONIA
 # =============================
 class ColoniaForm(forms.ModelForm):
+    # Solo se renderizan los distritos elegidos; el resto se busca por autocompletado
     distritos = forms.ModelMultipleChoiceField(
-        queryset=Distrito.objects.all(),
-        widget=forms.SelectMultiple(attrs={'class': 'form-control'}),
+        queryset=Distrito.objects.select_related('departamento'),
+        widget=AutocompletarSelectMultiple('distrito', attrs={'class': 'form-control'}),
         required=True
     )
 
@@ -183,7 +190,7 @@ class SolicitudForm(forms.ModelForm):
         model = Solicitud
         fields = ["colonia", "tipo", "observaciones"]
         widgets = {
-            'colonia': forms.Select(attrs={'class': 'form-select'}),
+            'colonia': AutocompletarSelect('colonia', attrs={'class': 'form-select'}),
             'tipo': forms.Select(attrs={'class': 'form-select'}),
             'observaciones': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Observaciones'}),
         }
@@ -197,4 +204,21 @@ class SolicitudForm(forms.ModelForm):
             self.instance.full_clean(exclude=None)
         except forms.ValidationError as e:
             raise forms.ValidationError(e.messages)
-        return cleaned
\ No newline at end of file
+        return cleaned
+
+    def save(self, commit=True):
+        """
+        Si otra solicitud vigente se guardó entre la validación y el INSERT, el
+        índice único la rechaza: se informa como error del formulario
+        (``form.errors``) y se lanza ValidationError para que la vista lo muestre.
+        """
+        if not commit:
+            return super().save(commit=False)
+        try:
+            with transaction.atomic():
+                return super().save()
+        except IntegrityError as e:
+            if not Solicitud.es_duplicada(e):
+                raise
+            self.add_error(None, Solicitud.MENSAJE_DUPLICADA)
+            raise ValidationError(Solicitud.MENSAJE_DUPLICADA)
\ No newline at end of file
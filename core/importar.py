@@ -0,0 +1,512 @@
+"""
+Importación masiva de departamentos, distritos y colonias desde CSV o XLSX.
+
+El archivo se lee fila por fila (csv / iterparse del XML de la hoja) y se
+procesa en lotes: cada lote se valida contra diccionarios en memoria con los
+nombres y códigos existentes, armados con una consulta por catálogo al
+empezar, y se escribe con ``bulk_create(update_conflicts=True)``. Los
+vínculos colonia–distrito se reemplazan también en bloque. Las filas con
+errores no se importan y quedan en ``Importador.errores`` con su número de
+fila, para el reporte.
+
+Las columnas son las de las exportaciones (core/exportar.py), así un archivo
+exportado puede editarse y volver a importarse.
+"""
+import csv
+import io
+import re
+import zipfile
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from xml.etree.ElementTree import iterparse
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .bloqueos import bloquear_ambito
+from .busqueda import normalizar
+from .catalogo import nueva_version_catalogo
+from .codigos import rangos_libres, reconstruir_libres
+from .forms import validar_nombre_general, validar_nombre_letras
+from .models import Colonia, Departamento, Distrito
+from .territorio import reemplazar_distritos
+
+TAMANIO_LOTE = 5000
+BATCH_SIZE = 1000
+
+
+# ===============================
+# LECTURA DE ARCHIVOS
+# ===============================
+def leer_filas(archivo, nombre):
+    """
+    Recorre las filas (listas de textos) de un CSV o XLSX abierto en modo
+    binario. La primera fila son los encabezados.
+    """
+    if nombre.lower().endswith(".xlsx"):
+        return _filas_xlsx(archivo)
+    return _filas_csv(archivo)
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    yield from csv.reader(texto, dialecto)
+
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+def _primera_hoja(libro):
+    """Ruta dentro del zip de la primera hoja del libro."""
+    with libro.open("xl/workbook.xml") as xml:
+        for _evento, elemento in iterparse(xml):
+            if elemento.tag == f"{_NS}sheet":
+                rid = elemento.get(f"{_NS_REL}id")
+                break
+        else:
+            raise ValueError("El libro no tiene hojas.")
+    with libro.open("xl/_rels/workbook.xml.rels") as xml:
+        for _evento, elemento in iterparse(xml):
+            if elemento.get("Id") == rid:
+                destino = elemento.get("Target").lstrip("/")
+                return destino if destino.startswith("xl/") else f"xl/{destino}"
+    raise ValueError("No se encontró la primera hoja del libro.")
+
+
+def _columna(referencia):
+    """'C12' -> 2"""
+    indice = 0
+    for letra in re.match(r"[A-Z]+", referencia).group():
+        indice = indice * 26 + ord(letra) - 64
+    return indice - 1
+
+
+def _filas_xlsx(archivo):
+    with zipfile.ZipFile(archivo) as libro:
+        compartidos = []
+        if "xl/sharedStrings.xml" in libro.namelist():
+            with libro.open("xl/sharedStrings.xml") as xml:
+                for _evento, elemento in iterparse(xml):
+                    if elemento.tag == f"{_NS}si":
+                        compartidos.append("".join(t.text or "" for t in elemento.iter(f"{_NS}t")))
+                        elemento.clear()
+
+        with libro.open(_primera_hoja(libro)) as xml:
+            for _evento, fila in iterparse(xml):
+                if fila.tag != f"{_NS}row":
+                    continue
+                valores = []
+                for celda in fila.iter(f"{_NS}c"):
+                    if celda.get("r"):
+                        valores.extend([""] * (_columna(celda.get("r")) - len(valores)))
+                    tipo = celda.get("t")
+                    if tipo == "inlineStr":
+                        valor = "".join(t.text or "" for t in celda.iter(f"{_NS}t"))
+                    else:
+                        v = celda.find(f"{_NS}v")
+                        valor = v.text if v is not None and v.text is not None else ""
+                        if tipo == "s" and valor:
+                            valor = compartidos[int(valor)]
+                    valores.append(valor)
+                # Liberar la fila ya leída mantiene la memoria constante
+                fila.clear()
+                yield valores
+
+
+# ===============================
+# AUXILIARES DE VALIDACIÓN
+# ===============================
+def _clave_encabezado(texto):
+    return re.sub(r"[^a-z0-9]+", " ", normalizar(texto)).strip()
+
+
+def _entero(valor, campo, requerido=True):
+    valor = (valor or "").strip()
+    if not valor:
+        if requerido:
+            raise ValidationError(f"{campo}: es obligatorio.")
+        return None
+    try:
+        numero = float(valor)
+    except ValueError:
+        raise ValidationError(f"{campo}: «{valor}» no es un número.")
+    if numero != int(numero) or numero < 1:
+        raise ValidationError(f"{campo}: debe ser un número entero positivo.")
+    return int(numero)
+
+
+def _mensajes(error):
+    return error.messages if isinstance(error, ValidationError) else [str(error)]
+
+
+# ===============================
+# IMPORTADORES
+# ===============================
+class Importador(ABC):
+    """
+    Recorre las filas en lotes, valida cada lote en memoria y lo guarda.
+    Las subclases definen ``columnas`` (encabezado normalizado -> clave),
+    ``requeridas``, ``cargar_existentes``, ``validar`` y ``guardar``.
+    """
+    modelo = None
+    columnas = {}
+    requeridas = ()
+
+    def __init__(self, using="default", dry_run=False):
+        self.using = using
+        self.dry_run = dry_run
+        self.errores = []  # [(fila, mensaje), ...]
+        self.creados = 0
+        self.actualizados = 0
+        self.procesadas = 0
+
+    def error(self, fila, mensaje):
+        self.errores.append((fila, mensaje))
+
+    def ejecutar(self, filas):
+        """Importa las filas (la primera, encabezados) y devuelve ``self``."""
+        filas = iter(filas)
+        encabezados = [self.columnas.get(_clave_encabezado(h)) for h in next(filas, [])]
+        faltantes = [c for c in self.requeridas if c not in encabezados]
+        if faltantes:
+            self.error(1, f"Faltan columnas obligatorias: {', '.join(faltantes)}.")
+            return self
+
+        with transaction.atomic(using=self.using):
+            self.cargar_existentes()
+            lote = []
+            for numero, valores in enumerate(filas, start=2):
+                if not any((v or "").strip() for v in valores):
+                    continue
+                datos = {c: (v or "").strip() for c, v in zip(encabezados, valores) if c}
+                self.procesadas += 1
+                try:
+                    objeto = self.validar(numero, datos)
+                except ValidationError as e:
+                    for mensaje in _mensajes(e):
+                        self.error(numero, mensaje)
+                    continue
+                lote.append(objeto)
+                if len(lote) >= TAMANIO_LOTE:
+                    self.guardar(lote)
+                    lote = []
+            if lote:
+                self.guardar(lote)
+            self.finalizar()
+            if self.dry_run:
+                transaction.set_rollback(True, using=self.using)
+        return self
+
+    @abstractmethod
+    def cargar_existentes(self):
+        """Lee de una vez lo que ya existe en la base para validar sin consultas por fila."""
+
+    @abstractmethod
+    def validar(self, numero, datos):
+        """Devuelve el objeto de la fila ``numero`` o lanza ValidationError."""
+
+    @abstractmethod
+    def guardar(self, lote):
+        """Crea o actualiza los objetos validados del lote."""
+
+    def finalizar(self):
+        """Ajustes después del último lote (opcional)."""
+
+    def resumen(self):
+        return {
+            "procesadas": self.procesadas,
+            "creados": self.creados,
+            "actualizados": self.actualizados,
+            "errores": len(self.errores),
+            "dry_run": self.dry_run,
+        }
+
+
+class ImportadorDepartamentos(Importador):
+    modelo = Departamento
+    columnas = {"codigo": "codigo", "departamento": "nombre", "nombre": "nombre"}
+    requeridas = ("nombre", "codigo")
+
+    def cargar_existentes(self):
+        bloquear_ambito(self.using, "core.departamento:")
+        self.codigos = dict(Departamento.objects.using(self.using).values_list("nombre", "codigo"))
+        self.nombres = {codigo: nombre for nombre, codigo in self.codigos.items() if codigo}
+        # Igual que DepartamentoForm (nombre__iexact): "Central" ya es "CENTRAL"
+        self.guardados = {nombre.upper(): nombre for nombre in self.codigos}
+        self.vistos = {}
+        self.codigos_archivo = {}
+
+    def validar(self, numero, datos):
+        nombre = validar_nombre_letras(datos.get("nombre", ""))
+        nombre = self.guardados.get(nombre, nombre)
+        codigo = _entero(datos.get("codigo"), "Código")
+        if nombre in self.vistos:
+            raise ValidationError(f'El Departamento "{nombre}" está repetido (fila {self.vistos[nombre]}).')
+        if codigo in self.codigos_archivo:
+            raise ValidationError(f'El código "{codigo}" está repetido (fila {self.codigos_archivo[codigo]}).')
+        otro = self.nombres.get(codigo)
+        if otro and otro != nombre:
+            raise ValidationError(f'El código "{codigo}" ya está asignado al departamento "{otro}".')
+        self.vistos[nombre] = self.codigos_archivo[codigo] = numero
+        return Departamento(nombre=nombre, codigo=codigo)
+
+    def guardar(self, lote):
+        for obj in lote:
+            if obj.nombre in self.codigos:
+                self.actualizados += 1
+                self.nombres.pop(self.codigos[obj.nombre], None)
+            else:
+                self.creados += 1
+            self.codigos[obj.nombre] = obj.codigo
+            self.nombres[obj.codigo] = obj.nombre
+        Departamento.objects.using(self.using).bulk_create(
+            lote, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=["nombre"], update_fields=["codigo"])
+
+    def finalizar(self):
+        if not self.dry_run:
+            reconstruir_libres(Departamento, using=self.using)
+            nueva_version_catalogo()
+
+
+class ImportadorDistritos(Importador):
+    modelo = Distrito
+    columnas = {
+        "cod departamento": "departamento_codigo", "codigo departamento": "departamento_codigo",
+        "departamento": "departamento", "codigo": "codigo", "distrito": "nombre", "nombre": "nombre",
+    }
+    requeridas = ("nombre", "codigo")
+
+    def cargar_existentes(self):
+        departamentos = list(Departamento.objects.using(self.using).values_list("id", "codigo", "nombre"))
+        self.deptos_codigo = {codigo: (pk, nombre) for pk, codigo, nombre in departamentos if codigo}
+        self.deptos_nombre = {normalizar(nombre): (pk, nombre) for pk, _codigo, nombre in departamentos}
+        distritos = Distrito.objects.using(self.using).values_list("departamento_id", "codigo", "nombre")
+        self.por_codigo = {(d, codigo): nombre for d, codigo, nombre in distritos}
+        # Nombres en mayúsculas, como compara DistritoForm (nombre__iexact)
+        self.por_nombre = {(d, nombre.upper()): codigo for (d, codigo), nombre in self.por_codigo.items()}
+        self.vistos = {}
+        self.nombres_archivo = {}
+
+    def departamento(self, datos):
+        codigo = _entero(datos.get("departamento_codigo"), "Cód. departamento", requerido=False)
+        nombre = datos.get("departamento", "")
+        if codigo:
+            if codigo not in self.deptos_codigo:
+                raise ValidationError(f"No existe un departamento con código {codigo}.")
+            pk, existente = self.deptos_codigo[codigo]
+            if nombre and normalizar(nombre) != normalizar(existente):
+                raise ValidationError(
+                    f'El departamento {codigo} es "{existente}", no "{nombre.upper()}".')
+            return pk, existente
+        if not nombre:
+            raise ValidationError("Debe indicar el departamento (código o nombre).")
+        if normalizar(nombre) not in self.deptos_nombre:
+            raise ValidationError(f'No existe el departamento "{nombre.upper()}".')
+        return self.deptos_nombre[normalizar(nombre)]
+
+    def validar(self, numero, datos):
+        nombre = datos.get("nombre", "").upper()
+        if len(nombre) < 3:
+            raise ValidationError("El nombre debe tener al menos 3 caracteres.")
+        codigo = _entero(datos.get("codigo"), "Código")
+        departamento_id, departamento = self.departamento(datos)
+
+        clave = (departamento_id, codigo)
+        if clave in self.vistos:
+            raise ValidationError(
+                f'El código {codigo} del departamento "{departamento}" está repetido (fila {self.vistos[clave]}).')
+        if (departamento_id, nombre) in self.nombres_archivo:
+            raise ValidationError(
+                f'El distrito "{nombre}" del departamento "{departamento}" está repetido '
+                f'(fila {self.nombres_archivo[(departamento_id, nombre)]}).')
+        otro_codigo = self.por_nombre.get((departamento_id, nombre))
+        if otro_codigo is not None and otro_codigo != codigo:
+            raise ValidationError(
+                f'Ya existe un distrito llamado "{nombre}" en el departamento "{departamento}" '
+                f'(código {otro_codigo}).')
+        self.vistos[clave] = self.nombres_archivo[(departamento_id, nombre)] = numero
+        return Distrito(nombre=nombre, codigo=codigo, departamento_id=departamento_id)
+
+    def guardar(self, lote):
+        for obj in lote:
+            clave = (obj.departamento_id, obj.codigo)
+            if clave in self.por_codigo:
+                self.actualizados += 1
+                self.por_nombre.pop((obj.departamento_id, self.por_codigo[clave].upper()), None)
+            else:
+                self.creados += 1
+            self.por_codigo[clave] = obj.nombre
+            self.por_nombre[(obj.departamento_id, obj.nombre.upper())] = obj.codigo
+        Distrito.objects.using(self.using).bulk_create(
+            lote, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=["departamento", "codigo"], update_fields=["nombre"])
+
+    def finalizar(self):
+        if not self.dry_run:
+            nueva_version_catalogo()
+
+
+class ImportadorColonias(Importador):
+    modelo = Colonia
+    columnas = {
+        "codigo": "codigo", "colonia": "nombre", "nombre": "nombre", "estado": "estado",
+        "finca matriz": "finca_matriz", "padron matriz": "padron_matriz",
+        "distritos": "distritos", "departamentos": "departamentos",
+    }
+    requeridas = ("nombre",)
+
+    def cargar_existentes(self):
+        bloquear_ambito(self.using, "core.colonia:")
+        self.colonias = {
+            nombre: (pk, codigo)
+            for pk, nombre, codigo in Colonia.objects.using(self.using).values_list("id", "nombre", "codigo")
+        }
+        self.codigos = {codigo: nombre for nombre, (_pk, codigo) in self.colonias.items() if codigo}
+        # Igual que ColoniaForm (nombre__iexact): se actualiza la fila guardada
+        self.guardadas = {nombre.upper(): nombre for nombre in self.colonias}
+        # nombre normalizado del distrito -> [(departamento normalizado, id), ...]
+        self.distritos = defaultdict(list)
+        self.departamento_de = {}
+        for pk, nombre, departamento_id, departamento in Distrito.objects.using(self.using).values_list(
+                "id", "nombre", "departamento_id", "departamento__nombre"):
+            self.distritos[normalizar(nombre)].append((normalizar(departamento), pk))
+            self.departamento_de[pk] = departamento_id
+        self.estados = {}
+        for valor, etiqueta in Colonia.ESTADO_CHOICES:
+            self.estados[normalizar(valor)] = self.estados[normalizar(etiqueta)] = valor
+        self.vistos = {}
+        self.codigos_archivo = {}
+        self.vinculos = {}  # colonia -> [distrito_id, ...] del lote en curso
+        self._libres = None
+
+    def distritos_de(self, datos):
+        nombres = [n.strip() for n in datos.get("distritos", "").split(";") if n.strip()]
+        departamentos = {normalizar(d) for d in datos.get("departamentos", "").split(";") if d.strip()}
+        ids = []
+        for nombre in nombres:
+            candidatos = self.distritos.get(normalizar(nombre), [])
+            if departamentos:
+                candidatos = [c for c in candidatos if c[0] in departamentos]
+            if not candidatos:
+                raise ValidationError(f'No existe el distrito "{nombre.upper()}".')
+            if len(candidatos) > 1:
+                raise ValidationError(
+                    f'Hay varios distritos "{nombre.upper()}"; indique el departamento en la columna Departamentos.')
+            ids.append(candidatos[0][1])
+        return ids
+
+    def validar(self, numero, datos):
+        nombre = validar_nombre_general(datos.get("nombre", ""))
+        if len(nombre) < 3:
+            raise ValidationError("El nombre debe tener al menos 3 caracteres.")
+        nombre = self.guardadas.get(nombre, nombre)
+        if nombre in self.vistos:
+            raise ValidationError(f'La Colonia "{nombre}" está repetida (fila {self.vistos[nombre]}).')
+        codigo = _entero(datos.get("codigo"), "Código", requerido=False)
+        if codigo in self.codigos_archivo:
+            raise ValidationError(f"El código {codigo} está repetido (fila {self.codigos_archivo[codigo]}).")
+        otra = self.codigos.get(codigo)
+        if codigo and otra and otra != nombre:
+            raise ValidationError(f"Ya existe una colonia con el código {codigo} ({otra}).")
+
+        estado = datos.get("estado")
+        if estado:
+            if normalizar(estado) not in self.estados:
+                raise ValidationError(f"Estado inválido: «{estado}».")
+            estado = self.estados[normalizar(estado)]
+        else:
+            estado = "activo"
+
+        distritos = self.distritos_de(datos)
+        if not distritos and nombre not in self.colonias:
+            raise ValidationError("La colonia debe estar asociada a al menos un distrito.")
+
+        self.vistos[nombre] = numero
+        if codigo:
+            self.codigos_archivo[codigo] = numero
+        if distritos:
+            self.vinculos[nombre] = distritos
+        return Colonia(nombre=nombre, codigo=codigo, estado=estado,
+                       finca_matriz=datos.get("finca_matriz") or None,
+                       padron_matriz=datos.get("padron_matriz") or None)
+
+    def codigo_libre(self):
+        """Primer código sin usar: huecos primero, después el máximo + 1."""
+        if self._libres is None:
+            self._libres = (c for desde, hasta in rangos_libres(sorted(self.codigos))
+                            for c in range(desde, hasta + 1))
+            self._siguiente = (max(self.codigos, default=0) or 0) + 1
+        for codigo in self._libres:
+            if codigo not in self.codigos:
+                return codigo
+        while self._siguiente in self.codigos:
+            self._siguiente += 1
+        return self._siguiente
+
+    def guardar(self, lote):
+        for obj in lote:
+            existente = self.colonias.get(obj.nombre)
+            if existente:
+                self.actualizados += 1
+                if not obj.codigo:
+                    obj.codigo = existente[1]
+                elif existente[1] and existente[1] != obj.codigo:
+                    self.codigos.pop(existente[1], None)
+            else:
+                self.creados += 1
+            if not obj.codigo:
+                obj.codigo = self.codigo_libre()
+            self.codigos[obj.codigo] = obj.nombre
+
+        Colonia.objects.using(self.using).bulk_create(
+            lote, batch_size=BATCH_SIZE, update_conflicts=True, unique_fields=["nombre"],
+            update_fields=["codigo", "estado", "finca_matriz", "padron_matriz"])
+
+        # Ids de las colonias nuevas que el motor no devolvió (una consulta por lote)
+        nuevas = [obj.nombre for obj in lote if obj.pk is None and obj.nombre not in self.colonias]
+        for pk, nombre, codigo in Colonia.objects.using(self.using).filter(
+                nombre__in=nuevas).values_list("id", "nombre", "codigo"):
+            self.colonias[nombre] = (pk, codigo)
+        for obj in lote:
+            self.colonias[obj.nombre] = (obj.pk or self.colonias[obj.nombre][0], obj.codigo)
+
+        # Los distritos del archivo reemplazan a los anteriores de cada colonia
+        reemplazar_distritos(
+            {self.colonias[nombre][0]: distritos for nombre, distritos in self.vinculos.items()},
+            self.departamento_de, using=self.using)
+        self.vinculos = {}
+
+    def finalizar(self):
+        if not self.dry_run:
+            reconstruir_libres(Colonia, using=self.using)
+
+
+IMPORTADORES = {
+    "departamentos": ImportadorDepartamentos,
+    "distritos": ImportadorDistritos,
+    "colonias": ImportadorColonias,
+}
+
+
+def importar(catalogo, archivo, nombre, using="default", dry_run=False):
+    """Importa ``archivo`` (binario) y devuelve el importador con el resumen y los errores."""
+    importador = IMPORTADORES[catalogo](using=using, dry_run=dry_run)
+    try:
+        filas = leer_filas(archivo, nombre)
+        return importador.ejecutar(filas)
+    except (csv.Error, zipfile.BadZipFile, UnicodeDecodeError, ValueError, KeyError) as e:
+        importador.error(0, f"No se pudo leer el archivo: {e}")
+        return importador
+
+
+def reporte_errores(importador):
+    """Filas del reporte de errores (para core.exportar.filas_csv)."""
+    return (["Fila", "Error"], iter(importador.errores))
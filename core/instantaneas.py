@@ -0,0 +1,219 @@
+"""
+Instantáneas de la base en CSV comprimido, cargadas y descargadas con COPY.
+
+``crear`` escribe un ``<tabla>.csv.gz`` por tabla más un ``manifiesto.json``
+con las columnas y la cantidad de filas. ``restaurar`` vacía esas tablas
+(el esquema ya migrado), quita sus índices secundarios, carga cada archivo
+con ``COPY ... FROM STDIN``, vuelve a crear los índices, ajusta las
+secuencias y corre ANALYZE; todo en una transacción, con las claves foráneas
+(DEFERRABLE en Django) verificadas al confirmar.
+
+Solo PostgreSQL. Entran todas las tablas de los modelos instalados, también
+las intermedias de los ManyToMany (permisos de roles) junto con
+auth_permission y django_content_type, para que los ids a los que apuntan
+sean los mismos. Quedan afuera solo las sesiones, que no tienen claves
+foráneas: el TRUNCATE nunca alcanza tablas fuera de la instantánea.
+"""
+import gzip
+import json
+import os
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .catalogo import nueva_version_catalogo
+
+MANIFIESTO = "manifiesto.json"
+BLOQUE = 1 << 20
+
+# Apps cuyas tablas no se copian
+APPS_EXCLUIDAS = {"sessions"}
+# Tablas que ``migrate`` llena con post_migrate: tener esas filas no impide
+# restaurar sin reemplazar (igual se vacían y se cargan de la instantánea)
+POBLADAS_POR_MIGRATE = {"contenttypes.contenttype", "auth.permission", "administrador.rol"}
+
+# Se envía (con ``using``) al confirmar una restauración: los ids de permisos,
+# roles y usuarios pueden haber cambiado
+instantanea_restaurada = Signal()
+
+
+class InstantaneaError(Exception):
+    pass
+
+
+def modelos():
+    """
+    Modelos con tabla propia de todas las apps instaladas, incluidas las
+    tablas intermedias de ManyToMany (las FK se verifican al confirmar, el
+    orden no importa).
+    """
+    return [
+        modelo for modelo in apps.get_models(include_auto_created=True)
+        if modelo._meta.managed and not modelo._meta.proxy
+        and modelo._meta.app_label not in APPS_EXCLUIDAS
+    ]
+
+
+def _conexion(using):
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        raise InstantaneaError("Las instantáneas con COPY requieren PostgreSQL.")
+    return connection
+
+
+def _copiar(cursor, sql, archivo, entrada):
+    """COPY entre la base y ``archivo`` con psycopg2 o psycopg 3."""
+    crudo = cursor.cursor
+    if hasattr(crudo, "copy_expert"):
+        crudo.copy_expert(sql, archivo, size=BLOQUE)
+        return
+    with crudo.copy(sql) as copia:
+        if entrada:
+            while datos := archivo.read(BLOQUE):
+                copia.write(datos)
+        else:
+            for datos in copia:
+                archivo.write(datos)
+
+
+def _columnas(modelo):
+    return [campo.column for campo in modelo._meta.local_concrete_fields]
+
+
+def crear(directorio, using="default"):
+    """Escribe la instantánea en ``directorio`` y devuelve el manifiesto."""
+    connection = _conexion(using)
+    qn = connection.ops.quote_name
+    os.makedirs(directorio, exist_ok=True)
+    manifiesto = {"creado": timezone.now().isoformat(), "tablas": []}
+
+    # Una sola transacción REPEATABLE READ: todas las tablas del mismo instante
+    anidada = connection.in_atomic_block
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if not anidada:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        for modelo in modelos():
+            tabla = modelo._meta.db_table
+            columnas = _columnas(modelo)
+            archivo = f"{tabla}.csv.gz"
+            sql = (f"COPY (SELECT {', '.join(map(qn, columnas))} FROM {qn(tabla)} "
+                   f"ORDER BY {qn(modelo._meta.pk.column)}) TO STDOUT WITH (FORMAT csv, HEADER)")
+            with gzip.open(os.path.join(directorio, archivo), "wb", compresslevel=6) as destino:
+                _copiar(cursor, sql, destino, entrada=False)
+            cursor.execute(f"SELECT count(*) FROM {qn(tabla)}")
+            manifiesto["tablas"].append({
+                "modelo": modelo._meta.label_lower, "tabla": tabla, "archivo": archivo,
+                "columnas": columnas, "filas": cursor.fetchone()[0],
+            })
+
+    with open(os.path.join(directorio, MANIFIESTO), "w", encoding="utf-8") as salida:
+        json.dump(manifiesto, salida, indent=2, ensure_ascii=False)
+    return manifiesto
+
+
+def leer_manifiesto(directorio):
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if not os.path.exists(ruta):
+        raise InstantaneaError(f"No se encontró {ruta}.")
+    with open(ruta, encoding="utf-8") as entrada:
+        return json.load(entrada)
+
+
+def _indices_secundarios(cursor, tabla):
+    """``[(nombre, definición), ...]`` de los índices que no respaldan PK/UNIQUE/EXCLUDE."""
+    cursor.execute(
+        """
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = %s::regclass
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint c
+              WHERE c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+                AND c.contype IN ('p', 'u', 'x'))
+        """,
+        [tabla],
+    )
+    return cursor.fetchall()
+
+
+def validar_manifiesto(manifiesto):
+    """
+    Comprueba que la instantánea cubra exactamente las tablas y columnas del
+    esquema actual. Devuelve ``{tabla: modelo}``.
+    """
+    por_tabla = {modelo._meta.db_table: modelo for modelo in modelos()}
+    incluidas = set()
+    for tabla in manifiesto["tablas"]:
+        modelo = por_tabla.get(tabla["tabla"])
+        if modelo is None:
+            raise InstantaneaError(f"La tabla {tabla['tabla']} no forma parte de las instantáneas.")
+        faltantes = set(tabla["columnas"]) - set(_columnas(modelo))
+        if faltantes:
+            raise InstantaneaError(
+                f"{tabla['tabla']}: columnas inexistentes en el esquema actual: {', '.join(sorted(faltantes))}.")
+        incluidas.add(tabla["tabla"])
+    # Una tabla nueva quedaría con datos que no corresponden a la instantánea
+    sin_datos = sorted(set(por_tabla) - incluidas)
+    if sin_datos:
+        raise InstantaneaError(
+            f"La instantánea no incluye las tablas {', '.join(sin_datos)}; créela de nuevo con el esquema actual.")
+    return por_tabla
+
+
+def restaurar(directorio, using="default", reemplazar=False):
+    """
+    Carga la instantánea de ``directorio`` sobre el esquema ya migrado.
+    Si las tablas tienen datos (aparte de las filas que crea ``migrate``) hace
+    falta ``reemplazar=True``.
+    Devuelve ``{tabla: filas}``.
+    """
+    connection = _conexion(using)
+    qn = connection.ops.quote_name
+    manifiesto = leer_manifiesto(directorio)
+    por_tabla = validar_manifiesto(manifiesto)
+    tablas = manifiesto["tablas"]
+
+    cargadas = {}
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        nombres = ", ".join(qn(t["tabla"]) for t in tablas)
+        if not reemplazar:
+            for tabla in tablas:
+                if por_tabla[tabla["tabla"]]._meta.label_lower in POBLADAS_POR_MIGRATE:
+                    continue
+                cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {qn(tabla['tabla'])})")
+                if cursor.fetchone()[0]:
+                    raise InstantaneaError(
+                        f"La tabla {tabla['tabla']} ya tiene datos (use la opción de reemplazar).")
+        # Las FK de Django son DEFERRABLE INITIALLY DEFERRED: se validan al confirmar
+        cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+        # Sin CASCADE: si otra tabla las referencia, falla en lugar de vaciarla
+        cursor.execute(f"TRUNCATE {nombres} RESTART IDENTITY")
+
+        indices = []
+        for tabla in tablas:
+            for nombre, definicion in _indices_secundarios(cursor, tabla["tabla"]):
+                indices.append(definicion)
+                cursor.execute(f"DROP INDEX {nombre}")
+
+        for tabla in tablas:
+            sql = (f"COPY {qn(tabla['tabla'])} ({', '.join(map(qn, tabla['columnas']))}) "
+                   f"FROM STDIN WITH (FORMAT csv, HEADER)")
+            with gzip.open(os.path.join(directorio, tabla["archivo"]), "rb") as origen:
+                _copiar(cursor, sql, origen, entrada=True)
+            cargadas[tabla["tabla"]] = tabla["filas"]
+
+        for definicion in indices:
+            cursor.execute(definicion)
+        for sql in connection.ops.sequence_reset_sql(no_style(), [por_tabla[t["tabla"]] for t in tablas]):
+            cursor.execute(sql)
+        nueva_version_catalogo()
+        transaction.on_commit(
+            lambda: instantanea_restaurada.send(sender=restaurar, using=using), using=using)
+
+    # ANALYZE fuera de la transacción de carga, para que el planificador vea los datos
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {nombres}")
+    return cargadas
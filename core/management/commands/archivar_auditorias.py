@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.auditoria import archivar_mes, meses_a_archivar
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta a CSV comprimido y elimina las auditorías de solicitudes de los meses viejos, "
+        "para que la tabla conserve solo el historial reciente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--meses", type=int, default=24, help="Meses completos a conservar (por defecto 24).")
+        parser.add_argument("--antes-de", help="Archivar los meses anteriores a AAAA-MM (en lugar de --meses).")
+        parser.add_argument("--directorio", default="database/archivo_auditorias")
+        parser.add_argument("--solo-exportar", action="store_true", help="Exportar sin borrar de la tabla.")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        if options["antes_de"]:
+            try:
+                anio, mes = (int(parte) for parte in options["antes_de"].split("-"))
+                antes_de = date(anio, mes, 1)
+            except ValueError:
+                raise CommandError("--antes-de debe tener el formato AAAA-MM.")
+        else:
+            hoy = date.today()
+            total = hoy.year * 12 + hoy.month - 1 - options["meses"]
+            antes_de = date(total // 12, total % 12 + 1, 1)
+
+        meses = meses_a_archivar(antes_de, using=options["database"])
+        if not meses:
+            self.stdout.write(f"No hay auditorías anteriores a {antes_de:%m/%Y}.")
+            return
+        for mes in meses:
+            try:
+                ruta, filas = archivar_mes(mes, options["directorio"], using=options["database"],
+                                           borrar=not options["solo_exportar"])
+            except FileExistsError as e:
+                raise CommandError(f"{e.filename} ya existe; muévalo antes de volver a archivar {mes:%m/%Y}.")
+            self.stdout.write(f"  {mes:%m/%Y}: {filas} fila(s) -> {ruta}")
+        accion = "exportados" if options["solo_exportar"] else "archivados"
+        self.stdout.write(self.style.SUCCESS(f"{len(meses)} mes(es) {accion}."))
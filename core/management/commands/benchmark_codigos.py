@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Area
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Mide el costo de asignar códigos automáticos con N filas existentes (no deja datos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=100_000)
+        parser.add_argument("--muestras", type=int, default=50)
+        parser.add_argument("--lote", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        filas = options["filas"]
+        muestras = options["muestras"]
+
+        try:
+            with transaction.atomic():
+                for tamanio in self._escalones(filas):
+                    self._poblar(tamanio, options["lote"])
+                    inicio = time.perf_counter()
+                    for i in range(muestras):
+                        Area.objects.create(nombre=f"__bench_nueva_{tamanio}_{i}")
+                    por_alta = (time.perf_counter() - inicio) / muestras * 1000
+
+                    # Abre huecos en la mitad de la tabla y los vuelve a ocupar
+                    Area.objects.filter(codigo__in=range(tamanio // 2, tamanio // 2 + muestras)).delete()
+                    inicio = time.perf_counter()
+                    for i in range(muestras):
+                        Area.objects.create(nombre=f"__bench_hueco_{tamanio}_{i}")
+                    por_hueco = (time.perf_counter() - inicio) / muestras * 1000
+
+                    self.stdout.write(
+                        f"{tamanio:>8} filas: {por_alta:7.2f} ms/alta al final, "
+                        f"{por_hueco:7.2f} ms/alta en hueco"
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS("Benchmark terminado (datos revertidos)."))
+
+    def _escalones(self, filas):
+        tamanio = 1_000
+        while tamanio < filas:
+            yield tamanio
+            tamanio *= 10
+        yield filas
+
+    def _poblar(self, hasta, lote):
+        """Completa la tabla con códigos consecutivos hasta ``hasta``."""
+        desde = (Area.objects.order_by("-codigo").values_list("codigo", flat=True).first() or 0) + 1
+        nuevas = (
+            Area(nombre=f"__bench_{codigo}", codigo=codigo)
+            for codigo in range(desde, hasta + 1)
+        )
+        while True:
+            bloque = [a for _, a in zip(range(lote), nuevas)]
+            if not bloque:
+                break
+            Area.objects.bulk_create(bloque, batch_size=lote)
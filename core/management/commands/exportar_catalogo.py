@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exportar import EXPORTACIONES, FORMATOS, exportar
+
+
+class Command(BaseCommand):
+    help = "Exporta departamentos, distritos, colonias o solicitudes a CSV/XLSX sin cargar todo en memoria."
+
+    def add_arguments(self, parser):
+        parser.add_argument("catalogo", choices=sorted(EXPORTACIONES))
+        parser.add_argument("--formato", choices=sorted(FORMATOS), default="csv")
+        parser.add_argument("--salida", help="Archivo de destino (por defecto, la salida estándar).")
+        parser.add_argument("--gzip", action="store_true", help="Comprimir la salida con gzip.")
+        parser.add_argument(
+            "--filtro", action="append", default=[], metavar="CLAVE=VALOR",
+            help="Filtros de la lista: q, estado, departamento, distrito (repetible).")
+
+    def handle(self, *args, **options):
+        filtros = {}
+        for filtro in options["filtro"]:
+            clave, separador, valor = filtro.partition("=")
+            if not separador:
+                raise CommandError(f"Filtro inválido: {filtro!r} (se espera CLAVE=VALOR).")
+            filtros[clave] = valor
+
+        contenido = exportar(options["catalogo"], options["formato"], filtros, comprimir=options["gzip"])
+        destino = open(options["salida"], "wb") if options["salida"] else sys.stdout.buffer
+        total = 0
+        try:
+            for datos in contenido:
+                destino.write(datos)
+                total += len(datos)
+        finally:
+            if options["salida"]:
+                destino.close()
+        if options["salida"]:
+            self.stdout.write(self.style.SUCCESS(f"{options['salida']}: {total} bytes."))
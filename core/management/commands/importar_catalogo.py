@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exportar import filas_csv
+from core.importar import IMPORTADORES, importar
+
+
+class Command(BaseCommand):
+    help = "Importa departamentos, distritos o colonias desde un CSV/XLSX con las columnas de la exportación."
+
+    def add_arguments(self, parser):
+        parser.add_argument("catalogo", choices=sorted(IMPORTADORES))
+        parser.add_argument("archivo", help="Archivo .csv o .xlsx.")
+        parser.add_argument("--dry-run", action="store_true", help="Validar todo y revertir al final.")
+        parser.add_argument("--errores", help="Guardar las filas rechazadas en este CSV.")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            archivo = open(options["archivo"], "rb")
+        except OSError as e:
+            raise CommandError(f"No se pudo abrir {options['archivo']}: {e}")
+        with archivo:
+            importador = importar(options["catalogo"], archivo, options["archivo"],
+                                  using=options["database"], dry_run=options["dry_run"])
+
+        if options["errores"] and importador.errores:
+            with open(options["errores"], "wb") as destino:
+                for datos in filas_csv(["Fila", "Error"], importador.errores):
+                    destino.write(datos)
+        elif importador.errores:
+            for fila, mensaje in importador.errores[:20]:
+                self.stderr.write(f"Fila {fila}: {mensaje}")
+            if len(importador.errores) > 20:
+                self.stderr.write(f"... y {len(importador.errores) - 20} errores más (use --errores).")
+
+        resumen = importador.resumen()
+        estilo = self.style.WARNING if importador.errores else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"{'Simulación: ' if options['dry_run'] else ''}{resumen['procesadas']} filas, "
+            f"{resumen['creados']} nuevas, {resumen['actualizados']} actualizadas, "
+            f"{resumen['errores']} con errores ({time.monotonic() - inicio:.1f} s)."))
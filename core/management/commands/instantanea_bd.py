@@ -0,0 +1,47 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.instantaneas import InstantaneaError, crear, restaurar
+
+DIRECTORIO = "database/instantanea"
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea o restaura una instantánea de la base en CSV comprimido usando COPY de PostgreSQL. "
+        "Restaurar aplica las migraciones y carga los datos en segundos, sin pg_restore ni fixtures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("accion", choices=["crear", "restaurar"])
+        parser.add_argument("--directorio", default=DIRECTORIO)
+        parser.add_argument(
+            "--reemplazar", action="store_true",
+            help="Vaciar (TRUNCATE) las tablas de la instantánea si ya tienen datos.")
+        parser.add_argument("--sin-migrar", action="store_true", help="No correr migrate antes de restaurar.")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            if options["accion"] == "crear":
+                manifiesto = crear(options["directorio"], using=options["database"])
+                filas = {t["tabla"]: t["filas"] for t in manifiesto["tablas"]}
+            else:
+                if not options["sin_migrar"]:
+                    call_command("migrate", database=options["database"], interactive=False,
+                                 verbosity=max(options["verbosity"] - 1, 0))
+                filas = restaurar(options["directorio"], using=options["database"],
+                                  reemplazar=options["reemplazar"])
+        except InstantaneaError as e:
+            raise CommandError(str(e))
+
+        if options["verbosity"] > 1:
+            for tabla, cantidad in filas.items():
+                self.stdout.write(f"  {tabla}: {cantidad}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Instantánea {'creada en' if options['accion'] == 'crear' else 'restaurada desde'} "
+            f"{options['directorio']}: {sum(filas.values())} filas en {len(filas)} tablas "
+            f"({time.monotonic() - inicio:.1f} s)."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.codigos import modelos_con_codigo, reconstruir_libres
+
+
+class Command(BaseCommand):
+    help = "Recalcula la lista de códigos libres (necesario tras borrados por SQL directo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        for modelo in modelos_con_codigo():
+            total = reconstruir_libres(modelo, using=options["database"])
+            self.stdout.write(f"{modelo._meta.label}: {total} rango(s) libre(s)")
+        self.stdout.write(self.style.SUCCESS("Códigos libres reconstruidos."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.territorio import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Recalcula el cierre colonia → distrito → departamento (necesario tras cambios por SQL directo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        total = reconstruir(using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Territorio reconstruido: {total} fila(s)."))
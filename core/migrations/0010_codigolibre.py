@@ -0,0 +1,53 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:29
+
+from django.db import migrations, models
+
+from core.codigos import rangos_libres
+
+
+def registrar_huecos_existentes(apps, schema_editor):
+    """Carga los huecos de numeración que ya existen en la base."""
+    CodigoLibre = apps.get_model("core", "CodigoLibre")
+    alias = schema_editor.connection.alias
+    nuevos = []
+    for nombre, ambito_campo in [("departamento", None), ("colonia", None),
+                                 ("area", None), ("objetivo", "area_id")]:
+        modelo = apps.get_model("core", nombre)
+        campos = [ambito_campo, "codigo"] if ambito_campo else ["codigo"]
+        filas = (modelo.objects.using(alias).exclude(codigo__isnull=True)
+                 .order_by(*campos).values_list(*campos))
+        por_ambito = {}
+        for fila in filas:
+            por_ambito.setdefault(str(fila[0]) if ambito_campo else "", []).append(fila[-1])
+        for ambito, codigos in por_ambito.items():
+            nuevos += [
+                CodigoLibre(modelo=f"core.{nombre}", ambito=ambito, desde=desde, hasta=hasta)
+                for desde, hasta in rangos_libres(codigos)
+            ]
+    CodigoLibre.objects.using(alias).bulk_create(nuevos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_alter_distrito_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodigoLibre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=100)),
+                ('ambito', models.CharField(blank=True, default='', max_length=100)),
+                ('desde', models.PositiveIntegerField()),
+                ('hasta', models.PositiveIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Código libre',
+                'verbose_name_plural': 'Códigos libres',
+                'indexes': [models.Index(fields=['modelo', 'ambito', 'desde'], name='codigo_libre_ambito_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_huecos_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.4 on 2026-10-18 15:02
+
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+# (índice, tabla, columna) que cubre la búsqueda de core/busqueda.py
+INDICES_TRIGRAMAS = [
+    ("departamento_nombre_trgm_idx", "core_departamento", "nombre"),
+    ("distrito_nombre_trgm_idx", "core_distrito", "nombre"),
+    ("colonia_nombre_trgm_idx", "core_colonia", "nombre"),
+    ("colonia_finca_trgm_idx", "core_colonia", "finca_matriz"),
+    ("colonia_padron_trgm_idx", "core_colonia", "padron_matriz"),
+]
+
+# unaccent() no es IMMUTABLE (depende del search_path), así que no puede
+# indexarse directamente: se envuelve fijando el diccionario explícitamente.
+CREAR_FUNCION = """
+CREATE OR REPLACE FUNCTION core_normalizar(text) RETURNS text AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+"""
+
+
+def crear_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREAR_FUNCION)
+    for indice, tabla, columna in INDICES_TRIGRAMAS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {indice} ON {tabla} "
+            f"USING gin (core_normalizar({columna}) gin_trgm_ops);"
+        )
+
+
+def eliminar_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for indice, _tabla, _columna in INDICES_TRIGRAMAS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {indice};")
+    schema_editor.execute("DROP FUNCTION IF EXISTS core_normalizar(text);")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_codigolibre"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.RunPython(crear_busqueda, eliminar_busqueda),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def cargar_territorio(apps, schema_editor):
+    """Llena el cierre con los distritos que ya tienen las colonias."""
+    Colonia = apps.get_model("core", "Colonia")
+    ColoniaTerritorio = apps.get_model("core", "ColoniaTerritorio")
+    alias = schema_editor.connection.alias
+    enlaces = Colonia.distritos.through.objects.using(alias).values_list(
+        "colonia_id", "distrito_id", "distrito__departamento_id")
+    ColoniaTerritorio.objects.using(alias).bulk_create([
+        ColoniaTerritorio(colonia_id=colonia_id, distrito_id=distrito_id, departamento_id=departamento_id)
+        for colonia_id, distrito_id, departamento_id in enlaces.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_busqueda_trigramas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColoniaTerritorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('colonia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='territorio', to='core.colonia')),
+                ('departamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.departamento')),
+                ('distrito', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.distrito')),
+            ],
+            options={
+                'verbose_name': 'Territorio de colonia',
+                'verbose_name_plural': 'Territorios de colonias',
+                'indexes': [models.Index(fields=['departamento', 'colonia'], name='colonia_terr_depto_idx'), models.Index(fields=['distrito', 'colonia'], name='colonia_terr_distrito_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='coloniaterritorio',
+            constraint=models.UniqueConstraint(fields=('colonia', 'distrito'), name='colonia_territorio_unico'),
+        ),
+        migrations.RunPython(cargar_territorio, migrations.RunPython.noop),
+    ]
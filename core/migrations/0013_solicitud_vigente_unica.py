@@ -0,0 +1,62 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:59
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+VIGENTES = ["pendiente", "activo", "en_proceso"]
+
+
+def desactivar_duplicadas(apps, schema_editor):
+    """
+    Antes de crear el índice único: de cada (colonia, tipo) con varias
+    solicitudes vigentes queda la más reciente; las demás pasan a inactivo
+    con su auditoría.
+    """
+    Solicitud = apps.get_model("core", "Solicitud")
+    SolicitudAudit = apps.get_model("core", "SolicitudAudit")
+    alias = schema_editor.connection.alias
+    vistas, duplicadas = set(), []
+    filas = Solicitud.objects.using(alias).filter(estado__in=VIGENTES).order_by(
+        "colonia_id", "tipo", "-fecha_creacion", "-id").values_list("id", "colonia_id", "tipo", "estado")
+    for pk, colonia_id, tipo, estado in filas.iterator():
+        if (colonia_id, tipo) in vistas:
+            duplicadas.append((pk, estado))
+        vistas.add((colonia_id, tipo))
+    if not duplicadas:
+        return
+    ahora = timezone.now()
+    Solicitud.objects.using(alias).filter(pk__in=[pk for pk, _estado in duplicadas]).update(
+        estado="inactivo", fecha_actualizacion=ahora)
+    SolicitudAudit.objects.using(alias).bulk_create([
+        SolicitudAudit(solicitud_id=pk, previo=estado, nuevo="inactivo", fecha=ahora,
+                       comentario="Duplicada: desactivada al crear la restricción solicitud_vigente_unica")
+        for pk, estado in duplicadas
+    ], batch_size=1000)
+    if schema_editor.connection.vendor == "postgresql":
+        # Verificar ya las FK diferidas para poder seguir con los cambios de esquema
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_coloniaterritorio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(desactivar_duplicadas, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['colonia', 'estado', '-fecha_creacion'], name='solicitud_colonia_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='solicitud_estado_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='solicitud',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ['pendiente', 'activo', 'en_proceso'])), fields=('colonia', 'tipo'), name='solicitud_vigente_unica', violation_error_message='Ya existe una solicitud activa o pendiente para esta colonia y tipo.'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+# BRIN: una entrada por rango de bloques, mínima y sin costo al insertar. Sirve
+# porque la auditoría solo se agrega, en orden de fecha.
+CREAR_BRIN = (
+    "CREATE INDEX IF NOT EXISTS auditoria_fecha_brin_idx ON core_solicitudaudit "
+    "USING brin (fecha) WITH (pages_per_range = 32);"
+)
+
+
+def crear_brin(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREAR_BRIN)
+
+
+def eliminar_brin(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS auditoria_fecha_brin_idx;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_solicitud_vigente_unica'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_brin, eliminar_brin),
+        migrations.AddIndex(
+            model_name='solicitudaudit',
+            index=models.Index(fields=['solicitud', 'fecha'], name='auditoria_solicitud_fecha_idx'),
+        ),
+    ]
@@ -1,15 +1,19 @@
+from datetime import date, datetime, time, timedelta
+
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.conf import settings
 
+from .codigos import CodigoAutomaticoMixin
+
 User = settings.AUTH_USER_MODEL
 
 
 # ===============================
 # MODELO: DEPARTAMENTO
 # ===============================
-class Departamento(models.Model):
+class Departamento(CodigoAutomaticoMixin, models.Model):
     nombre = models.CharField(max_length=200, unique=True, db_index=True)
     codigo = models.PositiveIntegerField(blank=True, null=True, unique=True)
 
@@ -17,24 +21,6 @@ class Departamento(models.Model):
         verbose_name = "Departamento"
         verbose_name_plural = "Departamentos"
         ordering = ["codigo", "nombre"]
-        
-
-    def save(self, *args, **kwargs):
-        if not self.codigo:
-            # Obtener los códigos existentes
-            codigos_existentes = list(
-                self.__class__.objects.exclude(codigo__isnull=True)
-                .values_list("codigo", flat=True)
-            )
-
-            # Buscar el primer número libre
-            nuevo_codigo = 1
-            while nuevo_codigo in codigos_existentes:
-                nuevo_codigo += 1
-
-            self.codigo = nuevo_codigo
-
-        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.nombre
@@ -64,7 +50,7 @@ class Distrito(models.Model):
 # ===============================
 # MODELO: COLONIA
 # ===============================
-class Colonia(models.Model):
+class Colonia(CodigoAutomaticoMixin, models.Model):
     ESTADO_CHOICES = [("activo", "Activo"), ("inactivo", "Inactivo")]
 
     nombre = models.CharField(max_length=250, db_index=True)
@@ -81,18 +67,6 @@ class Colonia(models.Model):
         verbose_name_plural = "Colonias"
         ordering = ["nombre"]
 
-    def save(self, *args, **kwargs):
-        if not self.codigo:
-            codigos_existentes = list(
-                self.__class__.objects.exclude(codigo__isnull=True)
-                .values_list("codigo", flat=True)
-            )
-            nuevo_codigo = 1
-            while nuevo_codigo in codigos_existentes:
-                nuevo_codigo += 1
-            self.codigo = nuevo_codigo
-        super().save(*args, **kwargs)
-
     def clean(self):
         if self.pk:
             if self.distritos.count() == 0:
@@ -104,7 +78,7 @@ class Colonia(models.Model):
         return self.nombre
 
 
-class Area(models.Model):
+class Area(CodigoAutomaticoMixin, models.Model):
     nombre = models.CharField(max_length=200, unique=True)
     descripcion = models.TextField(blank=True)
     codigo = models.PositiveIntegerField(blank=True, null=True, unique=True)
@@ -117,26 +91,17 @@ class Area(models.Model):
     def __str__(self):
         return f"{self.codigo or '-'} - {self.nombre}"
 
-    def save(self, *args, **kwargs):
-        if not self.codigo:
-            codigos_existentes = list(
-                Area.objects.exclude(codigo__isnull=True).values_list(
-                    "codigo", flat=True)
-            )
-            nuevo_codigo = 1
-            while nuevo_codigo in codigos_existentes:
-                nuevo_codigo += 1
-            self.codigo = nuevo_codigo
-        super().save(*args, **kwargs)
 
-
-class Objetivo(models.Model):
+class Objetivo(CodigoAutomaticoMixin, models.Model):
     area = models.ForeignKey(
         Area, on_delete=models.CASCADE, related_name="objetivos")
     nombre = models.CharField(max_length=250)
     descripcion = models.TextField(blank=True)
     codigo = models.PositiveIntegerField(blank=True, null=True)
 
+    # La numeración de objetivos es independiente por área
+    codigo_ambito = ("area",)
+
     class Meta:
         unique_together = ("area", "codigo")
         verbose_name = "Objetivo"
@@ -146,21 +111,61 @@ class Objetivo(models.Model):
     def __str__(self):
         return f"{self.codigo or '-'} - {self.nombre} ({self.area})"
 
-    def save(self, *args, **kwargs):
-        if not self.codigo:
-            codigos_existentes = list(
-                Objetivo.objects.filter(area=self.area)
-                .exclude(codigo__isnull=True)
-                .values_list("codigo", flat=True)
-            )
-            nuevo_codigo = 1
-            while nuevo_codigo in codigos_existentes:
-                nuevo_codigo += 1
-            self.codigo = nuevo_codigo
-        super().save(*args, **kwargs)
+
+class CodigoLibre(models.Model):
+    """
+    Huecos en la numeración automática de códigos (ver core/codigos.py).
+    Cada fila es un rango desde..hasta libre dentro de un modelo y ámbito.
+    """
+    modelo = models.CharField(max_length=100)
+    ambito = models.CharField(max_length=100, blank=True, default="")
+    desde = models.PositiveIntegerField()
+    hasta = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = "Código libre"
+        verbose_name_plural = "Códigos libres"
+        indexes = [
+            models.Index(fields=["modelo", "ambito", "desde"], name="codigo_libre_ambito_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo}[{self.ambito}] {self.desde}-{self.hasta}"
+
+class ColoniaTerritorio(models.Model):
+    """
+    Cierre desnormalizado colonia → distrito → departamento (ver core/territorio.py).
+    Una fila por distrito de la colonia, con el departamento copiado, para
+    filtrar colonias por departamento o distrito sin joins ni DISTINCT.
+    """
+    colonia = models.ForeignKey(
+        Colonia, on_delete=models.CASCADE, related_name="territorio")
+    distrito = models.ForeignKey(
+        Distrito, on_delete=models.CASCADE, related_name="+")
+    departamento = models.ForeignKey(
+        Departamento, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        verbose_name = "Territorio de colonia"
+        verbose_name_plural = "Territorios de colonias"
+        constraints = [
+            models.UniqueConstraint(fields=["colonia", "distrito"], name="colonia_territorio_unico"),
+        ]
+        indexes = [
+            models.Index(fields=["departamento", "colonia"], name="colonia_terr_depto_idx"),
+            models.Index(fields=["distrito", "colonia"], name="colonia_terr_distrito_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.colonia_id} → {self.distrito_id} → {self.departamento_id}"
 
 # Solicitud (coordinación)
 
+# Estados en los que solo puede haber una solicitud por colonia y tipo
+# (restricción solicitud_vigente_unica)
+SOLICITUD_ESTADOS_VIGENTES = ("pendiente", "activo", "en_proceso")
+SOLICITUD_MENSAJE_DUPLICADA = "Ya existe una solicitud activa o pendiente para esta colonia y tipo."
+
 
 class Solicitud(models.Model):
     TIPO_CHOICES = [("nuevo", "Nuevo relevamiento"),
@@ -175,6 +180,15 @@ class Solicitud(models.Model):
         (ESTADO_EN_PROCESO, "En proceso de relevamiento"),
         (ESTADO_INACTIVO, "Inactivo"),
     ]
+    ESTADOS_VIGENTES = SOLICITUD_ESTADOS_VIGENTES
+    MENSAJE_DUPLICADA = SOLICITUD_MENSAJE_DUPLICADA
+    # Estado de origen -> estados a los que puede pasar (ver core/transiciones.py)
+    TRANSICIONES = {
+        ESTADO_PENDIENTE: (ESTADO_ACTIVO, ESTADO_INACTIVO),
+        ESTADO_ACTIVO: (ESTADO_EN_PROCESO, ESTADO_INACTIVO),
+        ESTADO_EN_PROCESO: (ESTADO_ACTIVO, ESTADO_INACTIVO),
+        ESTADO_INACTIVO: (ESTADO_ACTIVO,),
+    }
 
     colonia = models.ForeignKey(
         Colonia, on_delete=models.CASCADE, related_name="solicitudes")
@@ -192,33 +206,88 @@ class Solicitud(models.Model):
         verbose_name = "Solicitud de relevamiento"
         verbose_name_plural = "Solicitudes de relevamiento"
         ordering = ["-fecha_creacion"]
+        constraints = [
+            # Índice único parcial: la base rechaza duplicados aunque se guarde sin full_clean()
+            models.UniqueConstraint(
+                fields=["colonia", "tipo"],
+                condition=models.Q(estado__in=list(SOLICITUD_ESTADOS_VIGENTES)),
+                name="solicitud_vigente_unica",
+                violation_error_message=SOLICITUD_MENSAJE_DUPLICADA,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["colonia", "estado", "-fecha_creacion"], name="solicitud_colonia_estado_idx"),
+            models.Index(fields=["estado", "-fecha_creacion"], name="solicitud_estado_fecha_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado con el que se cargó: la auditoría lo compara sin volver a consultar
+        instance._estado_original = instance.__dict__.get("estado")
+        return instance
 
     def __str__(self):
         return f"Solicitud #{self.pk} - {self.colonia} ({self.get_estado_display()})"
 
     def clean(self):
         # Validar existencia de colonia
-        if not self.colonia:
+        if not self.colonia_id:
             raise ValidationError(
                 "La solicitud debe estar vinculada a una colonia.")
-        # Evitar duplicados: misma colonia, mismo tipo y estado no inactivo en corto tiempo
-        qs = Solicitud.objects.filter(colonia=self.colonia, tipo=self.tipo)
-        if self.pk:
-            qs = qs.exclude(pk=self.pk)
-        if qs.filter(estado__in=[self.ESTADO_PENDIENTE, self.ESTADO_ACTIVO, self.ESTADO_EN_PROCESO]).exists():
-            # Esto previene solicitudes duplicadas activas
-            raise ValidationError(
-                "Ya existe una solicitud activa o pendiente para esta colonia y tipo.")
-
-    # Control de transiciones; se usará desde vistas con permisos
+        # Los duplicados vigentes los valida la restricción solicitud_vigente_unica
+        # (full_clean -> validate_constraints) y la base los rechaza igual sin full_clean
+
+    @staticmethod
+    def es_duplicada(error):
+        """True si el IntegrityError ``error`` viene de la restricción solicitud_vigente_unica."""
+        diag = getattr(error.__cause__, "diag", None)
+        if getattr(diag, "constraint_name", None):
+            return diag.constraint_name == "solicitud_vigente_unica"
+        # SQLite no informa el nombre del índice, solo sus columnas
+        texto = str(error)
+        return "solicitud_vigente_unica" in texto or "core_solicitud.colonia_id, core_solicitud.tipo" in texto
+
+    # Control de transiciones; se aplica desde core/transiciones.py
     def puede_transicionar(self, nuevo_estado):
-        allowed = {
-            self.ESTADO_PENDIENTE: [self.ESTADO_ACTIVO, self.ESTADO_INACTIVO],
-            self.ESTADO_ACTIVO: [self.ESTADO_EN_PROCESO, self.ESTADO_INACTIVO],
-            self.ESTADO_EN_PROCESO: [self.ESTADO_ACTIVO, self.ESTADO_INACTIVO],
-            self.ESTADO_INACTIVO: [self.ESTADO_ACTIVO],
-        }
-        return nuevo_estado in allowed.get(self.estado, [])
+        return nuevo_estado in self.TRANSICIONES.get(self.estado, ())
+
+
+class SolicitudAuditQuerySet(models.QuerySet):
+    """
+    Consultas acotadas por fecha sobre la auditoría. La tabla solo crece
+    (las filas se agregan en orden de fecha), así que en PostgreSQL un rango
+    de fechas usa el índice BRIN de ``fecha`` y lee solo los bloques de ese
+    período en lugar de recorrer todo el historial.
+    """
+
+    @staticmethod
+    def _instante(valor):
+        if isinstance(valor, datetime):
+            return valor
+        return timezone.make_aware(datetime.combine(valor, time.min))
+
+    def entre(self, desde=None, hasta=None):
+        """Auditorías con ``desde <= fecha < hasta`` (date o datetime; cualquiera puede faltar)."""
+        qs = self
+        if desde is not None:
+            qs = qs.filter(fecha__gte=self._instante(desde))
+        if hasta is not None:
+            qs = qs.filter(fecha__lt=self._instante(hasta))
+        return qs
+
+    def del_mes(self, mes):
+        """Auditorías del mes de ``mes`` (cualquier fecha de ese mes)."""
+        inicio = date(mes.year, mes.month, 1)
+        fin = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+        return self.entre(inicio, fin)
+
+    def recientes(self, dias=90):
+        return self.entre(timezone.now() - timedelta(days=dias))
+
+    def historial(self, solicitud):
+        """Auditorías de una solicitud en orden cronológico (índice solicitud + fecha)."""
+        return self.filter(solicitud=solicitud).order_by("fecha", "id")
 
 
 class SolicitudAudit(models.Model):
@@ -231,10 +300,14 @@ class SolicitudAudit(models.Model):
     fecha = models.DateTimeField(default=timezone.now)
     comentario = models.TextField(blank=True)
 
+    objects = SolicitudAuditQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Audit - Solicitud"
         verbose_name_plural = "Auditorías - Solicitudes"
         ordering = ["-fecha"]
+        # El índice BRIN de fecha (solo PostgreSQL) se crea en la migración 0014
+        indexes = [models.Index(fields=["solicitud", "fecha"], name="auditoria_solicitud_fecha_idx")]
 
 # extraido de core/relevamiento_models.py
 
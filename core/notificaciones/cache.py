@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notificacion
+
+# Cantidad de notificaciones que muestra el desplegable de la barra superior
+RECIENTES = 5
+# Tope de vida del resumen en caché (las escrituras lo invalidan antes). Sin
+# caché compartida la invalidación no llega a los otros procesos: vida corta
+TIMEOUT = 300 if getattr(settings, "CACHE_COMPARTIDA", False) else 30
+
+
+def clave_resumen(usuario_id):
+    return f"notificaciones:resumen:{usuario_id}"
+
+
+def obtener_resumen(usuario_id):
+    """
+    Devuelve ``{"no_leidas": int, "recientes": [Notificacion, ...]}`` para el
+    usuario, leyendo de la caché y consultando la base solo si no está.
+    """
+    clave = clave_resumen(usuario_id)
+    resumen = cache.get(clave)
+    if resumen is None:
+        resumen = {
+            "no_leidas": Notificacion.objects.filter(
+                usuario_id=usuario_id, leida=False).count(),
+            "recientes": list(
+                Notificacion.objects.filter(usuario_id=usuario_id)
+                .order_by("-creado")[:RECIENTES]
+            ),
+        }
+        cache.set(clave, resumen, TIMEOUT)
+    return resumen
+
+
+def invalidar_resumen(*usuario_ids):
+    """
+    Descarta el resumen en caché de los usuarios indicados al confirmar la
+    transacción: si se borrara antes, una página que se arme en el medio
+    volvería a guardar el resumen sin los cambios.
+    """
+    claves = [clave_resumen(uid) for uid in usuario_ids]
+    if claves:
+        transaction.on_commit(lambda: cache.delete_many(claves))
@@ -1,13 +1,23 @@
-from .models import Notificacion
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .cache import obtener_resumen
+from .eventos import sse_activo
+
 
 def notificaciones_context(request):
+    # Se evalúan solo si el template los usa, y salen de la caché por usuario
     if request.user.is_authenticated:
+        usuario_id = request.user.pk
         return {
-            "notificaciones_no_leidas": Notificacion.objects.filter(
-                usuario=request.user, leida=False
-            ).count(),
-            "notificaciones_recientes": Notificacion.objects.filter(
-                usuario=request.user
-            ).order_by("-creado")[:5]  # Las últimas 5 notificaciones
+            "notificaciones_no_leidas": SimpleLazyObject(
+                lambda: obtener_resumen(usuario_id)["no_leidas"]
+            ),
+            "notificaciones_recientes": SimpleLazyObject(
+                lambda: obtener_resumen(usuario_id)["recientes"]
+            ),  # Las últimas 5 notificaciones
+            # SSE solo con ASGI; si no, la campanita consulta el contador cada tanto
+            "notificaciones_sse": sse_activo(request),
+            "notificaciones_intervalo": settings.NOTIFICACIONES_INTERVALO,
         }
     return {}
@@ -0,0 +1,211 @@
+"""
+Pub/sub liviano para empujar notificaciones a los navegadores conectados
+por Server-Sent Events (ver ``views.stream_notificaciones``).
+
+Por defecto el bus vive en el proceso (sirve para un único servidor ASGI).
+Con ``NOTIFICACIONES_BUS = "postgres"`` en settings los eventos viajan por
+LISTEN/NOTIFY, así todos los procesos conectados a la base los reciben.
+
+Los eventos solo dicen qué cambió (``{"evento": "notificacion"}``) y a qué
+usuarios: el stream lee el mensaje de la base. Así el payload de NOTIFY
+(máximo 8000 bytes) no depende del texto, y las listas grandes de
+destinatarios se parten en varios avisos.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CANAL_POSTGRES = "notificaciones"
+# Espera entre reintentos de la conexión LISTEN (se duplica hasta el máximo)
+ESPERA_INICIAL = 1
+ESPERA_MAXIMA = 60
+# Destinatarios por NOTIFY: con ids de hasta 8 dígitos el payload queda lejos de 8000 bytes
+USUARIOS_POR_AVISO = 500
+
+
+# ===============================
+# BUS EN MEMORIA DEL PROCESO
+# ===============================
+class BusLocal:
+    def __init__(self):
+        self._suscriptores = {}  # usuario_id -> {(loop, queue), ...}
+        self._lock = threading.Lock()
+
+    def suscribir(self, usuario_id):
+        """Registra una cola para el usuario; debe llamarse desde el event loop."""
+        cola = asyncio.Queue(maxsize=100)
+        with self._lock:
+            self._suscriptores.setdefault(usuario_id, set()).add(
+                (asyncio.get_running_loop(), cola))
+        return cola
+
+    def desuscribir(self, usuario_id, cola):
+        with self._lock:
+            colas = self._suscriptores.get(usuario_id, set())
+            colas.difference_update({s for s in colas if s[1] is cola})
+            if not colas:
+                self._suscriptores.pop(usuario_id, None)
+
+    def entregar(self, usuario_id, evento):
+        """Pasa el evento a las colas locales del usuario (seguro entre hilos)."""
+        with self._lock:
+            destinos = list(self._suscriptores.get(usuario_id, ()))
+        for loop, cola in destinos:
+            loop.call_soon_threadsafe(_encolar, cola, evento)
+
+    def publicar(self, usuario_ids, evento):
+        for usuario_id in usuario_ids:
+            self.entregar(usuario_id, evento)
+
+
+def _encolar(cola, evento):
+    # Un cliente lento pierde eventos en lugar de frenar al resto
+    if not cola.full():
+        cola.put_nowait(evento)
+
+
+# ===============================
+# BUS SOBRE POSTGRESQL LISTEN/NOTIFY
+# ===============================
+class BusPostgres(BusLocal):
+    def __init__(self):
+        super().__init__()
+        self._escuchando = False
+
+    def suscribir(self, usuario_id):
+        self._iniciar_escucha()
+        return super().suscribir(usuario_id)
+
+    def publicar(self, usuario_ids, evento):
+        usuario_ids = list(usuario_ids)
+        with connection.cursor() as cursor:
+            for inicio in range(0, len(usuario_ids), USUARIOS_POR_AVISO):
+                payload = json.dumps({
+                    "usuarios": usuario_ids[inicio:inicio + USUARIOS_POR_AVISO], "evento": evento})
+                cursor.execute("SELECT pg_notify(%s, %s)", [CANAL_POSTGRES, payload])
+
+    def _iniciar_escucha(self):
+        with self._lock:
+            if self._escuchando:
+                return
+            self._escuchando = True
+        threading.Thread(target=self._escuchar, name="notificaciones-listen", daemon=True).start()
+
+    def _conectar(self):
+        import psycopg2
+
+        db = settings.DATABASES["default"]
+        conn = psycopg2.connect(
+            dbname=db["NAME"], user=db["USER"], password=db["PASSWORD"],
+            host=db["HOST"], port=db["PORT"],
+        )
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CANAL_POSTGRES};")
+        return conn
+
+    def _escuchar(self):
+        """
+        Hilo de escucha: si la conexión se cae se registra el error y se
+        reconecta con espera creciente. Si el hilo termina igual, el próximo
+        ``suscribir`` lo vuelve a iniciar.
+        """
+        espera = ESPERA_INICIAL
+        try:
+            while True:
+                try:
+                    conn = self._conectar()
+                except Exception:
+                    logger.exception("No se pudo conectar para LISTEN %s; reintento en %s s",
+                                     CANAL_POSTGRES, espera)
+                else:
+                    espera = ESPERA_INICIAL
+                    try:
+                        self._recibir(conn)
+                    except Exception:
+                        logger.exception("Se perdió la conexión LISTEN %s; reintento en %s s",
+                                         CANAL_POSTGRES, espera)
+                    finally:
+                        conn.close()
+                time.sleep(espera)
+                espera = min(espera * 2, ESPERA_MAXIMA)
+        finally:
+            with self._lock:
+                self._escuchando = False
+
+    def _recibir(self, conn):
+        import select
+
+        while True:
+            if select.select([conn], [], [], 30) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                aviso = conn.notifies.pop(0)
+                try:
+                    datos = json.loads(aviso.payload)
+                except ValueError:
+                    logger.warning("Payload de notificación inválido: %r", aviso.payload)
+                    continue
+                for usuario_id in datos["usuarios"]:
+                    self.entregar(usuario_id, datos["evento"])
+
+
+# ===============================
+# API PÚBLICA
+# ===============================
+_bus = None
+
+
+def obtener_bus():
+    global _bus
+    if _bus is None:
+        tipo = getattr(settings, "NOTIFICACIONES_BUS", "local")
+        _bus = BusPostgres() if tipo == "postgres" else BusLocal()
+    return _bus
+
+
+def sse_activo(request):
+    """
+    Notificaciones en vivo solo si el request llegó por ASGI: en WSGI cada
+    conexión abierta retendría un hilo. ``NOTIFICACIONES_SSE = False`` las apaga.
+    """
+    return getattr(settings, "NOTIFICACIONES_SSE", True) and isinstance(request, ASGIRequest)
+
+
+def publicar(usuario_ids, evento):
+    """
+    Publica el evento para los usuarios cuando la transacción actual confirma,
+    para que el navegador nunca vea una notificación que luego se revierte.
+    Los datos ya están confirmados: un error del bus se registra y no llega
+    a la vista.
+    """
+    usuario_ids = list(usuario_ids)
+    if not usuario_ids:
+        return
+
+    def enviar():
+        try:
+            obtener_bus().publicar(usuario_ids, evento)
+        except Exception:
+            logger.exception("No se pudo publicar el evento %s para %s usuario(s)",
+                             evento.get("evento"), len(usuario_ids))
+
+    transaction.on_commit(enviar)
+
+
+def publicar_notificacion(notificacion):
+    publicar([notificacion.usuario_id], {"evento": "notificacion"})
+
+
+def publicar_contador(usuario_id):
+    """Avisa que cambió el contador de no leídas (lectura o eliminación)."""
+    publicar([usuario_id], {"evento": "contador"})
@@ -0,0 +1,74 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.notificaciones.cache import invalidar_resumen
+from core.notificaciones.models import Notificacion, NotificacionArchivada
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina (o archiva) notificaciones leídas más antiguas que N días, "
+        "en lotes cortos para no bloquear la tabla."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias", type=int,
+            default=getattr(settings, "NOTIFICACIONES_RETENCION_DIAS", 90),
+            help="Antigüedad mínima de las notificaciones leídas a depurar.")
+        parser.add_argument("--lote", type=int, default=1000,
+                            help="Filas por transacción.")
+        parser.add_argument("--pausa", type=float, default=0.0,
+                            help="Segundos de espera entre lotes.")
+        parser.add_argument("--archivar", action="store_true",
+                            help="Copiar a NotificacionArchivada antes de borrar.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Solo cuenta las filas que se depurarían.")
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options["dias"])
+        candidatas = Notificacion.objects.filter(leida=True, creado__lt=limite)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{candidatas.count()} notificación(es) a depurar.")
+            return
+
+        total = 0
+        inicio = time.perf_counter()
+        while True:
+            procesadas = self._procesar_lote(candidatas, options["lote"], options["archivar"])
+            if not procesadas:
+                break
+            total += procesadas
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(f"{total} filas ({total / segundos:,.0f} filas/s)")
+            if options["pausa"]:
+                time.sleep(options["pausa"])
+
+        segundos = time.perf_counter() - inicio
+        velocidad = total / segundos if segundos else 0
+        accion = "archivadas" if options["archivar"] else "eliminadas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} notificación(es) {accion} en {segundos:.1f}s ({velocidad:,.0f} filas/s)."))
+
+    def _procesar_lote(self, candidatas, lote, archivar):
+        with transaction.atomic():
+            filas = list(
+                candidatas.order_by("creado")
+                .values("id", "usuario_id", "mensaje", "tipo", "link", "clave", "repeticiones", "creado")[:lote]
+            )
+            if not filas:
+                return 0
+            if archivar:
+                NotificacionArchivada.objects.bulk_create(
+                    [NotificacionArchivada(**{k: v for k, v in f.items() if k != "id"}) for f in filas],
+                    batch_size=lote,
+                )
+            Notificacion.objects.filter(id__in=[f["id"] for f in filas]).delete()
+        invalidar_resumen(*{f["usuario_id"] for f in filas})
+        return len(filas)
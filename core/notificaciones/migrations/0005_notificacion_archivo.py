@@ -0,0 +1,41 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0004_notificacion_indices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mensaje', models.TextField()),
+                ('tipo', models.CharField(choices=[('INFO', 'Información'), ('WARNING', 'Advertencia'), ('SUCCESS', 'Éxito'), ('ERROR', 'Error')], default='INFO', max_length=20)),
+                ('link', models.CharField(blank=True, max_length=255, null=True)),
+                ('creado', models.DateTimeField()),
+                ('archivado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Notificación archivada',
+                'verbose_name_plural': 'Notificaciones archivadas',
+                'ordering': ['-creado'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', True)), fields=['creado'], name='notif_leidas_creado_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificacionarchivada',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_archivadas', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
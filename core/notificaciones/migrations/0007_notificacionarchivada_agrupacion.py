@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0006_notificacion_agrupacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacionarchivada',
+            name='clave',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='notificacionarchivada',
+            name='repeticiones',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:19
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copiar_creado(apps, schema_editor):
+    # Solo las agrupables (no leídas con clave) se buscan por ``actualizado``
+    Notificacion = apps.get_model("notificaciones", "Notificacion")
+    Notificacion.objects.using(schema_editor.connection.alias).filter(
+        leida=False).exclude(clave="").update(actualizado=models.F("creado"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0007_notificacionarchivada_agrupacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificacion',
+            name='notif_clave_no_leida_idx',
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='actualizado',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copiar_creado, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', False)), fields=['clave', 'usuario', 'actualizado'], name='notif_clave_no_leida_idx'),
+        ),
+    ]
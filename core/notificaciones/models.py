@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Notificacion(models.Model):
     TIPOS = (
@@ -22,9 +23,53 @@ class Notificacion(models.Model):
     
     link = models.CharField(max_length=255, blank=True, null=True)
 
+    # Agrupación de eventos repetidos (ver utils.notificar con ``clave``).
+    # ``actualizado`` marca la última repetición; ``creado`` no cambia, así la
+    # fila no se mueve en la bandeja paginada por (creado, id)
+    clave = models.CharField(max_length=100, blank=True, default="")
+    repeticiones = models.PositiveIntegerField(default=1)
+    actualizado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-creado", "-id"]
+        indexes = [
+            # Contador de no leídas y bandeja filtrada por estado
+            models.Index(fields=["usuario", "leida", "creado"], name="notif_usuario_leida_idx"),
+            # Bandeja paginada por cursor (creado, id)
+            models.Index(fields=["usuario", "creado", "id"], name="notif_usuario_creado_idx"),
+            # Depuración de leídas antiguas (depurar_notificaciones)
+            models.Index(fields=["creado"], condition=models.Q(leida=True), name="notif_leidas_creado_idx"),
+            # Búsqueda de la notificación no leída a agrupar
+            models.Index(fields=["clave", "usuario", "actualizado"], condition=models.Q(leida=False),
+                         name="notif_clave_no_leida_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} - {self.mensaje[:30]}"
+
+
+class NotificacionArchivada(models.Model):
+    """
+    Copia de notificaciones leídas que la depuración sacó de la tabla principal
+    (ver comando depurar_notificaciones --archivar).
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="notificaciones_archivadas"
+    )
+    mensaje = models.TextField()
+    tipo = models.CharField(max_length=20, choices=Notificacion.TIPOS, default="INFO")
+    link = models.CharField(max_length=255, blank=True, null=True)
+    clave = models.CharField(max_length=100, blank=True, default="")
+    repeticiones = models.PositiveIntegerField(default=1)
+    creado = models.DateTimeField()
+    archivado = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-creado"]
+        verbose_name = "Notificación archivada"
+        verbose_name_plural = "Notificaciones archivadas"
 
     def __str__(self):
         return f"{self.tipo} - {self.mensaje[:30]}"
@@ -0,0 +1,39 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+# Tamaño de página por defecto y máximo aceptado desde la URL
+POR_PAGINA = 25
+MAX_POR_PAGINA = 100
+
+
+def codificar_cursor(notificacion):
+    valor = f"{notificacion.creado.isoformat()}|{notificacion.pk}"
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """Devuelve ``(creado, id)`` o ``None`` si el cursor es inválido."""
+    try:
+        creado, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(creado), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def pagina_keyset(queryset, cursor=None, por_pagina=POR_PAGINA):
+    """
+    Pagina por cursor sobre ``(creado, id)`` descendente. No usa OFFSET, así
+    que cada página cuesta lo mismo sin importar cuántas se hayan recorrido.
+    Devuelve ``(notificaciones, siguiente_cursor)``.
+    """
+    queryset = queryset.order_by("-creado", "-id")
+    posicion = decodificar_cursor(cursor) if cursor else None
+    if posicion:
+        creado, pk = posicion
+        queryset = queryset.filter(Q(creado__lt=creado) | Q(creado=creado, id__lt=pk))
+
+    items = list(queryset[:por_pagina + 1])
+    siguiente = codificar_cursor(items[por_pagina - 1]) if len(items) > por_pagina else None
+    return items[:por_pagina], siguiente
@@ -2,14 +2,18 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.conf import settings
 from core.notificaciones.models import Notificacion
+from core.notificaciones.cache import invalidar_resumen
+from core.notificaciones.eventos import publicar_notificacion
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def notificar_usuario_creado(sender, instance, created, **kwargs):
     if created:
         # Notificación genérica al administrador
-        Notificacion.objects.create(
+        notificacion = Notificacion.objects.create(
             usuario=instance,
             mensaje=f"Se creó el usuario {instance.username}",
             tipo="SUCCESS"
         )
+        invalidar_resumen(instance.pk)
+        publicar_notificacion(notificacion)
         # Notificación específica al usuario creado
\ No newline at end of file
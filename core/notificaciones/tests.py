@@ -0,0 +1,258 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from administrador.models import Rol
+from .cache import clave_resumen, obtener_resumen
+from .context_processors import notificaciones_context
+from .eventos import USUARIOS_POR_AVISO, BusPostgres, publicar, sse_activo
+from .models import Notificacion, NotificacionArchivada
+from .utils import notificar, notificar_a_admins
+
+User = get_user_model()
+
+
+class NotificarTest(TestCase):
+    """Una notificación para muchos destinatarios se crea con un solo INSERT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gerente = Rol.objects.create(nombre="Gerente")
+        cls.admins = [User.objects.create_superuser(f"admin{i}", password="clave") for i in range(3)]
+        cls.gerentes = [User.objects.create_user(f"gerente{i}", password="clave") for i in range(2)]
+        # El alta asigna el rol Invitado (administrador/signals.py)
+        User.objects.filter(pk__in=[u.pk for u in cls.gerentes]).update(rol=cls.gerente)
+        # Quitar las notificaciones de alta de usuario
+        Notificacion.objects.all().delete()
+
+    def destinatarios(self):
+        return sorted(Notificacion.objects.values_list("usuario__username", flat=True))
+
+    def test_un_insert_y_excluye_al_autor(self):
+        with CaptureQueriesContext(connection) as consultas:
+            cantidad = notificar_a_admins("Departamento editado", exclude_user=self.admins[0])
+        self.assertEqual(cantidad, 2)
+        self.assertEqual(self.destinatarios(), ["admin1", "admin2"])
+        inserts = [q for q in consultas if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+    def test_destinatarios_por_rol_y_por_lista(self):
+        notificar(self.gerente, "Nueva solicitud")
+        self.assertEqual(self.destinatarios(), ["gerente0", "gerente1"])
+        Notificacion.objects.all().delete()
+        notificar([self.admins[1], self.gerentes[0].pk], "Aviso", tipo="WARNING")
+        self.assertEqual(self.destinatarios(), ["admin1", "gerente0"])
+        self.assertEqual(set(Notificacion.objects.values_list("tipo", flat=True)), {"WARNING"})
+
+
+class ResumenCacheadoTest(TestCase):
+    """El contador y las recientes salen de la caché hasta que una escritura confirma."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser("admin", password="clave")
+
+    def setUp(self):
+        cache.clear()
+
+    def contexto(self):
+        request = RequestFactory().get("/")
+        request.user = self.usuario
+        return notificaciones_context(request)
+
+    def test_sin_consultas_si_no_cambio_nada(self):
+        with self.assertNumQueries(0):
+            self.contexto()  # sin usar el contador no se consulta
+        self.assertEqual(str(self.contexto()["notificaciones_no_leidas"]), "1")
+        with self.assertNumQueries(0):
+            contexto = self.contexto()
+            self.assertEqual(str(contexto["notificaciones_no_leidas"]), "1")
+            self.assertEqual(len(contexto["notificaciones_recientes"]), 1)
+
+    def test_invalida_al_confirmar(self):
+        obtener_resumen(self.usuario.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            notificar([self.usuario], "Colonia editada")
+            # Dentro de la transacción sigue el resumen anterior en caché
+            self.assertIsNotNone(cache.get(clave_resumen(self.usuario.pk)))
+        self.assertIsNone(cache.get(clave_resumen(self.usuario.pk)))
+        self.assertEqual(obtener_resumen(self.usuario.pk)["no_leidas"], 2)
+
+
+class BandejaKeysetTest(TestCase):
+    """La bandeja pagina por cursor (creado, id) sin saltear ni repetir filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser("admin", password="clave")
+        Notificacion.objects.all().delete()
+        Notificacion.objects.bulk_create([
+            Notificacion(usuario=cls.usuario, mensaje=f"Aviso {i}", leida=i % 2 == 0)
+            for i in range(7)
+        ])
+        # Todas en el mismo instante: el orden y el cursor dependen del id
+        Notificacion.objects.update(creado=timezone.now())
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def recorrer(self, **filtros):
+        mensajes, cursor = [], None
+        while True:
+            params = dict(filtros, por_pagina=2, **({"cursor": cursor} if cursor else {}))
+            datos = self.client.get(reverse("notificaciones:lista_json"), params).json()
+            mensajes += [n["mensaje"] for n in datos["resultados"]]
+            cursor = datos["siguiente"]
+            if not cursor:
+                return mensajes
+
+    def test_recorre_todas_una_vez(self):
+        mensajes = self.recorrer()
+        self.assertEqual(len(mensajes), 7)
+        self.assertEqual(set(mensajes), {f"Aviso {i}" for i in range(7)})
+        self.assertEqual(mensajes[:2], ["Aviso 6", "Aviso 5"])
+
+    def test_filtro_y_cursor_invalido(self):
+        self.assertEqual(sorted(self.recorrer(leida="0")), ["Aviso 1", "Aviso 3", "Aviso 5"])
+        datos = self.client.get(reverse("notificaciones:lista_json"), {"cursor": "basura"}).json()
+        self.assertEqual(len(datos["resultados"]), 7)
+
+
+class _Detener(BaseException):
+    """Corta el bucle de escucha en la prueba (no es Exception: no se reintenta)."""
+
+
+class NotificacionesEnVivoTest(TestCase):
+    """SSE solo con ASGI; sin él, la campanita consulta un contador cacheado."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser("admin", password="clave")
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    @override_settings(NOTIFICACIONES_SSE=True)
+    def test_stream_no_retiene_hilos_wsgi(self):
+        # El cliente de pruebas es WSGI: se responde 204 y EventSource no reintenta
+        respuesta = self.client.get(reverse("notificaciones:stream"))
+        self.assertEqual(respuesta.status_code, 204)
+
+    def test_contador_y_navbar_sin_sse(self):
+        self.assertEqual(self.client.get(reverse("notificaciones:contador")).json(), {"no_leidas": 1})
+        contexto = notificaciones_context(mock.Mock(user=self.usuario))
+        self.assertFalse(contexto["notificaciones_sse"])
+        # Servido por ASGI se activa solo, salvo que se apague en settings
+        asgi = mock.Mock(spec=ASGIRequest, user=self.usuario)
+        self.assertTrue(notificaciones_context(asgi)["notificaciones_sse"])
+        with override_settings(NOTIFICACIONES_SSE=False):
+            self.assertFalse(sse_activo(asgi))
+
+    def test_publica_al_confirmar(self):
+        with mock.patch("core.notificaciones.eventos.obtener_bus") as bus:
+            with self.captureOnCommitCallbacks(execute=True):
+                publicar([self.usuario.pk], {"evento": "contador"})
+                bus.return_value.publicar.assert_not_called()
+        bus.return_value.publicar.assert_called_once_with([self.usuario.pk], {"evento": "contador"})
+
+    def test_error_del_bus_no_llega_a_la_vista(self):
+        with mock.patch("core.notificaciones.eventos.obtener_bus") as bus, \
+                self.assertLogs("core.notificaciones.eventos", "ERROR"):
+            bus.return_value.publicar.side_effect = RuntimeError("payload string too long")
+            with self.captureOnCommitCallbacks(execute=True):
+                publicar([self.usuario.pk], {"evento": "contador"})
+
+    def test_notify_en_partes_sin_el_mensaje(self):
+        with mock.patch("core.notificaciones.eventos.connection") as conexion:
+            BusPostgres().publicar(range(USUARIOS_POR_AVISO * 2 + 1), {"evento": "notificacion"})
+        llamadas = conexion.cursor.return_value.__enter__.return_value.execute.call_args_list
+        self.assertEqual(len(llamadas), 3)
+        self.assertTrue(all(len(c.args[1][1]) < 8000 for c in llamadas))
+
+    def test_listen_reconecta_y_libera_el_hilo(self):
+        bus = BusPostgres()
+        bus._escuchando = True
+        conexion = mock.Mock()
+        with mock.patch.object(bus, "_conectar", side_effect=[OSError("caída"), conexion, _Detener]), \
+                mock.patch.object(bus, "_recibir", side_effect=OSError("conexión perdida")), \
+                mock.patch("core.notificaciones.eventos.time.sleep") as dormir, \
+                self.assertLogs("core.notificaciones.eventos", "ERROR") as registros, \
+                self.assertRaises(_Detener):
+            bus._escuchar()
+        self.assertEqual(len(registros.records), 2)
+        conexion.close.assert_called_once()
+        self.assertEqual([c.args[0] for c in dormir.call_args_list], [1, 1])
+        self.assertFalse(bus._escuchando)
+
+
+class DepurarNotificacionesTest(TestCase):
+    """La depuración solo saca leídas viejas y el archivo conserva la agrupación."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser("admin", password="clave")
+        Notificacion.objects.all().delete()
+        viejas = timezone.now() - timedelta(days=120)
+        Notificacion.objects.bulk_create([
+            Notificacion(usuario=cls.usuario, mensaje="Vieja leída", leida=True,
+                         clave="departamento.editado:1", repeticiones=4),
+            Notificacion(usuario=cls.usuario, mensaje="Vieja sin leer"),
+            Notificacion(usuario=cls.usuario, mensaje="Reciente leída", leida=True),
+        ])
+        Notificacion.objects.exclude(mensaje="Reciente leída").update(creado=viejas)
+
+    def test_archiva_en_lotes(self):
+        call_command("depurar_notificaciones", dias=90, lote=1, archivar=True, stdout=io.StringIO())
+        self.assertEqual(sorted(Notificacion.objects.values_list("mensaje", flat=True)),
+                         ["Reciente leída", "Vieja sin leer"])
+        archivada = NotificacionArchivada.objects.get()
+        self.assertEqual((archivada.mensaje, archivada.clave, archivada.repeticiones),
+                         ("Vieja leída", "departamento.editado:1", 4))
+
+
+class AgrupacionTest(TestCase):
+    """Los eventos repetidos suman repeticiones sin mover la fila en la bandeja."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser("admin", password="clave")
+        Notificacion.objects.all().delete()
+
+    def test_agrupa_dentro_de_la_ventana(self):
+        notificar([self.usuario], "Departamento editado", clave="departamento.editado:1")
+        primera = Notificacion.objects.get()
+        otra = Notificacion.objects.create(usuario=self.usuario, mensaje="Otra")
+        notificar([self.usuario], "Departamento editado de nuevo", clave="departamento.editado:1")
+
+        agrupada = Notificacion.objects.get(pk=primera.pk)
+        self.assertEqual((agrupada.repeticiones, agrupada.mensaje), (2, "Departamento editado de nuevo"))
+        self.assertEqual(agrupada.creado, primera.creado)
+        self.assertGreater(agrupada.actualizado, primera.actualizado)
+        self.assertEqual(list(Notificacion.objects.values_list("pk", flat=True)), [otra.pk, primera.pk])
+
+    def test_lock_por_clave_antes_de_leer(self):
+        with mock.patch("core.notificaciones.utils.bloquear_ambito") as bloquear:
+            notificar([self.usuario], "Editado", clave="departamento.editado:1")
+        bloquear.assert_called_once_with("default", "notificaciones:departamento.editado:1")
+        with mock.patch("core.notificaciones.utils.bloquear_ambito") as bloquear:
+            notificar([self.usuario], "Sin clave")
+        bloquear.assert_not_called()
+
+    def test_ventana_por_ultima_repeticion(self):
+        notificar([self.usuario], "Editado", clave="departamento.editado:1")
+        Notificacion.objects.update(creado=timezone.now() - timedelta(hours=1))
+        notificar([self.usuario], "Editado", clave="departamento.editado:1")
+        self.assertEqual(Notificacion.objects.get().repeticiones, 2)
+        Notificacion.objects.update(actualizado=timezone.now() - timedelta(hours=1))
+        notificar([self.usuario], "Editado", clave="departamento.editado:1")
+        self.assertEqual(Notificacion.objects.count(), 2)
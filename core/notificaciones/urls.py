@@ -5,6 +5,9 @@ app_name = "notificaciones"
 
 urlpatterns = [
     path("lista/", views.lista_notificaciones, name="lista"),
+    path("lista/json/", views.lista_notificaciones_json, name="lista_json"),
+    path("contador/", views.contador_notificaciones, name="contador"),
+    path("stream/", views.stream_notificaciones, name="stream"),
     path("marcar-todas-leidas/", views.marcar_todas_leidas, name="marcar_todas_leidas"),
     path("eliminar/<int:pk>/", views.eliminar_notificacion, name="eliminar"),
     path("eliminar-seleccionadas/", views.eliminar_seleccionadas, name="eliminar_seleccionadas"),
@@ -1,20 +1,100 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
+
+from administrador.models import Rol
+from core.bloqueos import bloquear_ambito
+from .cache import invalidar_resumen
+from .eventos import publicar
 from .models import Notificacion
 
 User = get_user_model()
 
-def notificar_a_admins(mensaje, tipo="INFO", exclude_user=None, link=None):
+# Tiempo en el que eventos con la misma clave se agrupan en una sola notificación
+VENTANA_AGRUPACION = timedelta(minutes=10)
+
+
+def _destinatarios_queryset(destinatarios):
     """
-    Crea notificaciones para todos los administradores, excepto el usuario que realizó la acción.
+    Normaliza los destinatarios a un queryset de usuarios.
+    Acepta un queryset de User, un Rol o una lista de usuarios / ids.
+    """
+    if isinstance(destinatarios, QuerySet):
+        return destinatarios
+    if isinstance(destinatarios, Rol):
+        return User.objects.filter(rol=destinatarios)
+    ids = [getattr(d, "pk", d) for d in destinatarios]
+    return User.objects.filter(pk__in=ids)
+
+
+def notificar(destinatarios, mensaje, tipo="INFO", exclude_user=None, link=None,
+              clave=None, ventana=VENTANA_AGRUPACION):
+    """
+    Crea la misma notificación para todos los destinatarios con un único INSERT.
+    El usuario que realizó la acción se excluye en la consulta.
+
+    Con ``clave`` (p. ej. ``"departamento.editado:12"``) los eventos repetidos
+    dentro de ``ventana`` no generan filas nuevas: se actualiza la notificación
+    no leída existente y se incrementa su contador de repeticiones.
+    Devuelve la cantidad de destinatarios notificados.
+    """
+    usuarios = _destinatarios_queryset(destinatarios)
+    if exclude_user is not None and getattr(exclude_user, "pk", None) is not None:
+        usuarios = usuarios.exclude(pk=exclude_user.pk)
+    usuario_ids = list(usuarios.values_list("pk", flat=True))
+
+    with transaction.atomic():
+        agrupados = set()
+        if clave:
+            agrupados = _agrupar(usuario_ids, mensaje, tipo, link, clave, ventana)
+        Notificacion.objects.bulk_create(
+            [
+                Notificacion(usuario_id=usuario_id, mensaje=mensaje, tipo=tipo,
+                             link=link, clave=clave or "")
+                for usuario_id in usuario_ids if usuario_id not in agrupados
+            ],
+            batch_size=500,
+        )
+
+    invalidar_resumen(*usuario_ids)
+    publicar(usuario_ids, {"evento": "notificacion"})
+    return len(usuario_ids)
+
+
+def _agrupar(usuario_ids, mensaje, tipo, link, clave, ventana):
     """
-    admins = User.objects.filter(is_superuser=True)
+    Suma una repetición a las notificaciones no leídas con la misma clave cuya
+    última repetición cae dentro de la ventana. Devuelve los ids de usuario que
+    ya tenían una. ``creado`` se conserva para que el cursor de la bandeja no
+    saltee ni repita la fila.
 
-    for admin in admins:
-        if exclude_user and admin == exclude_user:
-            continue
-        Notificacion.objects.create(
-            usuario=admin,
-            mensaje=mensaje,
-            tipo=tipo,
-            link=link
+    El lock por clave va antes de leer: sin fila todavía no hay nada que
+    bloquear con SELECT FOR UPDATE, y dos eventos simultáneos insertarían
+    dos notificaciones no leídas.
+    """
+    bloquear_ambito(Notificacion.objects.db, f"notificaciones:{clave}")
+    ahora = timezone.now()
+    existentes = (
+        Notificacion.objects.select_for_update()
+        .filter(usuario_id__in=usuario_ids, clave=clave, leida=False, actualizado__gte=ahora - ventana)
+    )
+    ids = dict(existentes.values_list("usuario_id", "id"))
+    if ids:
+        Notificacion.objects.filter(id__in=ids.values()).update(
+            repeticiones=F("repeticiones") + 1,
+            mensaje=mensaje, tipo=tipo, link=link, actualizado=ahora,
         )
+    return set(ids)
+
+
+def notificar_a_admins(mensaje, tipo="INFO", exclude_user=None, link=None, clave=None):
+    """
+    Crea notificaciones para todos los administradores, excepto el usuario que realizó la acción.
+    """
+    return notificar(
+        User.objects.filter(is_superuser=True),
+        mensaje, tipo=tipo, exclude_user=exclude_user, link=link, clave=clave
+    )
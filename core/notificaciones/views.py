@@ -1,22 +1,84 @@
-from django.http import JsonResponse
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from .cache import invalidar_resumen, obtener_resumen
+from .eventos import obtener_bus, publicar_contador, sse_activo
 from .models import Notificacion
+from .paginacion import MAX_POR_PAGINA, POR_PAGINA, pagina_keyset
+
+def _filtrar(request):
+    """Notificaciones del usuario con los filtros ``leida`` y ``tipo`` de la URL."""
+    qs = Notificacion.objects.filter(usuario=request.user)
+    leida = request.GET.get("leida")
+    tipo = request.GET.get("tipo")
+    if leida in ("0", "1"):
+        qs = qs.filter(leida=leida == "1")
+    if tipo in dict(Notificacion.TIPOS):
+        qs = qs.filter(tipo=tipo)
+    return qs
+
+
+def _por_pagina(request):
+    try:
+        return max(1, min(int(request.GET.get("por_pagina", POR_PAGINA)), MAX_POR_PAGINA))
+    except ValueError:
+        return POR_PAGINA
+
 
 @login_required
 def lista_notificaciones(request):
-    notificaciones = Notificacion.objects.filter(usuario=request.user)
-    return render(request, "includes/notificaciones/lista.html", {"notificaciones": notificaciones})
+    notificaciones, siguiente = pagina_keyset(
+        _filtrar(request), request.GET.get("cursor"), _por_pagina(request))
+    filtros = request.GET.copy()
+    filtros.pop("cursor", None)
+    return render(request, "includes/notificaciones/lista.html", {
+        "notificaciones": notificaciones,
+        "siguiente_cursor": siguiente,
+        "filtros": filtros.urlencode(),
+        "leida": request.GET.get("leida", ""),
+        "tipo": request.GET.get("tipo", ""),
+        "tipos": Notificacion.TIPOS,
+    })
+
+
+@login_required
+def lista_notificaciones_json(request):
+    notificaciones, siguiente = pagina_keyset(
+        _filtrar(request), request.GET.get("cursor"), _por_pagina(request))
+    return JsonResponse({
+        "resultados": [
+            {
+                "id": n.id,
+                "mensaje": n.mensaje,
+                "tipo": n.tipo,
+                "leida": n.leida,
+                "link": n.link,
+                "creado": n.creado.isoformat(),
+                "actualizado": n.actualizado.isoformat(),
+                "repeticiones": n.repeticiones,
+            }
+            for n in notificaciones
+        ],
+        "siguiente": siguiente,
+    })
 
 @login_required
 def marcar_todas_leidas(request):
     Notificacion.objects.filter(usuario=request.user, leida=False).update(leida=True)
+    invalidar_resumen(request.user.pk)
+    publicar_contador(request.user.pk)
     return redirect(request.META.get("HTTP_REFERER", "notificaciones:lista"))
 
 @login_required
 def eliminar_notificacion(request, pk):
     noti = get_object_or_404(Notificacion, pk=pk, usuario=request.user)
     noti.delete()
+    invalidar_resumen(request.user.pk)
+    publicar_contador(request.user.pk)
     return redirect("notificaciones:lista")
 
 @login_required
@@ -24,9 +86,69 @@ def eliminar_seleccionadas(request):
     if request.method == "POST":
         ids = request.POST.getlist("seleccionadas")
         Notificacion.objects.filter(usuario=request.user, id__in=ids).delete()
+        invalidar_resumen(request.user.pk)
+        publicar_contador(request.user.pk)
     return redirect("notificaciones:lista")
 
 @login_required
 def eliminar_todas(request):
     Notificacion.objects.filter(usuario=request.user).delete()
+    invalidar_resumen(request.user.pk)
+    publicar_contador(request.user.pk)
     return redirect("notificaciones:lista")
+
+
+@login_required
+def contador_notificaciones(request):
+    """Contador de no leídas para la consulta periódica de la campanita (sale de la caché)."""
+    return JsonResponse({"no_leidas": obtener_resumen(request.user.pk)["no_leidas"]})
+
+
+# Cada cuánto se envía un comentario para mantener viva la conexión SSE
+HEARTBEAT = 25
+
+
+def _ultima(usuario_id):
+    """Datos de la notificación más reciente del usuario (los eventos no traen el texto)."""
+    return (
+        Notificacion.objects.filter(usuario_id=usuario_id).order_by("-actualizado", "-id")
+        .values("mensaje", "tipo", "link").first()
+    ) or {}
+
+
+async def stream_notificaciones(request):
+    """
+    Server-Sent Events con las notificaciones nuevas y el contador de no
+    leídas del usuario. Solo servido por ASGI (ver ``eventos.sse_activo``):
+    en WSGI la conexión abierta retendría un hilo del servidor.
+    """
+    if not sse_activo(request):
+        # 204: EventSource deja de reintentar
+        return HttpResponse(status=204)
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        return HttpResponseForbidden()
+
+    async def eventos():
+        bus = obtener_bus()
+        cola = bus.suscribir(usuario.pk)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                resumen = await sync_to_async(obtener_resumen)(usuario.pk)
+                evento = dict(evento, no_leidas=resumen["no_leidas"])
+                if evento["evento"] == "notificacion":
+                    evento.update(await sync_to_async(_ultima)(usuario.pk))
+                yield f"event: {evento['evento']}\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            bus.desuscribir(usuario.pk, cola)
+
+    response = StreamingHttpResponse(eventos(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -1,23 +1,21 @@
-from django.db.models.signals import post_save, pre_save
-from django.dispatch import receiver
+"""
+Auditoría de las solicitudes guardadas con ``save()`` (admin, formularios).
+
+El estado anterior es el que se cargó de la base (``Solicitud.from_db``), así
+que no hace falta volver a leer la fila antes de guardar. Los cambios de
+estado de core/transiciones.py no pasan por aquí: usan UPDATE condicional y
+escriben su propia auditoría en la misma transacción.
+"""
+from django.db.models.signals import post_save
+
 from .models import Solicitud, SolicitudAudit
 
-@receiver(pre_save, sender=Solicitud)
-def solicitud_prev_state(sender, instance, **kwargs):
-    if not instance.pk:
-        instance._prev_estado = None
-    else:
-        try:
-            prev = Solicitud.objects.get(pk=instance.pk)
-            instance._prev_estado = prev.estado
-        except Solicitud.DoesNotExist:
-            instance._prev_estado = None
 
-@receiver(post_save, sender=Solicitud)
-def solicitud_audit(sender, instance, created, **kwargs):
-    prev = getattr(instance, "_prev_estado", None)
+def solicitud_audit(sender, instance, created, using, raw=False, **kwargs):
+    if raw:
+        return
     if created:
-        SolicitudAudit.objects.create(
+        SolicitudAudit.objects.using(using).create(
             solicitud=instance,
             previo="(nuevo)",
             nuevo=instance.estado,
@@ -25,13 +23,17 @@ def solicitud_audit(sender, instance, created, **kwargs):
             comentario="Creada"
         )
     else:
+        prev = getattr(instance, "_estado_original", None)
         if prev is not None and prev != instance.estado:
-            # Si quieres pasar usuario que hizo el cambio, la vista debe setear instance._changed_by antes de save()
-            changed_by = getattr(instance, "_changed_by", None)
-            SolicitudAudit.objects.create(
+            # La vista puede indicar quién hizo el cambio con instance._changed_by antes de save()
+            SolicitudAudit.objects.using(using).create(
                 solicitud=instance,
                 previo=prev,
                 nuevo=instance.estado,
-                cambiado_por=changed_by
+                cambiado_por=getattr(instance, "_changed_by", None)
             )
-        
\ No newline at end of file
+    instance._estado_original = instance.estado
+
+
+def conectar_senales():
+    post_save.connect(solicitud_audit, sender=Solicitud, dispatch_uid="solicitud_audit")
@@ -0,0 +1,167 @@
+"""
+Mantenimiento y uso del cierre territorial ``ColoniaTerritorio``, y los
+filtros del catálogo que comparten las listas, exportaciones y reportes.
+
+Cada colonia tiene una fila por distrito con el departamento de ese distrito
+copiado. Las señales de ``conectar_senales`` lo mantienen al día cuando
+cambian los distritos de una colonia (en cualquiera de los dos lados del M2M)
+o cuando un distrito pasa a otro departamento. ``reconstruir`` lo recalcula
+desde cero (p. ej. después de cambios hechos por SQL directo).
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import m2m_changed, post_save
+
+from .busqueda import CAMPOS_BUSQUEDA, buscar
+from .models import Colonia, ColoniaTerritorio, Departamento, Distrito, Solicitud
+
+ColoniaDistrito = Colonia.distritos.through
+
+
+def _filas(enlaces):
+    return [
+        ColoniaTerritorio(colonia_id=colonia_id, distrito_id=distrito_id, departamento_id=departamento_id)
+        for colonia_id, distrito_id, departamento_id in enlaces.values_list(
+            "colonia_id", "distrito_id", "distrito__departamento_id").iterator()
+    ]
+
+
+def sincronizar_colonias(colonia_ids, using="default"):
+    """Rehace las filas del cierre de las colonias indicadas."""
+    colonia_ids = list(colonia_ids)
+    if not colonia_ids:
+        return
+    with transaction.atomic(using=using):
+        ColoniaTerritorio.objects.using(using).filter(colonia_id__in=colonia_ids).delete()
+        ColoniaTerritorio.objects.using(using).bulk_create(
+            _filas(ColoniaDistrito.objects.using(using).filter(colonia_id__in=colonia_ids)),
+            batch_size=1000,
+        )
+
+
+def reemplazar_distritos(distritos_por_colonia, departamento_de, using="default"):
+    """
+    Reemplaza en bloque los distritos de varias colonias y sus filas del
+    cierre, sin pasar por m2m_changed (importaciones masivas).
+    ``distritos_por_colonia`` es ``{colonia_id: [distrito_id, ...]}`` y
+    ``departamento_de``, ``{distrito_id: departamento_id}``.
+    """
+    colonia_ids = list(distritos_por_colonia)
+    enlaces = [(colonia_id, distrito_id)
+               for colonia_id, distritos in distritos_por_colonia.items()
+               for distrito_id in dict.fromkeys(distritos)]
+    with transaction.atomic(using=using):
+        ColoniaDistrito.objects.using(using).filter(colonia_id__in=colonia_ids).delete()
+        ColoniaTerritorio.objects.using(using).filter(colonia_id__in=colonia_ids).delete()
+        ColoniaDistrito.objects.using(using).bulk_create(
+            [ColoniaDistrito(colonia_id=c, distrito_id=d) for c, d in enlaces], batch_size=1000)
+        ColoniaTerritorio.objects.using(using).bulk_create([
+            ColoniaTerritorio(colonia_id=c, distrito_id=d, departamento_id=departamento_de[d])
+            for c, d in enlaces
+        ], batch_size=1000)
+
+
+def reconstruir(using="default"):
+    """Recalcula el cierre completo. Devuelve la cantidad de filas."""
+    with transaction.atomic(using=using):
+        ColoniaTerritorio.objects.using(using).all().delete()
+        filas = ColoniaTerritorio.objects.using(using).bulk_create(
+            _filas(ColoniaDistrito.objects.using(using).all()), batch_size=1000)
+    return len(filas)
+
+
+def filtrar_por_territorio(queryset, departamento=None, distrito=None):
+    """
+    Filtra un queryset de colonias por departamento y/o distrito con un
+    semi-join (EXISTS) sobre el cierre: una colonia con varios distritos
+    del mismo departamento no se repite, así que no hace falta DISTINCT.
+    """
+    territorio = ColoniaTerritorio.objects.filter(colonia=OuterRef("pk"))
+    if departamento:
+        territorio = territorio.filter(departamento_id=departamento)
+    if distrito:
+        territorio = territorio.filter(distrito_id=distrito)
+    if departamento or distrito:
+        queryset = queryset.filter(Exists(territorio))
+    return queryset
+
+
+def _id(valor):
+    return valor if str(valor or "").isdigit() else None
+
+
+def filtrar_departamentos(queryset, parametros):
+    """Filtro de la lista de departamentos (q), compartido con las exportaciones."""
+    q = (parametros.get("q") or "").strip()
+    if q:
+        queryset = buscar(queryset, q, CAMPOS_BUSQUEDA[Departamento]).order_by("-relevancia", "codigo")
+    return queryset
+
+
+def filtrar_distritos(queryset, parametros):
+    """Filtros de la lista de distritos (q, departamento), compartidos con las exportaciones."""
+    q = (parametros.get("q") or "").strip()
+    if q:
+        queryset = buscar(queryset, q, CAMPOS_BUSQUEDA[Distrito]).order_by("-relevancia", "nombre", "id")
+    departamento = _id(parametros.get("departamento"))
+    if departamento:
+        queryset = queryset.filter(departamento_id=departamento)
+    return queryset
+
+
+def filtrar_colonias(queryset, parametros):
+    """
+    Filtros de la lista de colonias (q, estado, departamento, distrito),
+    compartidos con las exportaciones y los reportes para que todos
+    muestren exactamente las mismas filas.
+    """
+    q = parametros.get("q")
+    estado = parametros.get("estado")
+    if q:
+        queryset = buscar(queryset, q, CAMPOS_BUSQUEDA[Colonia]).order_by("-relevancia", "nombre")
+    if estado:
+        queryset = queryset.filter(estado=estado)
+    return filtrar_por_territorio(
+        queryset, _id(parametros.get("departamento")), _id(parametros.get("distrito")))
+
+
+def filtrar_solicitudes(queryset, parametros):
+    """
+    Solicitudes de las colonias que muestra la lista con esos filtros
+    (q, departamento, distrito); ``estado`` es el de la solicitud.
+    """
+    colonias = filtrar_colonias(Colonia.objects.all(), {
+        clave: parametros.get(clave) for clave in ("q", "departamento", "distrito")})
+    if any(parametros.get(clave) for clave in ("q", "departamento", "distrito")):
+        queryset = queryset.filter(colonia__in=colonias.values("pk"))
+    estado = parametros.get("estado")
+    if estado:
+        queryset = queryset.filter(estado=estado)
+    return queryset
+
+
+# ===============================
+# SEÑALES
+# ===============================
+def distritos_cambiados(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action in ("post_add", "post_remove"):
+        # Del lado de Distrito (distrito.colonias.add) pk_set son colonias
+        sincronizar_colonias(pk_set if reverse else [instance.pk], using=using)
+    elif action == "post_clear":
+        filtro = {"distrito_id": instance.pk} if reverse else {"colonia_id": instance.pk}
+        ColoniaTerritorio.objects.using(using).filter(**filtro).delete()
+
+
+def distrito_guardado(sender, instance, created, using, raw=False, **kwargs):
+    # Si el distrito cambió de departamento, sus colonias lo acompañan
+    if not created and not raw:
+        ColoniaTerritorio.objects.using(using).filter(distrito_id=instance.pk).exclude(
+            departamento_id=instance.departamento_id
+        ).update(departamento_id=instance.departamento_id)
+
+
+def conectar_senales():
+    m2m_changed.connect(distritos_cambiados, sender=ColoniaDistrito,
+                        dispatch_uid="territorio_distritos_cambiados")
+    post_save.connect(distrito_guardado, sender=Distrito,
+                      dispatch_uid="territorio_distrito_guardado")
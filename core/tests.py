@@ -1,3 +1,826 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from administrador.models import Rol
+from analisis.models import TramoEstado
+from .auditoria import archivar_mes, meses_a_archivar
+from .autocompletar import POR_PAGINA
+from .busqueda import CAMPOS_BUSQUEDA, buscar
+from .catalogo import opciones_distritos
+from .exportar import filas_xlsx
+from .forms import ColoniaForm, DistritoForm, SolicitudForm
+from .importar import importar
+from .instantaneas import (
+    POBLADAS_POR_MIGRATE, InstantaneaError, crear, modelos, restaurar, validar_manifiesto,
+)
+from .models import (
+    Area, CodigoLibre, Colonia, ColoniaTerritorio, Departamento, Distrito, Objetivo, Relevamiento, Solicitud,
+    SolicitudAudit,
+)
+from .territorio import filtrar_colonias
+from .transiciones import TransicionConcurrente, TransicionInvalida, transicionar, transicionar_lote
+
+
+class CodigosAutomaticosTest(TestCase):
+    """Asignación de códigos con lista de huecos libres por modelo y ámbito."""
+
+    def libres(self, modelo, ambito=""):
+        return list(CodigoLibre.objects.filter(modelo=modelo._meta.label_lower, ambito=ambito)
+                    .order_by("desde").values_list("desde", "hasta"))
+
+    def test_asigna_y_reutiliza_huecos(self):
+        areas = [Area.objects.create(nombre=f"ÁREA {i}") for i in range(1, 5)]
+        self.assertEqual([a.codigo for a in areas], [1, 2, 3, 4])
+        areas[1].delete()
+        self.assertEqual(self.libres(Area), [(2, 2)])
+        self.assertEqual(Area.objects.create(nombre="NUEVA").codigo, 2)
+        self.assertEqual(Area.objects.create(nombre="OTRA").codigo, 5)
+        self.assertEqual(self.libres(Area), [])
+
+    def test_bajas_vecinas_se_unen_en_un_rango(self):
+        areas = [Area.objects.create(nombre=f"ÁREA {i}") for i in range(1, 8)]
+        for indice in (1, 3, 2, 5):
+            areas[indice].delete()
+        self.assertEqual(self.libres(Area), [(2, 4), (6, 6)])
+        areas[4].delete()  # une los dos rangos
+        self.assertEqual(self.libres(Area), [(2, 6)])
+        self.assertEqual([Area.objects.create(nombre=f"NUEVA {i}").codigo for i in range(2)], [2, 3])
+        self.assertEqual(self.libres(Area), [(4, 6)])
+
+    def test_codigo_borrado_a_mano_se_libera(self):
+        area = Area.objects.create(nombre="TIERRAS")
+        Area.objects.create(nombre="CATASTRO")
+        area = Area.objects.get(pk=area.pk)
+        area.codigo = None
+        area.save()
+        # El código propio vuelve a la lista y la misma fila lo recibe
+        self.assertEqual(area.codigo, 1)
+        self.assertEqual(self.libres(Area), [])
+
+        area.codigo = 10
+        area.save()
+        self.assertEqual(self.libres(Area), [(1, 1), (3, 9)])
+        self.assertEqual(Area.objects.create(nombre="JURÍDICA").codigo, 1)
+
+    def test_ambito_sin_cargar_la_relacion(self):
+        area = Area.objects.create(nombre="TIERRAS")
+        Objetivo.objects.create(area=area, nombre="RELEVAR")
+        objetivo = Objetivo(area_id=area.pk, nombre="TITULAR")
+        with CaptureQueriesContext(connection) as consultas:
+            objetivo.save()
+        self.assertEqual(objetivo.codigo, 2)
+        self.assertFalse([q for q in consultas if 'FROM "core_area"' in q["sql"]])
+
+    def test_borrar_area_descarta_huecos_de_sus_objetivos(self):
+        area = Area.objects.create(nombre="TIERRAS")
+        otra = Area.objects.create(nombre="CATASTRO")
+        objetivos = [Objetivo.objects.create(area=area, nombre=f"OBJETIVO {i}") for i in range(3)]
+        Objetivo.objects.create(area=otra, nombre="OBJETIVO")
+        objetivos[0].delete()
+        Objetivo.objects.filter(area=otra).first().delete()
+        area.delete()
+        self.assertEqual(self.libres(Objetivo, str(area.pk)), [])
+        self.assertEqual(self.libres(Objetivo, str(otra.pk)), [(1, 1)])
+
+    def test_reintenta_si_otro_tomo_el_codigo(self):
+        Area.objects.create(nombre="TIERRAS")
+        original = Area._codigo_maximo
+        lecturas = []
+
+        def maximo_desactualizado(instancia, using):
+            # La primera lectura no ve el código 1 que confirmó otra transacción
+            lecturas.append(using)
+            return 0 if len(lecturas) == 1 else original(instancia, using)
+
+        with mock.patch.object(Area, "_codigo_maximo", maximo_desactualizado):
+            area = Area.objects.create(nombre="CATASTRO")
+        self.assertEqual((area.codigo, len(lecturas)), (2, 2))
+
+
+@skipUnless(connection.vendor == "postgresql", "el advisory lock requiere PostgreSQL")
+class CodigosConcurrentesTest(TransactionTestCase):
+    """Dos altas simultáneas en el mismo ámbito no reciben el mismo código."""
+
+    def test_altas_simultaneas(self):
+        barrera = threading.Barrier(2)
+        codigos, errores = [], []
+
+        def alta(nombre):
+            try:
+                barrera.wait()
+                codigos.append(Area.objects.create(nombre=nombre).codigo)
+            except Exception as e:  # se informa desde el hilo principal
+                errores.append(e)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=alta, args=(f"ÁREA {i}",)) for i in range(2)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+        self.assertEqual(sorted(codigos), [1, 2])
+
+
+class ColoniaListViewQueriesTest(TestCase):
+    """La lista de colonias debe costar las mismas consultas sin importar las filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("gerente", password="clave")
+        cls.usuario.rol = Rol.objects.create(nombre="Gerente")
+        cls.usuario.save()
+        departamento = Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        cls.distritos = [
+            Distrito.objects.create(nombre=f"DISTRITO {i}", codigo=i, departamento=departamento)
+            for i in range(1, 4)
+        ]
+
+    def crear_colonias(self, cantidad):
+        for i in range(cantidad):
+            colonia = Colonia.objects.create(nombre=f"COLONIA {Colonia.objects.count()}")
+            colonia.distritos.set(self.distritos[: 1 + i % 3])
+            if i % 2:
+                Solicitud.objects.create(colonia=colonia)
+            if i % 3 == 0:
+                Relevamiento.objects.create(colonia=colonia)
+
+    def consultas_de_pagina(self):
+        self.client.force_login(self.usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse("gerencia:listar_colonias"))
+        self.assertEqual(response.status_code, 200)
+        return len(consultas), response
+
+    def test_consultas_independientes_del_tamanio_de_pagina(self):
+        self.crear_colonias(2)
+        pocas, _ = self.consultas_de_pagina()
+
+        self.crear_colonias(23)
+        muchas, response = self.consultas_de_pagina()
+
+        self.assertEqual(len(response.context["colonias"]), 25)
+        self.assertEqual(pocas, muchas)
+
+    def test_anotaciones_de_fila(self):
+        self.crear_colonias(2)
+        _, response = self.consultas_de_pagina()
+        colonias = {c.nombre: c for c in response.context["colonias"]}
+
+        primera, segunda = colonias["COLONIA 0"], colonias["COLONIA 1"]
+        self.assertEqual(primera.num_solicitudes, 0)
+        self.assertTrue(primera.tiene_relevamientos)
+        self.assertEqual(segunda.num_solicitudes, 1)
+        self.assertFalse(segunda.tiene_relevamientos)
+        self.assertEqual(primera.departamento_nombre, "CENTRAL")
+        self.assertEqual(primera.departamento_codigo, 11)
+
+
+class CatalogoListViewsQueriesTest(TestCase):
+    """Distritos y departamentos cuentan sus hijos con anotaciones, no por fila."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("gerente", password="clave")
+        cls.usuario.rol = Rol.objects.create(nombre="Gerente")
+        cls.usuario.save()
+
+    def crear_distritos(self, cantidad, departamento=None):
+        departamento = Departamento.objects.create(
+            nombre=departamento or f"DEPTO {Departamento.objects.count()}")
+        for _ in range(cantidad):
+            distrito = Distrito.objects.create(
+                nombre=f"DISTRITO {Distrito.objects.count()}",
+                codigo=Distrito.objects.count() + 1, departamento=departamento)
+            Colonia.objects.create(nombre=f"COLONIA {distrito.codigo}").distritos.add(distrito)
+
+    def consultas(self, nombre_url, **params):
+        self.client.force_login(self.usuario)
+        # La primera visita calienta el resumen de notificaciones cacheado
+        self.client.get(reverse(nombre_url), params)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse(nombre_url), params)
+        self.assertEqual(response.status_code, 200)
+        return len(consultas), response
+
+    def test_distritos_consultas_constantes(self):
+        self.crear_distritos(2)
+        pocas, _ = self.consultas("gerencia:listar_distritos")
+        self.crear_distritos(30)
+        muchas, response = self.consultas("gerencia:listar_distritos")
+
+        self.assertEqual(pocas, muchas)
+        self.assertEqual(len(response.context["distritos"]), 25)
+        self.assertTrue(all(d.num_colonias == 1 for d in response.context["distritos"]))
+
+    def test_distritos_busqueda_y_filtro(self):
+        self.crear_distritos(3, "CENTRAL")
+        self.crear_distritos(2, "ITAPÚA")
+        _, response = self.consultas("gerencia:listar_distritos", q="itapua")
+        self.assertEqual(response.context["page_obj"].paginator.count, 2)
+
+        departamento = Departamento.objects.get(nombre="CENTRAL")
+        _, response = self.consultas("gerencia:listar_distritos", departamento=departamento.pk)
+        self.assertEqual(response.context["page_obj"].paginator.count, 3)
+
+    def test_departamentos_consultas_constantes(self):
+        self.crear_distritos(2)
+        pocas, _ = self.consultas("gerencia:listar_departamentos")
+        for _ in range(5):
+            self.crear_distritos(1)
+        muchas, response = self.consultas("gerencia:listar_departamentos")
+
+        self.assertEqual(pocas, muchas)
+        self.assertEqual(
+            {d.nombre: d.num_distritos for d in response.context["departamentos"]}["DEPTO 0"], 2)
+
+
+class BusquedaCatalogoTest(TestCase):
+    """La búsqueda ignora acentos y mayúsculas y tolera errores de tipeo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("gerente", password="clave")
+        departamento = Departamento.objects.create(nombre="CAAGUAZÚ")
+        distrito = Distrito.objects.create(nombre="SAN JOSÉ DE LOS ARROYOS", departamento=departamento)
+        for nombre, finca in [("SAN JOSÉ OBRERO", "F-1020"), ("SANTA ROSA", "F-3344"),
+                              ("MARÍA AUXILIADORA", None)]:
+            Colonia.objects.create(nombre=nombre, finca_matriz=finca).distritos.add(distrito)
+
+    def test_sin_acentos_ni_mayusculas(self):
+        colonias = buscar(Colonia.objects.all(), "san jose", CAMPOS_BUSQUEDA[Colonia])
+        self.assertEqual([c.nombre for c in colonias], ["SAN JOSÉ OBRERO"])
+
+    def test_errores_de_tipeo_y_relevancia(self):
+        colonias = buscar(Colonia.objects.all(), "Maria Auxiliadra", CAMPOS_BUSQUEDA[Colonia])
+        self.assertEqual([c.nombre for c in colonias], ["MARÍA AUXILIADORA"])
+        self.assertGreater(colonias[0].relevancia, 0.3)
+
+    def test_finca_matriz(self):
+        colonias = buscar(Colonia.objects.all(), "3344", CAMPOS_BUSQUEDA[Colonia])
+        self.assertEqual([c.nombre for c in colonias], ["SANTA ROSA"])
+
+    def test_endpoint_json(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse("gerencia:buscar_catalogo_json"), {"q": "caaguazu"})
+        tipos = {(r["tipo"], r["nombre"]) for r in response.json()["resultados"]}
+        self.assertEqual(tipos, {("departamento", "CAAGUAZÚ"), ("distrito", "SAN JOSÉ DE LOS ARROYOS")})
+
+        response = self.client.get(reverse("gerencia:buscar_catalogo_json"), {"q": "x", "tipo": "otro"})
+        self.assertEqual(response.status_code, 400)
+
+
+class AutocompletarTest(TestCase):
+    """El autocompletado devuelve páginas chicas y los widgets solo lo elegido."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("gerente", password="clave")
+        departamento = Departamento.objects.create(nombre="GUAIRÁ")
+        cls.distritos = [
+            Distrito.objects.create(nombre=f"VILLARRICA {i:02d}", codigo=i, departamento=departamento)
+            for i in range(1, 26)
+        ]
+
+    def pedir(self, catalogo, **params):
+        self.client.force_login(self.usuario)
+        return self.client.get(reverse("core:autocompletar", args=[catalogo]), params)
+
+    def test_paginas(self):
+        datos = self.pedir("distrito").json()
+        self.assertEqual(len(datos["resultados"]), POR_PAGINA)
+        self.assertTrue(datos["hay_mas"])
+        self.assertEqual(datos["resultados"][0]["texto"], "VILLARRICA 01 - GUAIRÁ")
+
+        datos = self.pedir("distrito", pagina=2).json()
+        self.assertEqual(len(datos["resultados"]), 25 - POR_PAGINA)
+        self.assertFalse(datos["hay_mas"])
+
+    def test_busqueda_e_ids(self):
+        datos = self.pedir("departamento", q="guaira").json()
+        self.assertEqual([r["texto"] for r in datos["resultados"]], ["1. GUAIRÁ"])
+
+        ids = f"{self.distritos[3].pk},{self.distritos[7].pk}"
+        datos = self.pedir("distrito", ids=ids).json()
+        self.assertEqual([r["id"] for r in datos["resultados"]], [self.distritos[3].pk, self.distritos[7].pk])
+
+        self.assertEqual(self.pedir("inexistente").status_code, 404)
+
+    def test_widget_renderiza_solo_seleccionados(self):
+        colonia = Colonia.objects.create(nombre="COLONIA GUAIRÁ")
+        colonia.distritos.add(self.distritos[0])
+        html = str(ColoniaForm(instance=colonia)["distritos"])
+        self.assertEqual(html.count("<option"), 1)
+        self.assertIn(reverse("core:autocompletar", args=["distrito"]), html)
+
+
+class CatalogoCacheadoTest(TestCase):
+    """Las opciones del catálogo se cachean por versión y se renuevan al cambiar."""
+
+    def setUp(self):
+        cache.clear()
+        self.departamento = Departamento.objects.create(nombre="CORDILLERA", codigo=3)
+        Distrito.objects.create(nombre="CAACUPÉ", codigo=1, departamento=self.departamento)
+
+    def test_formulario_sin_consultas_con_cache_caliente(self):
+        str(DistritoForm()["departamento"])
+        with self.assertNumQueries(0):
+            html = str(DistritoForm()["departamento"])
+        self.assertIn("3. CORDILLERA", html)
+        self.assertIn("-- Seleccione un Departamento --", html)
+
+    def test_valor_seleccionado(self):
+        distrito = Distrito.objects.get()
+        html = str(DistritoForm(instance=distrito)["departamento"])
+        self.assertIn(f'value="{self.departamento.pk}" selected', html)
+
+    def test_nueva_version_al_guardar(self):
+        self.assertEqual(opciones_distritos(), [("CORDILLERA", [(Distrito.objects.get().pk, "CAACUPÉ")])])
+        with self.captureOnCommitCallbacks(execute=True):
+            Departamento.objects.create(nombre="PARAGUARÍ", codigo=9)
+        self.assertIn("9. PARAGUARÍ", str(DistritoForm()["departamento"]))
+
+    def test_edicion_invalida_al_confirmar(self):
+        distrito = Distrito.objects.get()
+        opciones_distritos()
+        with self.captureOnCommitCallbacks(execute=True):
+            distrito.nombre = "ITACURUBÍ"
+            distrito.save()
+            # Hasta el commit se sigue sirviendo la versión anterior
+            self.assertEqual(opciones_distritos()[0][1], [(distrito.pk, "CAACUPÉ")])
+        self.assertEqual(opciones_distritos()[0][1], [(distrito.pk, "ITACURUBÍ")])
+        with self.captureOnCommitCallbacks(execute=True):
+            distrito.delete()
+        self.assertEqual(opciones_distritos(), [])
+
+
+class TerritorioTest(TestCase):
+    """El cierre colonia → distrito → departamento sigue a las señales."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("gerente", password="clave")
+        cls.usuario.rol = Rol.objects.create(nombre="Gerente")
+        cls.usuario.save()
+        cls.central = Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        cls.itapua = Departamento.objects.create(nombre="ITAPÚA", codigo=7)
+        cls.luque = Distrito.objects.create(nombre="LUQUE", codigo=1, departamento=cls.central)
+        cls.limpio = Distrito.objects.create(nombre="LIMPIO", codigo=2, departamento=cls.central)
+        cls.encarnacion = Distrito.objects.create(nombre="ENCARNACIÓN", codigo=1, departamento=cls.itapua)
+
+    def territorio(self, colonia):
+        return set(ColoniaTerritorio.objects.filter(colonia=colonia).values_list("distrito_id", "departamento_id"))
+
+    def test_sigue_al_m2m_en_ambos_sentidos(self):
+        colonia = Colonia.objects.create(nombre="COLONIA UNO")
+        colonia.distritos.set([self.luque, self.limpio])
+        self.assertEqual(self.territorio(colonia), {(self.luque.pk, self.central.pk), (self.limpio.pk, self.central.pk)})
+
+        colonia.distritos.remove(self.limpio)
+        self.encarnacion.colonias.add(colonia)
+        self.assertEqual(self.territorio(colonia), {(self.luque.pk, self.central.pk), (self.encarnacion.pk, self.itapua.pk)})
+
+        self.luque.colonias.clear()
+        colonia.distritos.clear()
+        self.assertEqual(self.territorio(colonia), set())
+
+    def test_distrito_cambia_de_departamento(self):
+        colonia = Colonia.objects.create(nombre="COLONIA DOS")
+        colonia.distritos.add(self.limpio)
+        self.limpio.departamento = self.itapua
+        self.limpio.save()
+        self.assertEqual(self.territorio(colonia), {(self.limpio.pk, self.itapua.pk)})
+
+    def test_filtro_por_departamento_sin_duplicados(self):
+        ambas = Colonia.objects.create(nombre="COLONIA TRES")
+        ambas.distritos.set([self.luque, self.limpio])
+        Colonia.objects.create(nombre="COLONIA CUATRO").distritos.add(self.encarnacion)
+
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse("gerencia:listar_colonias"), {"departamento": self.central.pk})
+        self.assertEqual([c.nombre for c in response.context["colonias"]], ["COLONIA TRES"])
+
+        qs = filtrar_colonias(Colonia.objects.all(), {"departamento": str(self.central.pk)})
+        self.assertNotIn("DISTINCT", str(qs.query))
+
+
+class ExportarTest(TestCase):
+    """Las exportaciones respetan los filtros de la lista y generan archivos válidos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("gerente", password="clave")
+        central = Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        itapua = Departamento.objects.create(nombre="ITAPÚA", codigo=7)
+        luque = Distrito.objects.create(nombre="LUQUE", codigo=1, departamento=central)
+        encarnacion = Distrito.objects.create(nombre="ENCARNACIÓN", codigo=1, departamento=itapua)
+        cls.central = central
+        Colonia.objects.create(nombre="SAN JOSÉ", finca_matriz="F-1").distritos.add(luque)
+        otra = Colonia.objects.create(nombre="LA PAZ")
+        otra.distritos.add(encarnacion)
+        Solicitud.objects.create(colonia=otra, creado_por=cls.usuario)
+
+    def descargar(self, catalogo, formato, **params):
+        self.client.force_login(self.usuario)
+        response = self.client.get(
+            reverse("gerencia:exportar_catalogo", args=[catalogo, formato]), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def leer_csv(self, contenido):
+        return list(csv.reader(io.StringIO(contenido.decode("utf-8-sig"))))
+
+    def test_csv_con_filtros(self):
+        filas = self.leer_csv(self.descargar("colonias", "csv", departamento=self.central.pk))
+        self.assertEqual(filas[0][:2], ["Código", "Colonia"])
+        self.assertEqual([f[1] for f in filas[1:]], ["SAN JOSÉ"])
+        self.assertEqual(filas[1][5:], ["LUQUE", "CENTRAL"])
+
+    def test_gzip(self):
+        contenido = gzip.decompress(self.descargar("solicitudes", "csv", gzip="1"))
+        filas = self.leer_csv(contenido)
+        self.assertEqual([(f[2], f[5]) for f in filas[1:]], [("LA PAZ", "gerente")])
+
+    def test_xlsx(self):
+        contenido = self.descargar("distritos", "xlsx")
+        with zipfile.ZipFile(io.BytesIO(contenido)) as libro:
+            hoja = libro.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        self.assertEqual(hoja.count("<row>"), 3)
+        self.assertIn("ENCARNACIÓN", hoja)
+
+    def test_catalogo_inexistente(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse("gerencia:exportar_catalogo", args=["usuarios", "csv"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ImportarTest(TestCase):
+    """La importación valida en memoria, hace upsert y reporta las filas rechazadas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("gerente", password="clave")
+        cls.central = Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        cls.itapua = Departamento.objects.create(nombre="ITAPÚA", codigo=7)
+        cls.luque = Distrito.objects.create(nombre="LUQUE", codigo=1, departamento=cls.central)
+        cls.encarnacion = Distrito.objects.create(nombre="ENCARNACIÓN", codigo=1, departamento=cls.itapua)
+        Colonia.objects.create(nombre="SAN JOSÉ", codigo=3).distritos.add(cls.luque)
+
+    def importar(self, catalogo, texto, **kwargs):
+        return importar(catalogo, io.BytesIO(texto.encode("utf-8-sig")), "datos.csv", **kwargs)
+
+    def test_distritos_upsert_y_errores(self):
+        importador = self.importar("distritos", (
+            "Cód. departamento;Departamento;Código;Distrito\n"
+            "11;CENTRAL;1;Luque\n"
+            "11;;2;Limpio\n"
+            ";Itapua;2;Cambyretá\n"
+            "99;;1;Otro\n"
+            "11;;3;LIMPIO\n"
+        ))
+        self.assertEqual((importador.creados, importador.actualizados), (2, 1))
+        self.assertEqual([fila for fila, _mensaje in importador.errores], [5, 6])
+        self.assertTrue(Distrito.objects.filter(nombre="CAMBYRETÁ", departamento=self.itapua).exists())
+
+    def test_colonias_codigos_distritos_y_territorio(self):
+        importador = self.importar("colonias", (
+            "Código,Colonia,Estado,Distritos,Departamentos\n"
+            ",Nueva,Inactivo,Luque; Encarnación,\n"
+            ",San José,,Encarnación,ITAPÚA\n"
+            "3,Repetida,,Luque,\n"
+            ",Sin Distrito,,,\n"
+        ))
+        self.assertEqual((importador.creados, importador.actualizados), (1, 1))
+        self.assertEqual([fila for fila, _mensaje in importador.errores], [4, 5])
+        nueva = Colonia.objects.get(nombre="NUEVA")
+        self.assertEqual((nueva.codigo, nueva.estado), (1, "inactivo"))
+        self.assertEqual(
+            set(ColoniaTerritorio.objects.filter(colonia__nombre="SAN JOSÉ").values_list("distrito", "departamento")),
+            {(self.encarnacion.pk, self.itapua.pk)})
+        self.assertEqual(ColoniaTerritorio.objects.filter(colonia=nueva).count(), 2)
+
+    def test_dry_run_no_guarda(self):
+        importador = self.importar("colonias", "Colonia,Distritos\nOtra,Luque\n", dry_run=True)
+        self.assertEqual(importador.creados, 1)
+        self.assertFalse(Colonia.objects.filter(nombre="OTRA").exists())
+
+    def test_xlsx_exportado_se_reimporta(self):
+        contenido = b"".join(filas_xlsx(
+            ["Código", "Departamento", "Distritos"], [(11, "Central", 1), (12, "Guairá", None)]))
+        importador = importar("departamentos", io.BytesIO(contenido), "departamentos.xlsx")
+        self.assertEqual((importador.creados, importador.actualizados, importador.errores), (1, 1, []))
+        self.assertEqual(Departamento.objects.get(codigo=12).nombre, "GUAIRÁ")
+
+    def test_nombres_sin_distinguir_mayusculas(self):
+        # Filas guardadas antes de que los formularios normalizaran a mayúsculas
+        Departamento.objects.filter(pk=self.central.pk).update(nombre="Central")
+        Distrito.objects.filter(pk=self.luque.pk).update(nombre="Luque")
+        Colonia.objects.filter(nombre="SAN JOSÉ").update(nombre="San José")
+
+        importador = self.importar("departamentos", "Código;Departamento\n11;CENTRAL\n")
+        self.assertEqual((importador.creados, importador.actualizados, importador.errores), (0, 1, []))
+        importador = self.importar("distritos", "Cód. departamento;Código;Distrito\n11;5;LUQUE\n")
+        self.assertIn("Ya existe un distrito", importador.errores[0][1])
+        importador = self.importar("colonias", "Colonia,Distritos\nSAN JOSÉ,Luque\n")
+        self.assertEqual((importador.creados, importador.actualizados), (0, 1))
+        self.assertEqual(Departamento.objects.filter(nombre__iexact="central").count(), 1)
+        self.assertEqual(Colonia.objects.filter(nombre__iexact="san josé").count(), 1)
+
+    def test_columnas_obligatorias(self):
+        importador = self.importar("distritos", "Departamento,Distrito\nCENTRAL,LUQUE\n")
+        self.assertEqual(importador.procesadas, 0)
+        self.assertIn("codigo", importador.errores[0][1])
+
+    def test_vista_y_reporte(self):
+        self.client.force_login(self.usuario)
+        archivo = SimpleUploadedFile("colonias.csv", "Colonia,Distritos\nX,Luque\nOtra,Luque\n".encode())
+        response = self.client.post(
+            reverse("gerencia:importar_catalogo", args=["colonias"]), {"archivo": archivo},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        datos = response.json()
+        self.assertEqual(datos["resumen"]["creados"], 1)
+        self.assertEqual(datos["errores"][0]["fila"], 2)
+        reporte = b"".join(self.client.get(datos["reporte"]).streaming_content).decode("utf-8-sig")
+        self.assertIn("al menos 3 caracteres", reporte)
+
+
+class InstantaneaTest(TestCase):
+    """Instantáneas con COPY: ida y vuelta en PostgreSQL, error claro en otros motores."""
+
+    @skipUnless(connection.vendor == "postgresql", "COPY requiere PostgreSQL")
+    def test_crear_y_restaurar(self):
+        central = Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        luque = Distrito.objects.create(nombre="LUQUE", codigo=1, departamento=central)
+        Colonia.objects.create(nombre="SAN JOSÉ").distritos.add(luque)
+        with tempfile.TemporaryDirectory() as directorio:
+            manifiesto = crear(directorio)
+            self.assertIn({"core_colonia_distritos": 1}, [{t["tabla"]: t["filas"]} for t in manifiesto["tablas"]])
+            Colonia.objects.all().delete()
+            cargadas = restaurar(directorio, reemplazar=True)
+        self.assertEqual(cargadas["core_colonia"], 1)
+        self.assertEqual(list(Colonia.objects.values_list("distritos__nombre", flat=True)), ["LUQUE"])
+        # La secuencia quedó ajustada: la próxima alta no choca con los ids cargados
+        Departamento.objects.create(nombre="ITAPÚA")
+
+    @skipUnless(connection.vendor == "postgresql", "COPY requiere PostgreSQL")
+    def test_restaurar_sobre_base_recien_migrada(self):
+        usuario = get_user_model().objects.create_superuser("admin", password="clave")
+        LogEntry.objects.log_action(usuario.pk, ContentType.objects.get_for_model(Departamento).pk,
+                                    "1", "CENTRAL", 1)
+        Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        with tempfile.TemporaryDirectory() as directorio:
+            crear(directorio)
+            # Como tras migrate: solo quedan las filas de post_migrate
+            with connection.cursor() as cursor:
+                tablas = [m._meta.db_table for m in modelos()
+                          if m._meta.label_lower not in POBLADAS_POR_MIGRATE]
+                cursor.execute(f"TRUNCATE {', '.join(map(connection.ops.quote_name, tablas))}")
+            cargadas = restaurar(directorio)
+        self.assertEqual(cargadas["core_departamento"], 1)
+        # El historial del admin viaja en la instantánea y no se vacía en cascada
+        self.assertEqual(LogEntry.objects.get().object_repr, "CENTRAL")
+        self.assertTrue(get_user_model().objects.filter(username="admin").exists())
+
+    def test_incluye_todas_las_tablas(self):
+        tablas = {modelo._meta.db_table for modelo in modelos()}
+        self.assertTrue({"administrador_rol_permisos", "auth_permission", "core_codigolibre",
+                         "analisis_tramoestado", "notificaciones_notificacion"} <= tablas)
+        self.assertIn("django_admin_log", tablas)
+        self.assertNotIn("django_session", tablas)
+
+    def test_manifiesto_incompleto(self):
+        tablas = [{"tabla": modelo._meta.db_table,
+                   "columnas": [campo.column for campo in modelo._meta.local_concrete_fields]}
+                  for modelo in modelos()]
+        self.assertEqual(len(validar_manifiesto({"tablas": tablas})), len(tablas))
+        with self.assertRaisesMessage(InstantaneaError, "administrador_rol_permisos"):
+            validar_manifiesto({"tablas": [t for t in tablas if t["tabla"] != "administrador_rol_permisos"]})
+        with self.assertRaisesMessage(InstantaneaError, "no forma parte"):
+            validar_manifiesto({"tablas": tablas + [{"tabla": "django_session", "columnas": []}]})
+
+    @skipUnless(connection.vendor != "postgresql", "solo para motores sin COPY")
+    def test_requiere_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "PostgreSQL"):
+            call_command("instantanea_bd", "crear", directorio=tempfile.gettempdir())
+
+
+class TransicionesSolicitudTest(TestCase):
+    """Las transiciones usan UPDATE condicional y auditan sin releer la fila."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("coordinador", password="clave")
+        central = Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        cls.colonia = Colonia.objects.create(nombre="SAN JOSÉ")
+        cls.colonia.distritos.add(Distrito.objects.create(nombre="LUQUE", codigo=1, departamento=central))
+
+    def setUp(self):
+        self.solicitud = Solicitud.objects.create(colonia=self.colonia, creado_por=self.usuario)
+
+    def test_transicion_auditada(self):
+        # SAVEPOINT, SAVEPOINT, UPDATE, RELEASE, INSERT, RELEASE
+        with self.assertNumQueries(6):
+            auditoria = transicionar(self.solicitud, Solicitud.ESTADO_ACTIVO, usuario=self.usuario)
+        self.assertEqual((auditoria.previo, auditoria.nuevo), ("pendiente", "activo"))
+        self.assertEqual(Solicitud.objects.get(pk=self.solicitud.pk).estado, "activo")
+
+    def test_transicion_no_permitida(self):
+        with self.assertRaises(TransicionInvalida):
+            transicionar(self.solicitud, Solicitud.ESTADO_EN_PROCESO)
+
+    def test_conflicto_con_cambio_concurrente(self):
+        otra_copia = Solicitud.objects.get(pk=self.solicitud.pk)
+        transicionar(self.solicitud, Solicitud.ESTADO_INACTIVO)
+        with self.assertRaises(TransicionConcurrente):
+            transicionar(otra_copia, Solicitud.ESTADO_ACTIVO)
+        self.assertEqual(Solicitud.objects.get(pk=self.solicitud.pk).estado, "inactivo")
+        self.assertEqual(SolicitudAudit.objects.filter(solicitud=self.solicitud).count(), 2)
+
+    def test_save_audita_sin_releer(self):
+        solicitud = Solicitud.objects.get(pk=self.solicitud.pk)
+        solicitud.estado = Solicitud.ESTADO_ACTIVO
+        with self.assertNumQueries(2):  # UPDATE de la solicitud, INSERT de la auditoría
+            solicitud.save()
+        self.assertEqual(
+            list(SolicitudAudit.objects.order_by("id").values_list("previo", "nuevo")),
+            [("(nuevo)", "pendiente"), ("pendiente", "activo")])
+
+    def test_vista(self):
+        self.client.force_login(self.usuario)
+        url = reverse("core:transicionar_solicitud", args=[self.solicitud.pk])
+        response = self.client.post(url, {"estado": "en_proceso"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {"estado": "activo", "comentario": "Aprobada"})
+        self.assertEqual(response.json()["estado"], "activo")
+        self.assertEqual(SolicitudAudit.objects.latest("id").cambiado_por, self.usuario)
+
+
+class TransicionesLoteTest(TestCase):
+    """Los cambios masivos validan en memoria y escriben con un UPDATE y un bulk_create."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user("coordinador", password="clave")
+        central = Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        cls.luque = Distrito.objects.create(nombre="LUQUE", codigo=1, departamento=central)
+        cls.limpio = Distrito.objects.create(nombre="LIMPIO", codigo=2, departamento=central)
+        cls.solicitudes = []
+        for i in range(5):
+            colonia = Colonia.objects.create(nombre=f"COLONIA {i}")
+            colonia.distritos.add(cls.luque if i < 4 else cls.limpio)
+            cls.solicitudes.append(Solicitud.objects.create(colonia=colonia, creado_por=cls.usuario))
+        Solicitud.objects.filter(pk=cls.solicitudes[0].pk).update(estado=Solicitud.ESTADO_INACTIVO)
+
+    def test_lote_con_rechazos(self):
+        ids = [s.pk for s in self.solicitudes] + [999999]
+        with self.assertNumQueries(5):  # SAVEPOINT, SELECT FOR UPDATE, UPDATE, INSERT, RELEASE
+            aplicadas, rechazadas = transicionar_lote(ids, Solicitud.ESTADO_INACTIVO, usuario=self.usuario)
+        self.assertEqual(aplicadas, ids[1:5])
+        self.assertEqual([pk for pk, _motivo in rechazadas], [ids[0], 999999])
+        self.assertEqual(Solicitud.objects.filter(estado="inactivo").count(), 5)
+        self.assertEqual(SolicitudAudit.objects.filter(nuevo="inactivo", cambiado_por=self.usuario).count(), 4)
+
+    def test_vista_por_filtros(self):
+        self.client.force_login(self.usuario)
+        response = self.client.post(reverse("core:transicionar_solicitudes"), {
+            "estado": "activo", "distrito": self.luque.pk, "estado_actual": "pendiente"})
+        datos = response.json()
+        self.assertEqual(len(datos["aplicadas"]), 3)
+        self.assertEqual(datos["rechazadas"], [])
+        self.assertFalse(Solicitud.objects.filter(colonia__distritos=self.limpio, estado="activo").exists())
+
+    def test_vista_sin_seleccion(self):
+        self.client.force_login(self.usuario)
+        response = self.client.post(reverse("core:transicionar_solicitudes"), {"estado": "activo"})
+        self.assertEqual(response.status_code, 400)
+
+
+class SolicitudVigenteUnicaTest(TestCase):
+    """Una sola solicitud vigente por colonia y tipo, garantizada por la base."""
+
+    @classmethod
+    def setUpTestData(cls):
+        central = Departamento.objects.create(nombre="CENTRAL", codigo=11)
+        cls.colonia = Colonia.objects.create(nombre="SAN JOSÉ")
+        cls.colonia.distritos.add(Distrito.objects.create(nombre="LUQUE", codigo=1, departamento=central))
+
+    def test_la_base_rechaza_duplicadas(self):
+        Solicitud.objects.create(colonia=self.colonia)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Solicitud.objects.create(colonia=self.colonia)
+        # Con otro tipo o inactiva no hay conflicto
+        Solicitud.objects.create(colonia=self.colonia, tipo="actualizacion")
+        Solicitud.objects.create(colonia=self.colonia, estado=Solicitud.ESTADO_INACTIVO)
+
+    def test_full_clean_mismo_mensaje(self):
+        Solicitud.objects.create(colonia=self.colonia)
+        with self.assertRaisesMessage(ValidationError, Solicitud.MENSAJE_DUPLICADA):
+            Solicitud(colonia=self.colonia).full_clean()
+
+    def test_formulario_traduce_integrity_error(self):
+        form = SolicitudForm(data={"colonia": self.colonia.pk, "tipo": "nuevo"})
+        self.assertTrue(form.is_valid())
+        Solicitud.objects.create(colonia=self.colonia)  # otra llega primero
+        with self.assertRaises(ValidationError):
+            form.save()
+        self.assertEqual(form.non_field_errors(), [Solicitud.MENSAJE_DUPLICADA])
+
+    def test_reactivar_con_otra_vigente(self):
+        inactiva = Solicitud.objects.create(colonia=self.colonia, estado=Solicitud.ESTADO_INACTIVO)
+        otra_inactiva = Solicitud.objects.create(colonia=self.colonia, estado=Solicitud.ESTADO_INACTIVO)
+        aplicadas, rechazadas = transicionar_lote(
+            [inactiva.pk, otra_inactiva.pk], Solicitud.ESTADO_ACTIVO)
+        self.assertEqual(aplicadas, [inactiva.pk])
+        self.assertEqual(rechazadas, [(otra_inactiva.pk, Solicitud.MENSAJE_DUPLICADA)])
+        with self.assertRaisesMessage(TransicionInvalida, Solicitud.MENSAJE_DUPLICADA):
+            transicionar(Solicitud.objects.get(pk=otra_inactiva.pk), Solicitud.ESTADO_ACTIVO)
+
+
+class AuditoriaArchivoTest(TestCase):
+    """Consultas por rango de fechas y archivado por mes de SolicitudAudit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.colonia = Colonia.objects.create(nombre="SAN JOSÉ")
+        cls.solicitud = Solicitud.objects.create(colonia=cls.colonia)
+        SolicitudAudit.objects.filter(solicitud=cls.solicitud).delete()
+        cls.auditorias = [
+            SolicitudAudit.objects.create(
+                solicitud=cls.solicitud, previo="pendiente", nuevo=nuevo,
+                fecha=timezone.make_aware(datetime(*fecha)))
+            for nuevo, fecha in [("en_proceso", (2024, 1, 10)), ("activo", (2024, 1, 31, 23, 30)),
+                                 ("inactivo", (2024, 2, 1)), ("activo", (2025, 6, 5))]
+        ]
+
+    def test_rangos(self):
+        enero, febrero, _junio = self.auditorias[:2], self.auditorias[2], self.auditorias[3]
+        self.assertQuerySetEqual(SolicitudAudit.objects.del_mes(date(2024, 1, 20)).order_by("id"), enero)
+        self.assertQuerySetEqual(
+            SolicitudAudit.objects.entre(date(2024, 2, 1), date(2025, 1, 1)), [febrero])
+        self.assertQuerySetEqual(SolicitudAudit.objects.historial(self.solicitud), self.auditorias)
+        self.assertEqual(meses_a_archivar(date(2025, 1, 1)), [date(2024, 1, 1), date(2024, 2, 1)])
+
+    def test_archivar_mes(self):
+        tramo = TramoEstado.objects.create(
+            auditoria=self.auditorias[1], solicitud=self.solicitud, colonia=self.colonia,
+            estado="en_proceso", desde=self.auditorias[0].fecha, hasta=self.auditorias[1].fecha,
+            segundos=1, mes=date(2024, 1, 1))
+        with tempfile.TemporaryDirectory() as directorio:
+            with self.captureOnCommitCallbacks(execute=True):
+                ruta, filas = archivar_mes(date(2024, 1, 1), directorio)
+            self.assertEqual((os.path.basename(ruta), filas), ("solicitudaudit_2024_01.csv.gz", 2))
+            with gzip.open(ruta, "rt", encoding="utf-8-sig") as entrada:
+                lineas = list(csv.reader(entrada))
+            self.assertEqual([fila[0] for fila in lineas[1:]], [str(a.pk) for a in self.auditorias[:2]])
+            # Un segundo archivado del mismo mes no pisa el archivo
+            with self.assertRaises(FileExistsError) as error:
+                archivar_mes(date(2024, 1, 1), directorio)
+            self.assertEqual(error.exception.filename, ruta)
+
+        self.assertQuerySetEqual(SolicitudAudit.objects.historial(self.solicitud), self.auditorias[2:])
+        tramo.refresh_from_db()
+        self.assertIsNone(tramo.auditoria_id)
+
+    def test_archivar_mes_revertido_no_deja_archivo(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            with mock.patch("django.db.models.query.QuerySet.delete", side_effect=IntegrityError("falla")), \
+                    self.assertRaises(IntegrityError):
+                archivar_mes(date(2024, 1, 1), directorio)
+            self.assertEqual(os.listdir(directorio), [])
+            # El reintento no choca con un archivo huérfano
+            with self.captureOnCommitCallbacks(execute=True):
+                archivar_mes(date(2024, 1, 1), directorio)
+            self.assertEqual(os.listdir(directorio), ["solicitudaudit_2024_01.csv.gz"])
+
+    def test_comando_solo_exportar(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = io.StringIO()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("archivar_auditorias", antes_de="2025-01", directorio=directorio,
+                             solo_exportar=True, stdout=salida)
+            self.assertEqual(sorted(os.listdir(directorio)),
+                             ["solicitudaudit_2024_01.csv.gz", "solicitudaudit_2024_02.csv.gz"])
+        self.assertEqual(SolicitudAudit.objects.count(), 4)
+        with self.assertRaises(CommandError):
+            call_command("archivar_auditorias", antes_de="enero")
@@ -0,0 +1,161 @@
+"""
+Cambios de estado de las solicitudes.
+
+La transición se aplica con ``UPDATE ... WHERE id = %s AND estado = <esperado>``
+y la auditoría se escribe en la misma transacción: si otro usuario cambió la
+solicitud entre la lectura y el cambio, el UPDATE no afecta filas y se
+informa el conflicto en lugar de pisar su cambio. Las reglas son las de
+``Solicitud.TRANSICIONES`` (``puede_transicionar``).
+
+``transicionar`` trabaja con una instancia ya cargada (el estado esperado es
+el que tenía al leerse, ver ``Solicitud.from_db``); ``transicionar_por_id``
+bloquea la fila con ``select_for_update`` para quien solo tiene el id.
+``transicionar_lote`` cambia muchas solicitudes con un solo UPDATE y un solo
+``bulk_create`` de auditorías, y devuelve las filas rechazadas.
+"""
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+
+from .models import Solicitud, SolicitudAudit
+
+
+class TransicionInvalida(ValidationError):
+    """El cambio de estado no está permitido desde el estado actual."""
+
+
+class TransicionConcurrente(TransicionInvalida):
+    """La solicitud cambió de estado desde que se leyó."""
+
+
+def _etiqueta(estado):
+    return dict(Solicitud.ESTADOS).get(estado, estado)
+
+
+def validar_transicion(previo: str, nuevo: str) -> None:
+    if nuevo not in dict(Solicitud.ESTADOS):
+        raise TransicionInvalida(f"Estado inválido: «{nuevo}».")
+    if nuevo not in Solicitud.TRANSICIONES.get(previo, ()):
+        raise TransicionInvalida(
+            f"No se puede pasar de «{_etiqueta(previo)}» a «{_etiqueta(nuevo)}».")
+
+
+def transicionar(solicitud: Solicitud, nuevo: str, usuario=None, comentario: str = "",
+                 using: str | None = None) -> SolicitudAudit:
+    """
+    Pasa ``solicitud`` a ``nuevo`` si sigue en el estado con el que se cargó.
+    Actualiza la instancia y devuelve la auditoría creada.
+    """
+    using = using or router.db_for_write(Solicitud, instance=solicitud)
+    previo = getattr(solicitud, "_estado_original", None) or solicitud.estado
+    validar_transicion(previo, nuevo)
+    ahora = timezone.now()
+
+    with transaction.atomic(using=using):
+        try:
+            with transaction.atomic(using=using):
+                filas = Solicitud.objects.using(using).filter(pk=solicitud.pk, estado=previo).update(
+                    estado=nuevo, fecha_actualizacion=ahora)
+        except IntegrityError as e:
+            # Reactivar una solicitud cuando ya hay otra vigente para la colonia y el tipo
+            if not Solicitud.es_duplicada(e):
+                raise
+            raise TransicionInvalida(Solicitud.MENSAJE_DUPLICADA)
+        if not filas:
+            actual = Solicitud.objects.using(using).filter(pk=solicitud.pk).values_list(
+                "estado", flat=True).first()
+            if actual is None:
+                raise TransicionInvalida("La solicitud ya no existe.")
+            raise TransicionConcurrente(
+                f"La solicitud #{solicitud.pk} cambió a «{_etiqueta(actual)}» mientras se editaba; "
+                f"vuelva a cargarla.")
+        auditoria = SolicitudAudit.objects.using(using).create(
+            solicitud=solicitud, previo=previo, nuevo=nuevo,
+            cambiado_por=usuario, fecha=ahora, comentario=comentario)
+
+    solicitud.estado = solicitud._estado_original = nuevo
+    solicitud.fecha_actualizacion = ahora
+    return auditoria
+
+
+def transicionar_por_id(solicitud_id: int, nuevo: str, usuario=None, comentario: str = "",
+                        using: str = "default") -> SolicitudAudit:
+    """Como ``transicionar``, leyendo la solicitud con la fila bloqueada."""
+    with transaction.atomic(using=using):
+        try:
+            solicitud = Solicitud.objects.using(using).select_for_update().get(pk=solicitud_id)
+        except Solicitud.DoesNotExist:
+            raise TransicionInvalida("La solicitud no existe.")
+        return transicionar(solicitud, nuevo, usuario=usuario, comentario=comentario, using=using)
+
+
+def _sin_duplicadas(aplicadas, filas, rechazadas, using):
+    """
+    Quita de ``aplicadas`` (y pasa a ``rechazadas``) las que quedarían vigentes
+    junto a otra solicitud vigente de la misma colonia y tipo, para que el
+    UPDATE en bloque no choque con el índice único solicitud_vigente_unica.
+    """
+    rechazadas_ids = {pk for pk, _motivo in rechazadas}
+    # Ocupan su lugar las vigentes que no cambian: fuera del lote o rechazadas en él
+    ocupadas = set(
+        Solicitud.objects.using(using)
+        .filter(colonia_id__in={clave[0] for _estado, clave in filas.values()},
+                estado__in=Solicitud.ESTADOS_VIGENTES)
+        .exclude(pk__in=aplicadas)
+        .values_list("colonia_id", "tipo"))
+    ocupadas |= {clave for pk, (estado, clave) in filas.items()
+                 if pk in rechazadas_ids and estado in Solicitud.ESTADOS_VIGENTES}
+    finales = []
+    for pk in aplicadas:
+        clave = filas[pk][1]
+        if clave in ocupadas:
+            rechazadas.append((pk, Solicitud.MENSAJE_DUPLICADA))
+        else:
+            ocupadas.add(clave)
+            finales.append(pk)
+    return finales
+
+
+def transicionar_lote(solicitud_ids, nuevo: str, usuario=None, comentario: str = "",
+                      using: str = "default") -> tuple[list[int], list[tuple[int, str]]]:
+    """
+    Pasa a ``nuevo`` todas las solicitudes de ``solicitud_ids`` que lo permitan.
+    Devuelve ``(aplicadas, rechazadas)``: ids cambiados y ``[(id, motivo), ...]``.
+    """
+    if nuevo not in dict(Solicitud.ESTADOS):
+        raise TransicionInvalida(f"Estado inválido: «{nuevo}».")
+    solicitud_ids = list(dict.fromkeys(int(pk) for pk in solicitud_ids))
+    ahora = timezone.now()
+
+    with transaction.atomic(using=using):
+        # Las filas quedan bloqueadas: nadie las cambia entre la validación y el UPDATE
+        filas = {
+            pk: (estado, (colonia_id, tipo))
+            for pk, estado, colonia_id, tipo in Solicitud.objects.using(using).select_for_update()
+            .filter(pk__in=solicitud_ids).values_list("pk", "estado", "colonia_id", "tipo")
+        }
+        estados = {pk: estado for pk, (estado, _clave) in filas.items()}
+        aplicadas, rechazadas = [], []
+        for pk in solicitud_ids:
+            if pk not in estados:
+                rechazadas.append((pk, "La solicitud no existe."))
+                continue
+            try:
+                validar_transicion(estados[pk], nuevo)
+            except TransicionInvalida as e:
+                rechazadas.append((pk, " ".join(e.messages)))
+            else:
+                aplicadas.append(pk)
+
+        if nuevo in Solicitud.ESTADOS_VIGENTES and aplicadas:
+            aplicadas = _sin_duplicadas(aplicadas, filas, rechazadas, using)
+
+        if aplicadas:
+            Solicitud.objects.using(using).filter(pk__in=aplicadas).update(
+                estado=nuevo, fecha_actualizacion=ahora)
+            SolicitudAudit.objects.using(using).bulk_create([
+                SolicitudAudit(solicitud_id=pk, previo=estados[pk], nuevo=nuevo,
+                               cambiado_por=usuario, fecha=ahora, comentario=comentario)
+                for pk in aplicadas
+            ], batch_size=1000)
+    return aplicadas, rechazadas
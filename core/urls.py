@@ -4,6 +4,9 @@ from . import views
 app_name = "core"
 
 urlpatterns = [
+    # AUTOCOMPLETADO DE CATÁLOGOS (departamento, distrito, colonia, usuario, rol)
+    path("autocompletar/<slug:catalogo>/", views.autocompletar_json, name="autocompletar"),
+
     # DEPARTAMENTOS - GERENCIA
 
     # AREAS - ADMINISTRADOR / GERENCIA
@@ -19,6 +22,8 @@ urlpatterns = [
     # path("objetivos/<int:pk>/eliminar/", views.ObjetivoDeleteView, name="objetivos_delete"),
 
     # SOLICITUDES - GERENCIA
+    path("solicitudes/<int:pk>/transicionar/", views.transicionar_solicitud, name="transicionar_solicitud"),
+    path("solicitudes/transicionar/", views.transicionar_solicitudes, name="transicionar_solicitudes"),
     # path("solicitudes/", views.SolicitudListView, name="solicitudes_list"),
     # path("solicitudes/nuevo/", views.SolicitudCreateView, name="solicitudes_create"),
     # path("solicitudes/<int:pk>/editar/", views.SolicitudUpdateView, name="solicitudes_edit"),
@@ -1,12 +1,16 @@
 # Standard library imports
 import re
+import uuid
 
 # Django imports
 from django.contrib import messages
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
+from django.core.paginator import Paginator
 from django.db import IntegrityError
-from django.db.models import Q
-from django.http import JsonResponse
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q, Subquery
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
 from django.views.decorators.csrf import csrf_exempt
@@ -15,8 +19,15 @@ from django.utils.decorators import method_decorator
 from django.views.generic import ListView, CreateView
 
 # Local imports
+from .autocompletar import CATALOGOS, autocompletar
+from .busqueda import CAMPOS_BUSQUEDA, buscar
+from .catalogo import opciones_departamentos, opciones_distritos
+from .exportar import EXPORTACIONES, FORMATOS, exportar, filas_csv, nombre_archivo
 from .forms import DepartamentoForm, DistritoForm, ColoniaForm
-from .models import Departamento, Distrito, Colonia
+from .importar import IMPORTADORES, importar
+from .models import Departamento, Distrito, Colonia, ColoniaTerritorio, Relevamiento, Solicitud
+from .territorio import filtrar_colonias, filtrar_departamentos, filtrar_distritos, filtrar_solicitudes
+from .transiciones import TransicionConcurrente, TransicionInvalida, transicionar_lote, transicionar_por_id
 from core.notificaciones.utils import notificar_a_admins
 
 
@@ -30,8 +41,9 @@ class DepartamentoListView(LoginRequiredMixin, ListView):
     context_object_name = 'departamentos'
 
     def get_queryset(self):
-        # Prefetch optimiza distritos
-        return Departamento.objects.prefetch_related('distritos').all()
+        # El conteo sale de la misma consulta: nada de .count() por fila
+        qs = filtrar_departamentos(Departamento.objects.order_by('codigo'), self.request.GET)
+        return qs.annotate(num_distritos=Count('distritos'))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -90,7 +102,8 @@ def editar_departamento(request, departamento_id):
             notificar_a_admins(
                 mensaje=f'El Departamento "{departamento.nombre}" fue editado.',
                 tipo="WARNING",
-                exclude_user=request.user
+                exclude_user=request.user,
+                clave=f"departamento.editado:{departamento.pk}"
             )
             msg = "Departamento modificado."
             messages.info(request, f'El Departamento "{departamento.nombre}" fue modificado!')
@@ -139,15 +152,36 @@ def eliminar_departamento(request, departamento_id):
 # VISTAS para DISTRITOS
 # ======================================
 
+DISTRITOS_POR_PAGINA = 25
+
+
 def listar_distritos(request):
-    """Lista todos los distritos con sus departamentos"""
-    distritos = Distrito.objects.select_related('departamento').all().order_by('nombre')
-    departamentos = Departamento.objects.all()
+    """Lista los distritos con su departamento, paginada y filtrada en el servidor"""
+    q = request.GET.get('q', '').strip()
+    departamento_id = request.GET.get('departamento')
+
+    distritos = filtrar_distritos(
+        Distrito.objects.select_related('departamento').order_by('nombre', 'id'), request.GET
+    ).annotate(num_colonias=Count('colonias'))
+
+    page_obj = Paginator(distritos, DISTRITOS_POR_PAGINA).get_page(request.GET.get('page'))
+    # Filtros activos para conservarlos en los enlaces de paginación
+    filtros = request.GET.copy()
+    filtros.pop('page', None)
     form = DistritoForm()
     return render(
         request,
         'includes/gerencia/tablas/listar_distritos.html',
-        {'distritos': distritos, 'departamentos': departamentos, 'form': form}
+        {
+            'distritos': page_obj.object_list,
+            'page_obj': page_obj,
+            'is_paginated': page_obj.has_other_pages(),
+            'departamentos': opciones_departamentos(),
+            'form': form,
+            'q': q,
+            'departamento_id': departamento_id or '',
+            'filtros': filtros.urlencode(),
+        }
     )
 
 
@@ -272,27 +306,31 @@ class ColoniaListView(LoginRequiredMixin, ListView):
     form_class = ColoniaForm
 
     def get_queryset(self):
-        # Optimizar consultas relacionadas
-        qs = Colonia.objects.prefetch_related('solicitudes').all()
-
-        q = self.request.GET.get('q')
-        estado = self.request.GET.get('estado')
-        departamento_id = self.request.GET.get('departamento')  
-        distrito_id = self.request.GET.get('distrito')
-
-        if q:
-            qs = qs.filter(nombre__icontains=q)
-        if estado:
-            qs = qs.filter(estado=estado)
-        if distrito_id:
-            qs = qs.filter(distritos__id=distrito_id)
-
-        return qs.distinct()
+        # Todo lo que muestra cada fila sale de anotaciones y de un único prefetch,
+        # así la página cuesta las mismas consultas sin importar cuántas filas tenga.
+        # El departamento que se muestra es el primero por nombre entre los de sus distritos
+        departamentos = ColoniaTerritorio.objects.filter(
+            colonia=OuterRef('pk')).order_by('departamento__nombre')
+
+        qs = filtrar_colonias(Colonia.objects.order_by('nombre'), self.request.GET)
+
+        return qs.annotate(
+            num_solicitudes=Count('solicitudes', distinct=True),
+            tiene_relevamientos=Exists(
+                Relevamiento.objects.filter(colonia=OuterRef('pk'))),
+            departamento_codigo=Subquery(
+                departamentos.values('departamento__codigo')[:1]),
+            departamento_nombre=Subquery(
+                departamentos.values('departamento__nombre')[:1]),
+        ).prefetch_related(
+            Prefetch('distritos', queryset=Distrito.objects.select_related('departamento'))
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['distritos'] = Distrito.objects.all()
         context['estado_choices'] = Colonia.ESTADO_CHOICES
+        context['distritos_opciones'] = opciones_distritos()
+        context['departamentos_opciones'] = opciones_departamentos()
         return context
 
 
@@ -305,16 +343,8 @@ class ColoniaCreateView(LoginRequiredMixin, CreateView):
         return self.request.META.get('HTTP_REFERER', reverse_lazy('gerencia:listar_colonias'))
 
     def form_valid(self, form):
-        response = super().form_valid(form)
-
-        # Buscar el menor número faltante (antes de guardar)
-        codigos_existentes = set(
-            Colonia.objects.values_list('codigo', flat=True))
-        codigo = 1
-        while codigo in codigos_existentes:
-            codigo += 1
-        form.instance.codigo = codigo  # asignar el primer número libre
-
+        # Sin código, Colonia.save() asigna el primer número libre bajo bloqueo
+        form.instance.codigo = None
         response = super().form_valid(form)
         
         # Si viene de un distrito específico, asegurarnos de que esté asignado
@@ -365,3 +395,233 @@ def eliminar_colonia(request, colonia_id):
         colonia.delete()
         messages.success(request, "Colonia eliminada correctamente.")
     return redirect('gerencia:listar_colonias')
+
+
+# ======================================
+# BÚSQUEDA DEL CATÁLOGO TERRITORIAL
+# ======================================
+
+BUSQUEDA_MAX_RESULTADOS = 20
+
+
+def _resultado_busqueda(tipo, obj):
+    if tipo == 'colonia':
+        detalle = ' / '.join(filter(None, [obj.finca_matriz, obj.padron_matriz]))
+    elif tipo == 'distrito':
+        detalle = obj.departamento.nombre
+    else:
+        detalle = ''
+    return {
+        'tipo': tipo,
+        'id': obj.pk,
+        'codigo': obj.codigo,
+        'nombre': obj.nombre,
+        'detalle': detalle,
+        'relevancia': round(obj.relevancia, 3),
+    }
+
+
+@login_required
+def buscar_catalogo_json(request):
+    """
+    Busca departamentos, distritos y colonias sin distinguir acentos
+    (?q=texto&tipo=colonia|distrito|departamento&limite=N).
+    Devuelve los resultados de cada tipo ordenados por relevancia.
+    """
+    q = request.GET.get('q', '').strip()
+    tipos = {
+        'departamento': Departamento.objects.all(),
+        'distrito': Distrito.objects.select_related('departamento'),
+        'colonia': Colonia.objects.all(),
+    }
+    tipo = request.GET.get('tipo')
+    if tipo:
+        if tipo not in tipos:
+            return JsonResponse({'error': 'Tipo de búsqueda inválido.'}, status=400)
+        tipos = {tipo: tipos[tipo]}
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 10)), BUSQUEDA_MAX_RESULTADOS))
+    except ValueError:
+        limite = 10
+
+    resultados = []
+    if q:
+        for nombre, qs in tipos.items():
+            encontrados = buscar(qs, q, CAMPOS_BUSQUEDA[qs.model]).order_by('-relevancia', 'nombre')
+            resultados += [_resultado_busqueda(nombre, obj) for obj in encontrados[:limite]]
+    return JsonResponse({'q': q, 'resultados': resultados})
+
+
+@login_required
+def autocompletar_json(request, catalogo):
+    """
+    Página de opciones para los selects con autocompletado
+    (?q=texto&pagina=N, o ?ids=1,2 para resolver valores ya elegidos).
+    """
+    if catalogo not in CATALOGOS:
+        return JsonResponse({'error': 'Catálogo inexistente.'}, status=404)
+
+    ids = request.GET.get('ids')
+    if ids is not None:
+        ids = [i for i in ids.split(',') if i.isdigit()]
+        resultados, _ = autocompletar(catalogo, ids=ids)
+        return JsonResponse({'resultados': resultados, 'pagina': 1, 'hay_mas': False})
+
+    try:
+        pagina = max(1, int(request.GET.get('pagina', 1)))
+    except ValueError:
+        pagina = 1
+    resultados, hay_mas = autocompletar(catalogo, request.GET.get('q', '').strip(), pagina)
+    return JsonResponse({'resultados': resultados, 'pagina': pagina, 'hay_mas': hay_mas})
+
+
+# ======================================
+# EXPORTACIONES (CSV / XLSX)
+# ======================================
+
+@login_required
+def exportar_catalogo(request, catalogo, formato):
+    """
+    Descarga el catálogo con los mismos filtros de su lista (?q=, ?departamento=, ...).
+    Las filas se envían a medida que se leen; ?gzip=1 comprime la descarga.
+    """
+    if catalogo not in EXPORTACIONES or formato not in FORMATOS:
+        raise Http404('Exportación inexistente.')
+    comprimir = request.GET.get('gzip') == '1'
+    response = StreamingHttpResponse(
+        exportar(catalogo, formato, request.GET, comprimir=comprimir),
+        content_type='application/gzip' if comprimir else FORMATOS[formato],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{nombre_archivo(catalogo, formato, comprimir)}"')
+    return response
+
+
+IMPORTACION_ERRORES_VISIBLES = 200
+IMPORTACION_REPORTE_TIMEOUT = 60 * 60
+
+
+@login_required
+def importar_catalogo(request, catalogo):
+    """
+    Importa departamentos, distritos o colonias desde un CSV/XLSX con las
+    mismas columnas de la exportación. Con "simular" valida y revierte.
+    Las filas con errores se informan y se pueden descargar como CSV.
+    """
+    if catalogo not in IMPORTADORES:
+        raise Http404('Importación inexistente.')
+    contexto = {'catalogo': catalogo}
+    if request.method != 'POST':
+        return render(request, 'includes/gerencia/importar_catalogo.html', contexto)
+
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    archivo = request.FILES.get('archivo')
+    if archivo is None:
+        if is_ajax:
+            return JsonResponse({'success': False, 'message': 'Debe seleccionar un archivo.'}, status=400)
+        messages.error(request, 'Debe seleccionar un archivo.')
+        return render(request, 'includes/gerencia/importar_catalogo.html', contexto)
+
+    importador = importar(catalogo, archivo, archivo.name, dry_run=request.POST.get('simular') == '1')
+    resumen = importador.resumen()
+    reporte = None
+    if importador.errores:
+        clave = uuid.uuid4().hex
+        cache.set(f'core:importar:reporte:{clave}', importador.errores, IMPORTACION_REPORTE_TIMEOUT)
+        reporte = reverse('gerencia:reporte_importacion', args=[clave])
+    elif not importador.dry_run:
+        notificar_a_admins(
+            mensaje=(f'Se importaron {catalogo}: {resumen["creados"]} nuevos, '
+                     f'{resumen["actualizados"]} actualizados.'),
+            tipo="INFO",
+            exclude_user=request.user,
+            link=reverse(f'gerencia:listar_{catalogo}'),
+        )
+
+    if is_ajax:
+        return JsonResponse({
+            'success': not importador.errores,
+            'resumen': resumen,
+            'errores': [{'fila': fila, 'mensaje': mensaje}
+                        for fila, mensaje in importador.errores[:IMPORTACION_ERRORES_VISIBLES]],
+            'reporte': reporte,
+        })
+    contexto.update(resumen=resumen, reporte=reporte,
+                    errores=importador.errores[:IMPORTACION_ERRORES_VISIBLES])
+    return render(request, 'includes/gerencia/importar_catalogo.html', contexto)
+
+
+@login_required
+def reporte_importacion(request, clave):
+    """Descarga en CSV los errores de una importación (vence a la hora)."""
+    errores = cache.get(f'core:importar:reporte:{clave}')
+    if errores is None:
+        raise Http404('El reporte ya no está disponible.')
+    response = StreamingHttpResponse(filas_csv(['Fila', 'Error'], errores), content_type=FORMATOS['csv'])
+    response['Content-Disposition'] = 'attachment; filename="errores_importacion.csv"'
+    return response
+
+
+# ======================================
+# SOLICITUDES: CAMBIOS DE ESTADO
+# ======================================
+
+@login_required
+@require_POST
+def transicionar_solicitud(request, pk):
+    """Cambia el estado de una solicitud (POST estado=..., comentario=...)."""
+    try:
+        auditoria = transicionar_por_id(
+            pk, request.POST.get('estado', ''), usuario=request.user,
+            comentario=request.POST.get('comentario', '').strip())
+    except TransicionInvalida as e:
+        status = 409 if isinstance(e, TransicionConcurrente) else 400
+        return JsonResponse({'success': False, 'message': ' '.join(e.messages)}, status=status)
+    return JsonResponse({
+        'success': True,
+        'estado': auditoria.nuevo,
+        'estado_display': dict(Solicitud.ESTADOS)[auditoria.nuevo],
+        'message': f'La solicitud #{pk} pasó a "{dict(Solicitud.ESTADOS)[auditoria.nuevo]}".',
+    })
+
+
+TRANSICION_LOTE_MAXIMO = 1000
+FILTROS_SOLICITUDES = ('q', 'departamento', 'distrito', 'estado_actual')
+
+
+@login_required
+@require_POST
+def transicionar_solicitudes(request):
+    """
+    Cambia el estado de varias solicitudes a la vez (POST estado=..., comentario=...).
+    Se eligen por ``ids`` (repetible o separados por comas) o con los filtros
+    de la lista: q, departamento, distrito y estado_actual (p. ej. todas las
+    pendientes de un distrito). Informa las filas rechazadas y el motivo.
+    """
+    ids = [i for valor in request.POST.getlist('ids') for i in valor.split(',') if i.strip().isdigit()]
+    if not ids:
+        filtros = {clave: request.POST.get(clave) for clave in FILTROS_SOLICITUDES}
+        if not any(filtros.values()):
+            return JsonResponse(
+                {'success': False, 'message': 'Indique las solicitudes o al menos un filtro.'}, status=400)
+        filtros['estado'] = filtros.pop('estado_actual')
+        ids = list(filtrar_solicitudes(Solicitud.objects.order_by('id'), filtros).values_list(
+            'id', flat=True)[:TRANSICION_LOTE_MAXIMO + 1])
+    if len(ids) > TRANSICION_LOTE_MAXIMO:
+        return JsonResponse({
+            'success': False,
+            'message': f'Se pueden cambiar hasta {TRANSICION_LOTE_MAXIMO} solicitudes por vez.',
+        }, status=400)
+
+    try:
+        aplicadas, rechazadas = transicionar_lote(
+            ids, request.POST.get('estado', ''), usuario=request.user,
+            comentario=request.POST.get('comentario', '').strip())
+    except TransicionInvalida as e:
+        return JsonResponse({'success': False, 'message': ' '.join(e.messages)}, status=400)
+    return JsonResponse({
+        'success': not rechazadas,
+        'aplicadas': aplicadas,
+        'rechazadas': [{'id': pk, 'mensaje': mensaje} for pk, mensaje in rechazadas],
+        'message': f'{len(aplicadas)} solicitud(es) actualizada(s), {len(rechazadas)} rechazada(s).',
+    })
@@ -0,0 +1,87 @@
+import hashlib
+
+from django import forms
+from django.urls import reverse_lazy
+from django.utils.safestring import mark_safe
+
+from .autocompletar import CATALOGOS
+from .catalogo import cacheado
+
+
+# ===============================
+# WIDGETS CON AUTOCOMPLETADO
+# ===============================
+class AutocompletarMixin:
+    """
+    Renderiza solo las opciones seleccionadas; el resto del catálogo se pide
+    al endpoint ``core:autocompletar`` a medida que el usuario escribe
+    (static/js/autocompletar.js).
+    """
+
+    def __init__(self, catalogo, attrs=None, choices=()):
+        self.catalogo = catalogo
+        super().__init__(attrs, choices)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs["data-autocompletar"] = reverse_lazy("core:autocompletar", args=[self.catalogo])
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        seleccionados = [v for v in value if v not in ("", None)]
+        objetos = []
+        if seleccionados:
+            queryset = getattr(self.choices, "queryset", None)
+            if queryset is not None:
+                objetos = queryset.filter(pk__in=seleccionados)
+        texto = CATALOGOS[self.catalogo]["texto"]
+        grupos = []
+        for indice, obj in enumerate(objetos):
+            opcion = self.create_option(name, obj.pk, texto(obj), True, indice, attrs=attrs)
+            grupos.append((None, [opcion], indice))
+        return grupos
+
+
+class AutocompletarSelect(AutocompletarMixin, forms.Select):
+    pass
+
+
+class AutocompletarSelectMultiple(AutocompletarMixin, forms.SelectMultiple):
+    pass
+
+
+# ===============================
+# WIDGETS CON OPCIONES CACHEADAS
+# ===============================
+class OpcionesCacheadasMixin:
+    """
+    Toma las opciones de un proveedor cacheado de core/catalogo.py en lugar
+    de recorrer el queryset del campo, y guarda el HTML renderizado por
+    versión del catálogo, nombre, atributos y valor seleccionado.
+    """
+
+    def __init__(self, opciones, vacio=None, attrs=None):
+        self.opciones = opciones
+        self.vacio = vacio
+        super().__init__(attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        vacio = [("", self.vacio)] if self.vacio is not None else []
+        self.choices = vacio + list(self.opciones())
+        return super().optgroups(name, value, attrs)
+
+    def render(self, name, value, attrs=None, renderer=None):
+        firma = repr((self.opciones.__name__, name, self.format_value(value),
+                      sorted(self.build_attrs(self.attrs, attrs).items())))
+        clave = hashlib.md5(firma.encode()).hexdigest()
+        renderizar = super().render
+        return mark_safe(cacheado(
+            f"html:{clave}", lambda: str(renderizar(name, value, attrs, renderer))))
+
+
+class SelectCacheado(OpcionesCacheadasMixin, forms.Select):
+    pass
+
+
+class SelectMultipleCacheado(OpcionesCacheadasMixin, forms.SelectMultiple):
+    pass
@@ -3,7 +3,8 @@ from . import views
 from core.views import (
     DepartamentoListView, crear_departamento, editar_departamento, eliminar_departamento,
     listar_distritos, crear_distrito, editar_distrito, eliminar_distrito,
-    ColoniaListView, ColoniaCreateView, editar_colonia, eliminar_colonia
+    ColoniaListView, ColoniaCreateView, editar_colonia, eliminar_colonia,
+    buscar_catalogo_json, exportar_catalogo, importar_catalogo, reporte_importacion
 )
 
 app_name = "gerencia"
@@ -44,5 +45,23 @@ urlpatterns = [
     path('colonias/eliminar/<int:colonia_id>/',
          eliminar_colonia, name='eliminar_colonia'),
 
+    # ------------------------------------
+    # 5. Búsqueda del catálogo
+    # ------------------------------------
+    path('buscar/json/', buscar_catalogo_json, name='buscar_catalogo_json'),
+
+    # ------------------------------------
+    # 6. Exportaciones (departamentos, distritos, colonias, solicitudes)
+    # ------------------------------------
+    path('exportar/<slug:catalogo>/<slug:formato>/', exportar_catalogo,
+         name='exportar_catalogo'),
+
+    # ------------------------------------
+    # 7. Importaciones (departamentos, distritos, colonias)
+    # ------------------------------------
+    path('importar/<slug:catalogo>/', importar_catalogo, name='importar_catalogo'),
+    path('importar/reporte/<slug:clave>/', reporte_importacion,
+         name='reporte_importacion'),
+
 
 ]
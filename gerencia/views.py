@@ -14,11 +14,7 @@ from administrador.models import Rol
 class GerenciaView(LoginRequiredMixin, TemplateView):
     template_name = 'gerencia/gerente_dashboard.html'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['permisos'] = Permission.objects.all()  # Para el modal de creación de roles
-        
-        return context
+    # El modal de roles pide el catálogo de permisos a 'permisos_json'
     
 # Vistas para la gestión de colonias
 class ColoniaListView(LoginRequiredMixin, ListView):
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.humanize',  # Para timesince
+    'django.contrib.postgres',  # Búsqueda por trigramas (core/busqueda.py)
     'widget_tweaks',  # Permite modificar fácilmente los atributos de los widgets de formularios en tus templates
     'core.apps.CoreConfig',
     'core.notificaciones',
@@ -179,4 +180,40 @@ MESSAGE_TAGS = {
     messages.SUCCESS: 'success',
     messages.WARNING: 'warning',
     messages.ERROR: 'danger',
-}
\ No newline at end of file
+}
+
+# Caché. Los resúmenes de notificaciones, el catálogo de permisos y las opciones
+# de los <select> se invalidan al escribir; con varios procesos (workers de
+# gunicorn/uvicorn) la invalidación solo llega a todos si la caché es común.
+# Con REDIS_URL se usa Redis; sin ella cada proceso tiene su propia caché en
+# memoria (válido con un solo proceso, como runserver) y los tiempos de vida
+# se acortan a minutos (ver CACHE_COMPARTIDA).
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+CACHE_COMPARTIDA = bool(REDIS_URL)
+
+# Notificaciones en vivo por Server-Sent Events. Cada pestaña mantiene abierta
+# su conexión, así que solo se usan cuando el request llega por ASGI (uvicorn,
+# daphne). Con WSGI/runserver la campanita consulta el contador cada
+# NOTIFICACIONES_INTERVALO segundos. NOTIFICACIONES_SSE=0 las apaga también en ASGI.
+NOTIFICACIONES_SSE = os.environ.get('NOTIFICACIONES_SSE') != '0'
+NOTIFICACIONES_INTERVALO = 60
+
+# Bus de eventos para notificaciones en vivo (SSE):
+# 'local' = en memoria del proceso, 'postgres' = LISTEN/NOTIFY entre procesos
+NOTIFICACIONES_BUS = 'local'
+
+# Días que se conservan las notificaciones leídas (comando depurar_notificaciones)
+NOTIFICACIONES_RETENCION_DIAS = 90
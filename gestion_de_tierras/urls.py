@@ -29,6 +29,7 @@ urlpatterns = [
     path("notificaciones/", include("core.notificaciones.urls", namespace="notificaciones")),  
     path("core/", include("core.urls", namespace="core")),
     path("gerencia/", include("gerencia.urls", namespace="gerencia")),
+    path("analisis/", include("analisis.urls", namespace="analisis")),
     #path("coordinacion/", include("coordinacion.urls", namespace="coordinacion")),
     #path("relevamiento/", include("relevamiento.urls", namespace="relevamiento")),
 
@@ -0,0 +1,97 @@
+// static/js/autocompletar.js
+// Selects con autocompletado (atributo data-autocompletar con la URL del
+// endpoint core:autocompletar). El HTML trae solo las opciones elegidas; el
+// resto del catálogo se pide por páginas a medida que el usuario busca.
+
+(function () {
+    const estados = new WeakMap();  // select -> {q, pagina, hayMas, buscador, masBtn}
+
+    function pedir(select, params) {
+        return fetch(`${select.dataset.autocompletar}?${new URLSearchParams(params)}`, {
+            headers: { "X-Requested-With": "XMLHttpRequest" },
+        }).then(respuesta => respuesta.json());
+    }
+
+    function agregarOpciones(select, resultados) {
+        const existentes = new Set(Array.from(select.options).map(o => o.value));
+        resultados.forEach(r => {
+            if (!existentes.has(String(r.id))) select.add(new Option(r.texto, r.id));
+        });
+    }
+
+    function cargar(select, agregar) {
+        const estado = estados.get(select);
+        if (!agregar) {
+            // Se conservan las opciones elegidas; el resto se reemplaza
+            Array.from(select.options).filter(o => !o.selected).forEach(o => o.remove());
+        }
+        return pedir(select, { q: estado.q, pagina: estado.pagina }).then(datos => {
+            agregarOpciones(select, datos.resultados);
+            estado.hayMas = datos.hay_mas;
+            estado.masBtn.classList.toggle("d-none", !datos.hay_mas);
+        });
+    }
+
+    function iniciar(select) {
+        if (estados.has(select)) return;
+
+        const buscador = document.createElement("input");
+        buscador.type = "search";
+        buscador.className = "form-control form-control-sm mb-1";
+        buscador.placeholder = "Buscar...";
+        select.parentNode.insertBefore(buscador, select);
+
+        const masBtn = document.createElement("button");
+        masBtn.type = "button";
+        masBtn.className = "btn btn-link btn-sm p-0 d-none";
+        masBtn.textContent = "Cargar más resultados";
+        select.parentNode.insertBefore(masBtn, select.nextSibling);
+
+        const estado = { q: "", pagina: 1, hayMas: false, buscador, masBtn };
+        estados.set(select, estado);
+
+        let espera;
+        buscador.addEventListener("input", function () {
+            clearTimeout(espera);
+            espera = setTimeout(() => {
+                estado.q = buscador.value.trim();
+                estado.pagina = 1;
+                cargar(select, false);
+            }, 300);
+        });
+        masBtn.addEventListener("click", function () {
+            estado.pagina += 1;
+            cargar(select, true);
+        });
+
+        cargar(select, false);
+    }
+
+    function iniciarEn(contenedor) {
+        contenedor.querySelectorAll("select[data-autocompletar]").forEach(iniciar);
+    }
+
+    // Marca como elegidos los ids indicados (p. ej. al abrir un modal de edición)
+    function seleccionar(select, ids) {
+        ids = ids.map(String).filter(Boolean);
+        Array.from(select.options).forEach(o => { o.selected = ids.includes(o.value); });
+        const faltantes = ids.filter(id => !Array.from(select.options).some(o => o.value === id));
+        if (!faltantes.length) return Promise.resolve();
+        return pedir(select, { ids: faltantes.join(",") }).then(datos => {
+            agregarOpciones(select, datos.resultados);
+            Array.from(select.options).forEach(o => { if (ids.includes(o.value)) o.selected = true; });
+        });
+    }
+
+    window.Autocompletar = { iniciar, seleccionar };
+
+    document.addEventListener("DOMContentLoaded", function () {
+        // Los selects dentro de modales se inician recién al abrirlos
+        document.querySelectorAll("select[data-autocompletar]").forEach(select => {
+            if (!select.closest(".modal")) iniciar(select);
+        });
+    });
+    document.addEventListener("show.bs.modal", function (e) {
+        iniciarEn(e.target);
+    });
+})();
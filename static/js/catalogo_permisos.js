@@ -0,0 +1,82 @@
+// static/js/catalogo_permisos.js
+// Completa los checkboxes de permisos de los modales de roles con el catálogo
+// cacheado (endpoint permisos_json). Se pide una sola vez por página, al abrir
+// el primer modal que lo necesita.
+//
+// El modal de edición ya trae en el HTML los permisos actuales marcados: el
+// catálogo solo agrega los demás. Mientras carga, el botón de guardar queda
+// deshabilitado; si la carga falla se habilita de nuevo con la lista del HTML.
+
+(function () {
+    let catalogo = null;
+
+    function escapar(valor) {
+        const div = document.createElement("div");
+        div.textContent = valor == null ? "" : String(valor);
+        return div.innerHTML;
+    }
+
+    function obtenerCatalogo(url) {
+        if (!catalogo) {
+            catalogo = fetch(url, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+                .then(respuesta => {
+                    if (!respuesta.ok) throw new Error(`HTTP ${respuesta.status}`);
+                    return respuesta.json();
+                })
+                .catch(error => {
+                    catalogo = null;  // se reintenta en la próxima apertura
+                    throw error;
+                });
+        }
+        return catalogo;
+    }
+
+    function renderizar(contenedor, datos) {
+        const prefijo = contenedor.dataset.prefijo || "permiso_";
+        const columnas = contenedor.dataset.columnas;
+        // Se respeta lo que el usuario ya haya marcado o desmarcado en el HTML
+        const seleccionados = new Set(
+            Array.from(contenedor.querySelectorAll("input[name='permisos']:checked"), input => input.value)
+        );
+
+        contenedor.innerHTML = datos.grupos.map(grupo => {
+            const permisos = grupo.permisos.map(permiso => {
+                const id = `${prefijo}${permiso.id}`;
+                const check = `
+                    <div class="form-check">
+                        <input class="form-check-input" type="checkbox" id="${id}" name="permisos"
+                               value="${permiso.id}" ${seleccionados.has(String(permiso.id)) ? "checked" : ""}>
+                        <label class="form-check-label" for="${id}">
+                            ${escapar(permiso.nombre)}
+                            <small class="text-muted">(${escapar(grupo.app)}.${escapar(permiso.codename)})</small>
+                        </label>
+                    </div>`;
+                return columnas ? `<div class="${columnas}">${check}</div>` : check;
+            }).join("");
+            const titulo = `<div class="${columnas ? "col-12 " : ""}fw-bold small text-uppercase mt-2">${escapar(grupo.app)} · ${escapar(grupo.modelo)}</div>`;
+            return titulo + permisos;
+        }).join("");
+        contenedor.setAttribute("data-cargado", "true");
+    }
+
+    function avisarError(contenedor) {
+        if (contenedor.querySelector(".catalogo-error")) return;
+        const aviso = document.createElement("small");
+        aviso.className = "catalogo-error text-danger d-block";
+        aviso.textContent = "No se pudo cargar el catálogo de permisos; se muestran solo los actuales.";
+        contenedor.prepend(aviso);
+    }
+
+    document.addEventListener("show.bs.modal", function (e) {
+        const contenedores = e.target.querySelectorAll(".catalogo-permisos:not([data-cargado])");
+        if (!contenedores.length) return;
+        const botones = e.target.querySelectorAll("button[type='submit']");
+        botones.forEach(boton => { boton.disabled = true; });
+
+        Promise.allSettled(Array.from(contenedores, contenedor =>
+            obtenerCatalogo(contenedor.dataset.url)
+                .then(datos => renderizar(contenedor, datos))
+                .catch(() => avisarError(contenedor))
+        )).then(() => botones.forEach(boton => { boton.disabled = false; }));
+    });
+})();
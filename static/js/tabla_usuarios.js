@@ -0,0 +1,166 @@
+// static/js/tabla_usuarios.js
+// Tablas de usuarios paginadas en el servidor (endpoint usuarios_json).
+// Cada tabla se carga recién cuando su pestaña se muestra.
+
+(function () {
+    const estados = {};  // tablaId -> {pagina, orden, q}
+
+    function escapar(valor) {
+        const div = document.createElement("div");
+        div.textContent = valor == null ? "" : String(valor);
+        return div.innerHTML;
+    }
+
+    function celda(usuario, campo) {
+        if (campo === "estado") {
+            const color = usuario.estado === "ACTIVO" ? "success" : (usuario.estado === "INACTIVO" ? "danger" : "warning");
+            return `<span class="badge bg-${color}">${escapar(usuario.estado || "PENDIENTE")}</span>`;
+        }
+        if (campo === "rol" || campo === "rol_nombre") {
+            return `<span class="badge bg-info text-dark text-uppercase">${escapar(usuario.rol_nombre || "Sin rol")}</span>`;
+        }
+        if (campo === "last_login") {
+            return usuario.last_login ? escapar(new Date(usuario.last_login).toLocaleString()) : "";
+        }
+        return escapar(usuario[campo]);
+    }
+
+    function acciones(usuario) {
+        const activo = usuario.estado === "ACTIVO";
+        return `
+          <td>
+            <div class="dropdown">
+              <button class="btn btn-sm btn-light border dropdown-toggle" type="button"
+                      data-bs-toggle="dropdown" aria-expanded="false">
+                <i class="fas fa-ellipsis-v"></i>
+              </button>
+              <ul class="dropdown-menu dropdown-menu-end">
+                <li>
+                  <a class="dropdown-item btn-asignar-rol" href="#"
+                     data-bs-toggle="modal" data-bs-target="#asignarRolModal"
+                     data-userid="${usuario.id}"
+                     data-username="${escapar(usuario.nombre_completo)}"
+                     data-useremail="${escapar(usuario.email)}"
+                     data-rolid="${usuario.rol_id || ""}">
+                    <i class="fas fa-user-tag me-2"></i>Asignar rol
+                  </a>
+                </li>
+                <li><hr class="dropdown-divider"></li>
+                <li>
+                  <a class="dropdown-item btn-cambiar-estado ${activo ? "text-danger" : "text-success"}" href="#"
+                     data-userid="${usuario.id}" data-currentstate="${escapar(usuario.estado)}">
+                    <i class="fas ${activo ? "fa-user-slash" : "fa-user-check"} me-2"></i>
+                    ${activo ? "Desactivar" : "Activar"}
+                  </a>
+                </li>
+              </ul>
+            </div>
+          </td>`;
+    }
+
+    function paginador(tabla, datos) {
+        const nav = document.getElementById(`${tabla.id}-paginas`);
+        if (!nav) return;
+        if (datos.paginas <= 1) {
+            nav.innerHTML = "";
+            return;
+        }
+        const item = (pagina, texto, deshabilitado, activo) =>
+            `<li class="page-item ${deshabilitado ? "disabled" : ""} ${activo ? "active" : ""}">
+               <a class="page-link" href="#" data-pagina="${pagina}">${texto}</a>
+             </li>`;
+        let html = item(datos.pagina - 1, "&laquo;", datos.pagina === 1, false);
+        const desde = Math.max(1, datos.pagina - 2);
+        const hasta = Math.min(datos.paginas, datos.pagina + 2);
+        for (let p = desde; p <= hasta; p++) {
+            html += item(p, p, false, p === datos.pagina);
+        }
+        html += item(datos.pagina + 1, "&raquo;", datos.pagina === datos.paginas, false);
+        nav.innerHTML = `<ul class="pagination pagination-sm mb-0">${html}</ul>`;
+    }
+
+    function cargar(tabla) {
+        const estado = estados[tabla.id] || (estados[tabla.id] = { pagina: 1, orden: "-date_joined", q: "" });
+        const params = new URLSearchParams({
+            pagina: estado.pagina,
+            orden: estado.orden,
+            q: estado.q,
+            estado: tabla.dataset.estado || "",
+        });
+        const campos = Array.from(tabla.querySelectorAll("thead th[data-campo]")).map(th => th.dataset.campo);
+        const conAcciones = tabla.dataset.acciones === "1";
+
+        fetch(`${tabla.dataset.url}?${params}`, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+            .then(respuesta => respuesta.json())
+            .then(datos => {
+                const tbody = tabla.querySelector("tbody");
+                if (!datos.resultados.length) {
+                    tbody.innerHTML = '<tr><td colspan="100%" class="text-center text-muted">No hay usuarios para mostrar.</td></tr>';
+                } else {
+                    tbody.innerHTML = datos.resultados.map(usuario =>
+                        `<tr data-userid="${usuario.id}">` +
+                        campos.map(campo => `<td>${celda(usuario, campo)}</td>`).join("") +
+                        (conAcciones ? acciones(usuario) : "") +
+                        "</tr>"
+                    ).join("");
+                }
+                const info = document.getElementById(`${tabla.id}-info`);
+                if (info) info.textContent = `${datos.total} usuario(s) — página ${datos.pagina} de ${datos.paginas}`;
+                estado.pagina = datos.pagina;
+                paginador(tabla, datos);
+                tabla.setAttribute("data-initialized", "true");
+            });
+    }
+
+    function tablaVisible(contenedor) {
+        const tabla = contenedor && contenedor.querySelector("table[data-url]");
+        if (tabla && !tabla.hasAttribute("data-initialized")) cargar(tabla);
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        tablaVisible(document.querySelector("#usersTabsContent .tab-pane.active"));
+
+        document.querySelectorAll('#usersTabs button[data-bs-toggle="tab"]').forEach(tab => {
+            tab.addEventListener("shown.bs.tab", function (e) {
+                tablaVisible(document.querySelector(e.target.dataset.bsTarget));
+            });
+        });
+
+        // Paginación
+        document.addEventListener("click", function (e) {
+            const enlace = e.target.closest("nav[id$='-paginas'] a[data-pagina]");
+            if (!enlace) return;
+            e.preventDefault();
+            const tabla = document.getElementById(enlace.closest("nav").id.replace(/-paginas$/, ""));
+            estados[tabla.id].pagina = parseInt(enlace.dataset.pagina, 10);
+            cargar(tabla);
+        });
+
+        // Orden por columna
+        document.addEventListener("click", function (e) {
+            const th = e.target.closest("table[data-url] th[data-campo]");
+            if (!th) return;
+            const tabla = th.closest("table");
+            const estado = estados[tabla.id];
+            if (!estado) return;
+            estado.orden = estado.orden === th.dataset.campo ? `-${th.dataset.campo}` : th.dataset.campo;
+            estado.pagina = 1;
+            cargar(tabla);
+        });
+
+        // Búsqueda (con espera para no consultar en cada tecla)
+        document.querySelectorAll(".tabla-usuarios-buscar").forEach(input => {
+            let espera;
+            input.addEventListener("input", function () {
+                clearTimeout(espera);
+                espera = setTimeout(() => {
+                    const tabla = document.getElementById(input.dataset.tabla);
+                    const estado = estados[tabla.id] || (estados[tabla.id] = { pagina: 1, orden: "-date_joined", q: "" });
+                    estado.q = input.value.trim();
+                    estado.pagina = 1;
+                    cargar(tabla);
+                }, 300);
+            });
+        });
+    });
+})();
@@ -30,6 +30,8 @@ function initTables() {
         
         if (!isVisible) return;
         if (tabla.hasAttribute("data-initialized")) return;
+        // Las tablas con data-url se paginan en el servidor (tabla_usuarios.js)
+        if (tabla.hasAttribute("data-url")) return;
 
         try {
             const tablaId = tabla.id.replace("tablaUsuarios-", "");